@@ -0,0 +1,122 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db, run_db
+from app.models.analytics import DailySweetSales, SweetSales
+from app.models.sweet import Sweet
+from app.schemas.analytics import CategorySalesResponse, DailySalesResponse, SweetSalesResponse
+from app.core.dependencies import get_current_admin_user
+from app.core.token_cache import UserSnapshot
+from app.core.responses import rows_response
+
+router = APIRouter(prefix="/inventory/analytics")
+
+def _sweet_columns():
+    return (
+        func.coalesce(Sweet.name, "Unknown").label("sweet_name"),
+        func.coalesce(Sweet.category, "Unknown").label("category"),
+    )
+
+def _rows(db: Session, query) -> list:
+    return [dict(row) for row in db.execute(query).mappings().all()]
+
+@router.get("/sweets", response_model=List[SweetSalesResponse])
+async def get_sales_by_sweet(
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    query = (
+        select(SweetSales.sweet_id, SweetSales.quantity, SweetSales.revenue, SweetSales.orders, *_sweet_columns())
+        .outerjoin(Sweet, Sweet.id == SweetSales.sweet_id)
+        .order_by(SweetSales.revenue.desc(), SweetSales.sweet_id)
+        .limit(limit)
+    )
+    return rows_response(await run_db(db, _rows, query), SweetSalesResponse)
+
+@router.get("/categories", response_model=List[CategorySalesResponse])
+async def get_sales_by_category(
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    # Category totals roll up the per-sweet totals, so the work is bounded by
+    # the size of the catalog rather than the purchase history.
+    category = func.coalesce(Sweet.category, "Unknown").label("category")
+    revenue = func.sum(SweetSales.revenue).label("revenue")
+    query = (
+        select(
+            category,
+            func.sum(SweetSales.quantity).label("quantity"),
+            revenue,
+            func.sum(SweetSales.orders).label("orders"),
+        )
+        .outerjoin(Sweet, Sweet.id == SweetSales.sweet_id)
+        .group_by(category)
+        .order_by(revenue.desc(), category)
+    )
+    return rows_response(await run_db(db, _rows, query), CategorySalesResponse)
+
+def _window(start: Optional[date], end: Optional[date], default_days: int = 30):
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=default_days - 1)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    return start, end
+
+@router.get("/daily", response_model=List[DailySalesResponse])
+async def get_daily_sales(
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    start, end = _window(start, end)
+    query = (
+        select(
+            DailySweetSales.day,
+            func.sum(DailySweetSales.quantity).label("quantity"),
+            func.sum(DailySweetSales.revenue).label("revenue"),
+            func.sum(DailySweetSales.orders).label("orders"),
+        )
+        .where(DailySweetSales.day.between(start, end))
+        .group_by(DailySweetSales.day)
+        .order_by(DailySweetSales.day)
+    )
+    return rows_response(await run_db(db, _rows, query), DailySalesResponse)
+
+@router.get("/top-sellers", response_model=List[SweetSalesResponse])
+async def get_top_sellers(
+    days: Optional[int] = Query(None, ge=1, le=366),
+    by: Literal["quantity", "revenue"] = Query("quantity"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    if days is None:
+        totals = select(SweetSales).subquery()
+    else:
+        start, end = _window(None, None, days)
+        totals = (
+            select(
+                DailySweetSales.sweet_id,
+                func.sum(DailySweetSales.quantity).label("quantity"),
+                func.sum(DailySweetSales.revenue).label("revenue"),
+                func.sum(DailySweetSales.orders).label("orders"),
+            )
+            .where(DailySweetSales.day.between(start, end))
+            .group_by(DailySweetSales.sweet_id)
+            .subquery()
+        )
+    query = (
+        select(totals.c.sweet_id, totals.c.quantity, totals.c.revenue, totals.c.orders, *_sweet_columns())
+        .outerjoin(Sweet, Sweet.id == totals.c.sweet_id)
+        .order_by(totals.c[by].desc(), totals.c.sweet_id)
+        .limit(limit)
+    )
+    return rows_response(await run_db(db, _rows, query), SweetSalesResponse)
@@ -1,27 +1,48 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, run_db
 from app.schemas.auth import Token
 from app.schemas.user import UserCreate, UserResponse
 from app.models.user import User
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import create_access_token, get_password_hash_async, verify_and_update_password_async
 from app.core.config import settings
+from app.core.dependencies import get_current_admin_user
+from app.core.token_cache import UserSnapshot, token_cache
 
 router = APIRouter(prefix="/auth")
 
+def _get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+def _email_taken() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Email already registered"
+    )
+
+def _save_user(db: Session, user: User) -> User:
+    db.add(user)
+    # Two signups for one email can both pass the existence check while
+    # hashing; the unique index decides which one wins.
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise _email_taken()
+    db.refresh(user)
+    return user
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_db(db, _get_user_by_email, user_data.email)
     if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
+        raise _email_taken()
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         full_name=user_data.full_name,
@@ -30,17 +51,17 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         is_active=True
     )
     
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    return db_user
+    return await run_db(db, _save_user, db_user)
 
 @router.post("/login", response_model=Token)
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
+async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_db(db, _get_user_by_email, form_data.username)
+    
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -53,23 +74,25 @@ def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
             detail="Inactive user"
         )
     
+    email = user.email
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_db(db, Session.commit)
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/create-admin")
-def create_admin_user(admin_data: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == admin_data.email).first()
+async def create_admin_user(admin_data: UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_db(db, _get_user_by_email, admin_data.email)
     if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
+        raise _email_taken()
     
-    hashed_password = get_password_hash(admin_data.password)
+    hashed_password = await get_password_hash_async(admin_data.password)
     admin_user = User(
         email=admin_data.email,
         full_name=admin_data.full_name or "Admin User",
@@ -78,8 +101,10 @@ def create_admin_user(admin_data: UserCreate, db: Session = Depends(get_db)):
         is_active=True
     )
     
-    db.add(admin_user)
-    db.commit()
-    db.refresh(admin_user)
+    admin_user = await run_db(db, _save_user, admin_user)
     
-    return {"message": f"Admin user created successfully: {admin_user.email}"}
\ No newline at end of file
+    return {"message": f"Admin user created successfully: {admin_user.email}"}
+
+@router.get("/token-cache/stats")
+async def get_token_cache_stats(current_user: UserSnapshot = Depends(get_current_admin_user)):
+    return token_cache.stats()
\ No newline at end of file
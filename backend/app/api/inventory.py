@@ -1,69 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import date
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db, run_db
 from app.models.sweet import Sweet
 from app.models.user import User
-from app.models.purchase import Purchase
-from app.schemas.purchase import PurchaseCreate, PurchaseResponse
+from app.models.reservation import Reservation
+from app.models.stock_movement import StockMovement
+from app.schemas.purchase import PurchaseCreate, PurchaseBatchCreate, PurchaseResponse
+from app.schemas.reservation import ReservationCreate, ReservationResponse
+from app.schemas.stock import StockAdjustment, StockAdjustmentBatch, StockMovementResponse
+from app.core.archive import HISTORY_COLUMNS, purchase_history
 from app.core.dependencies import get_current_user, get_current_admin_user
+from app.core.token_cache import UserSnapshot
+from app.core.catalog_cache import catalog_cache
+from app.core.config import settings
+from app.core.export import ExportFormat, created_between, stream_export
+from app.core.ledger import purchase_ledger
+from app.core.reservations import (
+    RESERVATION_COLUMNS, convert_reservation, release_reservation, reserve_stock,
+)
+from app.core.responses import rows_response
+from app.core.pagination import decode_cursor, encode_cursor, set_next_cursor
+from app.core.stock import MOVEMENT_COLUMNS, adjust_stock, purchase_stock, purchase_stock_batch
 
 router = APIRouter(prefix="/inventory")
 
 @router.post("/purchase", response_model=PurchaseResponse, status_code=status.HTTP_201_CREATED)
-def purchase_sweet(
+async def purchase_sweet(
     purchase_data: PurchaseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    sweet = db.query(Sweet).filter(Sweet.id == purchase_data.sweet_id).first()
-    if not sweet:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Sweet not found"
-        )
+    if settings.PURCHASE_GROUP_COMMIT:
+        purchase = await purchase_ledger.purchase(current_user.id, purchase_data.sweet_id, purchase_data.quantity)
+    else:
+        purchase = await run_db(db, purchase_stock, current_user.id, purchase_data.sweet_id, purchase_data.quantity)
+    catalog_cache.invalidate()
+    purchase["user_email"] = current_user.email
     
-    if not sweet.is_available:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Sweet is not available for purchase"
-        )
-    
-    if sweet.quantity < purchase_data.quantity:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient stock. Only {sweet.quantity} items available"
-        )
+    return purchase
+
+@router.post("/purchase/batch", response_model=List[PurchaseResponse], status_code=status.HTTP_201_CREATED)
+async def purchase_sweets_batch(
+    batch: PurchaseBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    purchases = await run_db(db, purchase_stock_batch, current_user.id, batch.items)
+    catalog_cache.invalidate()
+    for purchase in purchases:
+        purchase["user_email"] = current_user.email
     
-    total_price = sweet.price * purchase_data.quantity
+    return purchases
+
+@router.post("/reservations", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
+async def reserve_sweet(
+    reservation_data: ReservationCreate,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    reservation = await run_db(
+        db,
+        reserve_stock,
+        current_user.id,
+        reservation_data.sweet_id,
+        reservation_data.quantity,
+        reservation_data.ttl_minutes or settings.RESERVATION_TTL_MINUTES,
+    )
+    catalog_cache.invalidate()
     
-    purchase = Purchase(
-        user_id=current_user.id,
-        sweet_id=sweet.id,
-        quantity=purchase_data.quantity,
-        unit_price=sweet.price,
-        total_price=total_price,
-        status="completed"
+    return reservation
+
+@router.get("/reservations", response_model=List[ReservationResponse])
+async def get_my_reservations(
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    query = (
+        select(*RESERVATION_COLUMNS, Sweet.name.label("sweet_name"))
+        .outerjoin(Sweet, Sweet.id == Reservation.sweet_id)
+        .where(Reservation.user_id == current_user.id)
+        .order_by(Reservation.id)
     )
     
-    sweet.quantity -= purchase_data.quantity
+    return rows_response(await run_db(db, lambda session: session.execute(query).mappings().all()), ReservationResponse)
+
+@router.delete("/reservations/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def release_my_reservation(
+    reservation_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    await run_db(db, release_reservation, current_user.id, reservation_id)
+    catalog_cache.invalidate()
+
+@router.post("/reservations/{reservation_id}/purchase", response_model=PurchaseResponse, status_code=status.HTTP_201_CREATED)
+async def purchase_reservation(
+    reservation_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    purchase = await run_db(db, convert_reservation, current_user.id, reservation_id)
+    catalog_cache.invalidate()
+    purchase["user_email"] = current_user.email
     
-    db.add(purchase)
-    db.commit()
-    db.refresh(purchase)
+    return purchase
+
+def _restock(db: Session, user_id: int, sweet_id: int, quantity: int) -> dict:
+    movement = adjust_stock(db, user_id, [StockAdjustment.model_construct(sweet_id=sweet_id, delta=quantity)], "restock")[0]
     
-    purchase.sweet_name = sweet.name
-    purchase.user_email = current_user.email
+    return {
+        "message": f"Sweet '{movement['sweet_name']}' restocked successfully",
+        "old_quantity": movement["quantity_after"] - quantity,
+        "new_quantity": movement["quantity_after"],
+        "added_quantity": quantity
+    }
+
+@router.post("/restock/batch", response_model=List[StockMovementResponse])
+async def restock_sweets_batch(
+    batch: StockAdjustmentBatch,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    movements = await run_db(db, adjust_stock, current_user.id, batch.items, batch.reason)
+    catalog_cache.invalidate()
     
-    return purchase
+    return movements
 
 @router.post("/restock/{sweet_id}", status_code=status.HTTP_200_OK)
-def restock_sweet(
+async def restock_sweet(
     sweet_id: int,
     quantity: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     if quantity <= 0:
         raise HTTPException(
@@ -71,36 +143,104 @@ def restock_sweet(
             detail="Restock quantity must be positive"
         )
     
-    sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
-    if not sweet:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Sweet not found"
-        )
-    
-    old_quantity = sweet.quantity
-    sweet.quantity += quantity
+    restocked = await run_db(db, _restock, current_user.id, sweet_id, quantity)
+    catalog_cache.invalidate()
     
-    db.commit()
-    db.refresh(sweet)
-    
-    return {
-        "message": f"Sweet '{sweet.name}' restocked successfully",
-        "old_quantity": old_quantity,
-        "new_quantity": sweet.quantity,
-        "added_quantity": quantity
-    }
+    return restocked
 
 @router.get("/purchases/my", response_model=List[PurchaseResponse])
-def get_my_purchases(
+async def get_my_purchases(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+    include_archived: bool = Query(False),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    purchases = db.query(Purchase).filter(Purchase.user_id == current_user.id).all()
+    purchases = purchase_history(include_archived).c
+    query = (
+        select(*(purchases[column] for column in HISTORY_COLUMNS), Sweet.name.label("sweet_name"))
+        .outerjoin(Sweet, Sweet.id == purchases.sweet_id)
+        .where(purchases.user_id == current_user.id)
+        .order_by(purchases.created_at.desc(), purchases.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        # The cursor only carries the id of the last row seen; its created_at is
+        # read back from the table so the comparison never depends on how the
+        # driver round-trips timestamps.
+        last_id = decode_cursor(cursor, int)[0]
+        last_created_at = select(purchases.created_at).where(purchases.id == last_id).scalar_subquery()
+        query = query.where(tuple_(purchases.created_at, purchases.id) < tuple_(last_created_at, last_id))
     
-    for purchase in purchases:
-        sweet = db.query(Sweet).filter(Sweet.id == purchase.sweet_id).first()
-        purchase.sweet_name = sweet.name if sweet else "Unknown"
-        purchase.user_email = current_user.email
+    rows = await run_db(db, lambda session: session.execute(query).mappings().all())
+    if len(rows) > limit:
+        set_next_cursor(request, response, encode_cursor([rows[limit - 1]["id"]]))
+    
+    return rows_response([
+        dict(row, sweet_name=row["sweet_name"] or "Unknown", user_email=current_user.email)
+        for row in rows[:limit]
+    ], PurchaseResponse, response)
+
+@router.get("/movements", response_model=List[StockMovementResponse])
+async def get_stock_movements(
+    request: Request,
+    response: Response,
+    sweet_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    query = (
+        select(*MOVEMENT_COLUMNS, Sweet.name.label("sweet_name"))
+        .outerjoin(Sweet, Sweet.id == StockMovement.sweet_id)
+        .order_by(StockMovement.id.desc())
+        .limit(limit + 1)
+    )
+    if sweet_id is not None:
+        query = query.where(StockMovement.sweet_id == sweet_id)
+    if cursor:
+        query = query.where(StockMovement.id < decode_cursor(cursor, int)[0])
+    
+    rows = await run_db(db, lambda session: session.execute(query).mappings().all())
+    if len(rows) > limit:
+        set_next_cursor(request, response, encode_cursor([rows[limit - 1]["id"]]))
+    
+    return rows_response(rows[:limit], StockMovementResponse, response)
+
+PURCHASE_EXPORT_COLUMNS = [
+    "id", "user_id", "user_email", "sweet_id", "sweet_name",
+    "quantity", "unit_price", "total_price", "status", "created_at",
+]
+
+@router.get("/purchases/export")
+async def export_purchases(
+    format: ExportFormat = Query("csv"),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    sweet_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    include_archived: bool = Query(False),
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    purchases = purchase_history(include_archived).c
+    query = (
+        select(
+            *(purchases[column] for column in HISTORY_COLUMNS),
+            User.email.label("user_email"),
+            Sweet.name.label("sweet_name"),
+        )
+        .outerjoin(User, User.id == purchases.user_id)
+        .outerjoin(Sweet, Sweet.id == purchases.sweet_id)
+        .where(*created_between(purchases.created_at, start, end))
+        .order_by(purchases.id)
+    )
+    if sweet_id is not None:
+        query = query.where(purchases.sweet_id == sweet_id)
+    if user_id is not None:
+        query = query.where(purchases.user_id == user_id)
     
-    return purchases
\ No newline at end of file
+    return stream_export(db, query, PURCHASE_EXPORT_COLUMNS, format, "purchases")
@@ -1,121 +1,307 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import json
+from datetime import date
+from functools import partial
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 
-from app.database import get_db
+from app.database import get_db, get_read_db, run_db
 from app.models.sweet import Sweet
-from app.models.user import User
-from app.schemas.sweet import SweetCreate, SweetUpdate, SweetResponse
+from app.schemas.sweet import SweetCreate, SweetUpdate, SweetResponse, SweetImportResponse
 from app.core.dependencies import get_current_user, get_current_admin_user
+from app.core.token_cache import UserSnapshot
+from app.core.catalog_cache import catalog_cache, cached_json_response
+from app.core.config import settings
+from app.core.stock_events import stock_broker, stock_event_stream
+from app.core.catalog_import import ImportFormat, import_format, import_sweets, read_records, spool_request_body
+from app.core.export import ExportFormat, created_between, stream_export
+from app.core.search import SearchQuery, search_index, search_sweet_ids, tokenize
+from app.core.pagination import approximate_count, decode_cursor, encode_cursor, next_cursor_headers
+from app.core.responses import dump_row, dump_rows, fast_path_enabled, rows_response
 
 router = APIRouter(prefix="/sweets")
 
-@router.post("/", response_model=SweetResponse, status_code=status.HTTP_201_CREATED)
-def create_sweet(
-    sweet: SweetCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
-):
-    existing_sweet = db.query(Sweet).filter(Sweet.name == sweet.name).first()
+sweet_adapter = TypeAdapter(SweetResponse)
+sweet_list_adapter = TypeAdapter(List[SweetResponse])
+
+SWEET_COLUMNS = [getattr(Sweet, name) for name in SweetResponse.model_fields if name != "is_in_stock"]
+
+def _load_sweets(db: Session, query) -> list:
+    # The fast path reads plain column tuples; otherwise ORM instances are
+    # validated into response models.
+    if fast_path_enabled():
+        return [
+            dict(row, is_in_stock=row["quantity"] > 0 and row["is_available"])
+            for row in db.execute(query.with_only_columns(*SWEET_COLUMNS)).mappings()
+        ]
+    return sweet_list_adapter.validate_python(db.scalars(query).all())
+
+def _sweet_field(sweet, name: str):
+    return sweet[name] if isinstance(sweet, dict) else getattr(sweet, name)
+
+def _dump_sweets(sweets: list) -> bytes:
+    if fast_path_enabled():
+        return dump_rows(sweets, SweetResponse)
+    return sweet_list_adapter.dump_json(sweets)
+
+async def _cached_response(request: Request, db: Session, key: str, build):
+    # Entries are built from the primary. Built from a replica, a read right
+    # after an invalidation could cache data from before the write, and it
+    # would then be served until the TTL ran out.
+    entry = await run_db(db, lambda session: catalog_cache.fetch(key, partial(build, session)))
+    return cached_json_response(request, entry)
+
+def _duplicate_name(name: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Sweet with name '{name}' already exists"
+    )
+
+def _commit_unique_name(db: Session, name: str):
+    # The unique index on name settles races the existence checks miss.
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise _duplicate_name(name)
+
+def _create_sweet(db: Session, sweet: SweetCreate) -> Sweet:
+    existing_sweet = db.query(Sweet).filter(Sweet.name == sweet.name, Sweet.deleted_at.is_(None)).first()
     if existing_sweet:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Sweet with name '{sweet.name}' already exists"
-        )
+        raise _duplicate_name(sweet.name)
     
-    db_sweet = Sweet(**sweet.dict())
+    db_sweet = Sweet(**sweet.model_dump())
     db.add(db_sweet)
-    db.commit()
+    _commit_unique_name(db, sweet.name)
     db.refresh(db_sweet)
+    stock_broker.publish([(db_sweet.id, db_sweet.quantity, db_sweet.is_available)])
     return db_sweet
 
+@router.post("/", response_model=SweetResponse, status_code=status.HTTP_201_CREATED)
+async def create_sweet(
+    sweet: SweetCreate,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    db_sweet = await run_db(db, _create_sweet, sweet)
+    catalog_cache.invalidate()
+    search_index.upsert(db_sweet)
+    return db_sweet
+
+@router.post("/bulk", response_model=SweetImportResponse)
+async def bulk_import_sweets(
+    request: Request,
+    format: Optional[ImportFormat] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    records_format = import_format(request.headers.get("content-type"), format)
+    upload = await spool_request_body(request)
+    try:
+        report = await run_db(db, lambda session: import_sweets(session, read_records(upload, records_format)))
+    finally:
+        upload.close()
+    if report["created"] or report["updated"]:
+        catalog_cache.invalidate()
+        search_index.clear()
+    
+    return report
+
+SWEET_ORDERINGS = {"name": Sweet.name, "price": Sweet.price}
+SWEET_CURSOR_VALUES = {"name": str, "price": (int, float)}
+
 @router.get("/", response_model=List[SweetResponse])
-def get_sweets(
+async def get_sweets(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    order_by: Optional[Literal["name", "price"]] = Query(None),
+    cursor: Optional[str] = Query(None),
+    include_count: bool = Query(False),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Sweet).filter(Sweet.is_available == True)
-    sweets = query.offset(skip).limit(limit).all()
-    return sweets
+    def build(db: Session):
+        headers = {}
+        query = select(Sweet).where(Sweet.is_available == True)
+        if include_count:
+            headers["X-Approximate-Count"] = str(approximate_count(db, Sweet, Sweet.is_available == True))
+        
+        if order_by is None and cursor is None:
+            return _dump_sweets(_load_sweets(db, query.offset(skip).limit(limit))), headers
+        
+        ordering = order_by or "name"
+        column = SWEET_ORDERINGS[ordering]
+        if cursor:
+            cursor_ordering, last_value, last_id = decode_cursor(cursor, str, (str, int, float), int)
+            if (
+                cursor_ordering not in SWEET_ORDERINGS
+                or (order_by and cursor_ordering != order_by)
+                or not isinstance(last_value, SWEET_CURSOR_VALUES[cursor_ordering])
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+            ordering = cursor_ordering
+            column = SWEET_ORDERINGS[ordering]
+            query = query.where(tuple_(column, Sweet.id) > tuple_(last_value, last_id))
+        
+        sweets = _load_sweets(db, query.order_by(column, Sweet.id).limit(limit + 1))
+        if len(sweets) > limit:
+            last = sweets[limit - 1]
+            cursor_values = [ordering, _sweet_field(last, ordering), _sweet_field(last, "id")]
+            headers.update(next_cursor_headers(request, encode_cursor(cursor_values)))
+        return _dump_sweets(sweets[:limit]), headers
+
+    key = f"sweets:{skip}:{limit}:{order_by}:{cursor}:{include_count}"
+    return await _cached_response(request, db, key, build)
+
+def _search_sweets(db: Session, query: SearchQuery) -> list:
+    sweet_ids = search_sweet_ids(db, query)
+    if not sweet_ids:
+        return []
+    
+    sweets = {_sweet_field(sweet, "id"): sweet for sweet in _load_sweets(db, select(Sweet).where(Sweet.id.in_(sweet_ids)))}
+    return [sweets[sweet_id] for sweet_id in sweet_ids if sweet_id in sweets]
 
 @router.get("/search", response_model=List[SweetResponse])
-def search_sweets(
+async def search_sweets(
+    q: Optional[str] = Query(None),
     name: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None, ge=0),
     max_price: Optional[float] = Query(None, ge=0),
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(Sweet)
-    
-    filters = [Sweet.is_available == True]
-    
-    if name:
-        filters.append(Sweet.name.ilike(f"%{name}%"))
-    if category:
-        filters.append(Sweet.category.ilike(f"%{category}%"))
-    if min_price is not None:
-        filters.append(Sweet.price >= min_price)
-    if max_price is not None:
-        filters.append(Sweet.price <= max_price)
-    
-    if filters:
-        query = query.filter(and_(*filters))
+    query = SearchQuery(
+        text=tokenize(q),
+        name=tokenize(name),
+        category=tokenize(category),
+        min_price=min_price,
+        max_price=max_price,
+        skip=skip,
+        limit=limit,
+    )
+    return rows_response(await run_db(db, _search_sweets, query), SweetResponse)
+
+SWEET_EXPORT_COLUMNS = [
+    "id", "name", "category", "price", "quantity", "description",
+    "image_url", "is_available", "created_at", "updated_at", "deleted_at",
+]
+
+@router.get("/export")
+async def export_sweets(
+    format: ExportFormat = Query("csv"),
+    category: Optional[str] = Query(None),
+    is_available: Optional[bool] = Query(None),
+    include_deleted: bool = Query(False),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    query = (
+        select(*(getattr(Sweet, column) for column in SWEET_EXPORT_COLUMNS))
+        .where(*created_between(Sweet.created_at, start, end))
+        .order_by(Sweet.id)
+    )
+    if category is not None:
+        query = query.where(Sweet.category == category)
+    if is_available is not None:
+        query = query.where(Sweet.is_available == is_available)
+    if not include_deleted:
+        query = query.where(Sweet.deleted_at.is_(None))
     
-    return query.all()
+    return stream_export(db, query, SWEET_EXPORT_COLUMNS, format, "sweets")
+
+@router.get("/stream")
+async def stream_stock_levels():
+    return StreamingResponse(
+        stock_event_stream(stock_broker, settings.STOCK_STREAM_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/{sweet_id}", response_model=SweetResponse)
-def get_sweet(sweet_id: int, db: Session = Depends(get_db)):
-    sweet = db.query(Sweet).filter(Sweet.id == sweet_id, Sweet.is_available == True).first()
-    if not sweet:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Sweet not found"
-        )
-    return sweet
+async def get_sweet(sweet_id: int, request: Request, db: Session = Depends(get_db)):
+    def build(db: Session):
+        sweets = _load_sweets(db, select(Sweet).where(Sweet.id == sweet_id, Sweet.is_available == True))
+        if not sweets:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sweet not found"
+            )
+        return dump_row(sweets[0], SweetResponse) if fast_path_enabled() else sweet_adapter.dump_json(sweets[0])
 
-@router.put("/{sweet_id}", response_model=SweetResponse)
-def update_sweet(
-    sweet_id: int,
-    sweet_update: SweetUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
-):
-    db_sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    return await _cached_response(request, db, f"sweet:{sweet_id}", build)
+
+def _update_sweet(db: Session, sweet_id: int, sweet_update: SweetUpdate) -> Sweet:
+    db_sweet = db.query(Sweet).filter(Sweet.id == sweet_id, Sweet.deleted_at.is_(None)).first()
     if not db_sweet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
     
-    update_data = sweet_update.dict(exclude_unset=True)
+    update_data = sweet_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_sweet, field, value)
     
-    db.commit()
+    _commit_unique_name(db, db_sweet.name)
     db.refresh(db_sweet)
+    stock_broker.publish([(db_sweet.id, db_sweet.quantity, db_sweet.is_available)])
     return db_sweet
 
-@router.delete("/{sweet_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_sweet(
+@router.put("/{sweet_id}", response_model=SweetResponse)
+async def update_sweet(
     sweet_id: int,
+    sweet_update: SweetUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
-    db_sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
-    if not db_sweet:
+    db_sweet = await run_db(db, _update_sweet, sweet_id, sweet_update)
+    catalog_cache.invalidate()
+    search_index.upsert(db_sweet)
+    return db_sweet
+
+def _delete_sweet(db: Session, sweet_id: int):
+    # Purchases and stock movements keep referring to the sweet, so it is
+    # only marked deleted and unavailable; a later sweet may reuse its name.
+    deleted = db.execute(
+        update(Sweet)
+        .where(Sweet.id == sweet_id, Sweet.deleted_at.is_(None))
+        .values(deleted_at=func.now(), is_available=False)
+    ).rowcount
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
     
-    db.delete(db_sweet)
     db.commit()
+    stock_broker.publish([(sweet_id, 0, False)])
+
+@router.delete("/{sweet_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_sweet(
+    sweet_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    await run_db(db, _delete_sweet, sweet_id)
+    catalog_cache.invalidate()
+    search_index.remove(sweet_id)
     return None
 
 @router.get("/categories/list", response_model=List[str])
-def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Sweet.category).filter(Sweet.is_available == True).distinct().all()
-    return sorted([category[0] for category in categories])
+async def get_categories(request: Request, db: Session = Depends(get_db)):
+    def build(db: Session):
+        categories = db.query(Sweet.category).filter(Sweet.is_available == True).distinct().all()
+        return json.dumps(sorted([category[0] for category in categories]), separators=(",", ":")).encode()
+
+    return await _cached_response(request, db, "categories", build)
@@ -0,0 +1,108 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app.core.analytics import backfill_sales
+from app.core.archive import archive_cutoff, archive_old_purchases
+from app.core.catalog_cache import catalog_cache
+from app.core.catalog_import import import_sweets, read_records
+from app.core.config import settings
+from app.database import SessionLocal, create_schema
+
+def migrate(args):
+    create_schema()
+    print("Database schema is up to date")
+
+def run_server(args):
+    from app.server import serve
+    
+    if args.migrate:
+        create_schema()
+    serve(args.host, args.port, args.workers, args.graceful_timeout)
+
+def backfill_analytics(args):
+    create_schema()
+    with SessionLocal() as db:
+        sweets = backfill_sales(db)
+    print(f"Rebuilt sales summaries for {sweets} sweets")
+
+def archive_purchases(args):
+    create_schema()
+    before = archive_cutoff(args.months)
+    archived = archive_old_purchases(SessionLocal, before, args.batch_size)
+    print(f"Archived {archived} purchases made before {before.date().isoformat()}")
+
+IMPORT_SUFFIXES = {".csv": "csv", ".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+def import_catalog(args):
+    import_format = args.format or IMPORT_SUFFIXES.get(args.path.suffix.lower())
+    if import_format is None:
+        sys.exit(f"Cannot tell the format of {args.path}; pass --format")
+    create_schema()
+    with open(args.path, "rb") as upload, SessionLocal() as db:
+        report = import_sweets(db, read_records(upload, import_format))
+    # This only reaches running servers through a shared cache: with
+    # CACHE_BACKEND=memory it clears this process's own cache, and servers
+    # keep their catalog until CATALOG_CACHE_TTL_SECONDS and their in-memory
+    # search index until SEARCH_INDEX_REFRESH_SECONDS.
+    if report["created"] or report["updated"]:
+        catalog_cache.invalidate()
+    for error in report["errors"]:
+        print(f"row {error['row']}: {'; '.join(error['errors'])}", file=sys.stderr)
+    print(json.dumps({key: value for key, value in report.items() if key != "errors"}))
+    if report["failed"]:
+        sys.exit(1)
+
+def main(argv=None, prog="python -m app"):
+    parser = argparse.ArgumentParser(prog=prog, description="Sweet Shop server and maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    server = commands.add_parser("serve", help="Run the API server")
+    server.add_argument("--host", default="0.0.0.0")
+    server.add_argument("--port", type=int, default=8000)
+    server.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY)
+    server.add_argument(
+        "--graceful-timeout", type=float, default=settings.SHUTDOWN_GRACE_SECONDS,
+        help="Seconds a worker may spend finishing in-flight requests after SIGTERM",
+    )
+    server.add_argument("--migrate", action="store_true", help="Run migrate once before starting the workers")
+    server.set_defaults(handler=run_server)
+    
+    schema = commands.add_parser("migrate", help="Create missing tables and upgrade existing ones")
+    schema.set_defaults(handler=migrate)
+    
+    backfill = commands.add_parser(
+        "backfill-analytics",
+        help="Rebuild the sales summary tables from the live and archived purchases",
+    )
+    backfill.set_defaults(handler=backfill_analytics)
+    
+    archive = commands.add_parser(
+        "archive-purchases",
+        help="Move purchases older than --months into purchases_archive, in batches",
+    )
+    archive.add_argument("--months", type=int, default=settings.PURCHASE_ARCHIVE_MONTHS)
+    archive.add_argument("--batch-size", type=int, default=settings.PURCHASE_ARCHIVE_BATCH)
+    archive.set_defaults(handler=archive_purchases)
+    
+    catalog = commands.add_parser(
+        "import-sweets",
+        help="Create or update sweets, matched by name, from a CSV, JSON or NDJSON file",
+        description=(
+            "Create or update sweets, matched by name, from a CSV, JSON or NDJSON file. "
+            "Running servers only drop their cached catalog straight away with CACHE_BACKEND=redis; "
+            "otherwise they serve it until CATALOG_CACHE_TTL_SECONDS runs out, and the in-memory search "
+            "index picks the changes up within SEARCH_INDEX_REFRESH_SECONDS. "
+            "Use POST /api/sweets/bulk for changes that must show at once."
+        ),
+    )
+    catalog.add_argument("path", type=Path)
+    catalog.add_argument("--format", choices=sorted(set(IMPORT_SUFFIXES.values())))
+    catalog.set_defaults(handler=import_catalog)
+    
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main(prog="python -m app.cli")
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Date, cast, delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core.archive import purchase_history
+from app.database import upsert
+from app.models.analytics import DailySweetSales, SweetSales
+
+SALES_COLUMNS = ("quantity", "revenue", "orders")
+
+
+def sale_day(created_at: datetime) -> date:
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def _accumulate(db: Session, model, keys, totals: dict):
+    stmt = upsert(db, model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: getattr(model, column) + getattr(stmt.excluded, column) for column in SALES_COLUMNS},
+    )
+    # Sorted keys keep the row lock order stable between concurrent writers.
+    db.execute(stmt, [
+        dict(zip(keys, key if isinstance(key, tuple) else (key,)), **dict(zip(SALES_COLUMNS, values)))
+        for key, values in sorted(totals.items())
+    ])
+
+
+def record_sales(db: Session, purchases):
+    # Runs inside the purchase transaction. Every row touched is keyed by a
+    # sweet whose stock row the transaction already holds locked, so the
+    # summaries add no new lock contention between buyers.
+    daily = {}
+    by_sweet = {}
+    for purchase in purchases:
+        for totals, key in (
+            (daily, (sale_day(purchase["created_at"]), purchase["sweet_id"])),
+            (by_sweet, purchase["sweet_id"]),
+        ):
+            quantity, revenue, orders = totals.get(key, (0, 0.0, 0))
+            totals[key] = (quantity + purchase["quantity"], revenue + purchase["total_price"], orders + 1)
+    if by_sweet:
+        _accumulate(db, DailySweetSales, ["day", "sweet_id"], daily)
+        _accumulate(db, SweetSales, ["sweet_id"], by_sweet)
+
+
+def backfill_sales(db: Session) -> int:
+    # Archived purchases still count towards the summaries.
+    purchases = purchase_history(include_archived=True).c
+    if db.get_bind().dialect.name == "postgresql":
+        # Holds off new purchases and the archiver until the rebuilt
+        # summaries are committed.
+        db.execute(text("LOCK TABLE purchases, purchases_archive IN SHARE MODE"))
+        day = cast(func.timezone("UTC", purchases.created_at), Date)
+    else:
+        day = func.date(purchases.created_at)
+
+    totals = (func.sum(purchases.quantity), func.sum(purchases.total_price), func.count(purchases.id))
+    completed = purchases.status == "completed"
+    db.execute(delete(DailySweetSales))
+    db.execute(delete(SweetSales))
+    db.execute(insert(DailySweetSales).from_select(
+        ["day", "sweet_id", *SALES_COLUMNS],
+        select(day, purchases.sweet_id, *totals).where(completed).group_by(day, purchases.sweet_id),
+    ))
+    result = db.execute(insert(SweetSales).from_select(
+        ["sweet_id", *SALES_COLUMNS],
+        select(purchases.sweet_id, *totals).where(completed).group_by(purchases.sweet_id),
+    ))
+    db.commit()
+    return result.rowcount
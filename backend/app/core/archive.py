@@ -0,0 +1,73 @@
+import calendar
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.metrics import Counter
+from app.models.purchase import Purchase
+from app.models.purchase_archive import PurchaseArchive
+
+archived_purchases = Counter(
+    "purchases_archived_total",
+    "Purchases moved from purchases to purchases_archive",
+)
+
+HISTORY_COLUMNS = ("id", "user_id", "sweet_id", "quantity", "unit_price", "total_price", "status", "created_at")
+
+
+def months_before(moment: datetime, months: int) -> datetime:
+    month = moment.month - 1 - months
+    year = moment.year + month // 12
+    month = month % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, calendar.monthrange(year, month)[1]))
+
+
+def archive_cutoff(months: int, now: datetime = None) -> datetime:
+    return months_before(now or datetime.now(timezone.utc), months)
+
+
+def purchase_history(include_archived: bool):
+    # Queries select from the returned table's columns either way; with the
+    # archive included they read both tables as one, and filters on user_id
+    # or created_at are pushed into each side of the UNION ALL.
+    if not include_archived:
+        return Purchase.__table__
+    return union_all(
+        select(*(getattr(Purchase, column) for column in HISTORY_COLUMNS)),
+        select(*(getattr(PurchaseArchive, column) for column in HISTORY_COLUMNS)),
+    ).subquery("purchase_history")
+
+
+def archive_purchases(db: Session, before: datetime, limit: int) -> int:
+    # One bounded batch per transaction: the oldest purchases come off the
+    # created_at index, are copied with their ids and deleted in the same
+    # commit, so a purchase is always in exactly one of the two tables.
+    # SKIP LOCKED lets concurrent archivers split the work on PostgreSQL.
+    due = db.scalars(
+        select(Purchase.id)
+        .where(Purchase.created_at < before)
+        .order_by(Purchase.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not due:
+        return 0
+    db.execute(insert(PurchaseArchive).from_select(
+        list(HISTORY_COLUMNS),
+        select(*(getattr(Purchase, column) for column in HISTORY_COLUMNS)).where(Purchase.id.in_(due)),
+    ))
+    db.execute(delete(Purchase).where(Purchase.id.in_(due)))
+    db.commit()
+    archived_purchases.inc((), len(due))
+    return len(due)
+
+
+def archive_old_purchases(session_factory, before: datetime, batch_size: int) -> int:
+    archived = 0
+    while True:
+        with session_factory() as db:
+            batch = archive_purchases(db, before, batch_size)
+        archived += batch
+        if batch < batch_size:
+            return archived
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+VERSION_KEY = "catalog:version"
+
+
+class InMemoryCacheBackend:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key in self._counters:
+                return str(self._counters[key]).encode()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCacheBackend:
+    def __init__(self, url: str, prefix: str = "sweetshop:"):
+        self._client = get_redis(url)
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self._prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        self._client.set(self._prefix + key, value, ex=ttl or None)
+
+    def incr(self, key: str) -> int:
+        return self._client.incr(self._prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._prefix + "catalog:*"):
+            self._client.delete(key)
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    headers: Dict[str, str]
+    body: bytes
+
+    def encode(self) -> bytes:
+        meta = json.dumps({"etag": self.etag, "headers": self.headers}).encode()
+        return meta + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "CachedResponse":
+        meta, body = raw.split(b"\n", 1)
+        meta = json.loads(meta)
+        return cls(meta["etag"], meta["headers"], body)
+
+
+BuildResult = Union[bytes, Tuple[bytes, Dict[str, str]]]
+
+
+class CatalogCache:
+    def __init__(self, backend, ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    def version(self) -> int:
+        return int(self.backend.get(VERSION_KEY) or 0)
+
+    def fetch(self, key: str, build: Callable[[], BuildResult]) -> CachedResponse:
+        # Entries are keyed by the catalog version read *before* querying the
+        # database, so a response built from rows older than a concurrent
+        # write can only ever be stored under an already-retired version.
+        versioned_key = f"catalog:v{self.version()}:{key}"
+        raw = self.backend.get(versioned_key)
+        if raw is not None:
+            return CachedResponse.decode(raw)
+
+        result = build()
+        body, headers = result if isinstance(result, tuple) else (result, {})
+        entry = CachedResponse(f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', headers, body)
+        self.backend.set(versioned_key, entry.encode(), self.ttl_seconds)
+        return entry
+
+    def invalidate(self):
+        self.backend.incr(VERSION_KEY)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def make_cache_backend(kind: str):
+    if kind == "redis":
+        return RedisCacheBackend(settings.REDIS_URL)
+    return InMemoryCacheBackend(settings.CATALOG_CACHE_SIZE)
+
+
+def cached_json_response(request: Request, entry: CachedResponse) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **entry.headers}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if entry.etag in tags or "*" in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+catalog_cache = CatalogCache(make_cache_backend(settings.CACHE_BACKEND), settings.CATALOG_CACHE_TTL_SECONDS)
@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+import tempfile
+from typing import IO, Iterator, Literal, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.stock_events import stock_broker
+from app.database import upsert
+from app.models.sweet import Sweet
+from app.schemas.sweet import SweetCreate
+
+ImportFormat = Literal["csv", "json", "ndjson"]
+
+IMPORT_MEDIA_TYPES = {
+    "text/csv": "csv",
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+}
+
+IMPORT_COLUMNS = list(SweetCreate.model_fields)
+MAX_REPORTED_ERRORS = 100
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+
+def import_format(content_type: Optional[str], requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type not in IMPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv, application/json or application/x-ndjson, or pass format"
+        )
+    return IMPORT_MEDIA_TYPES[media_type]
+
+
+async def spool_request_body(request: Request) -> IO[bytes]:
+    # Large uploads spill to disk instead of being held in memory.
+    upload = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    async for chunk in request.stream():
+        upload.write(chunk)
+    upload.seek(0)
+    return upload
+
+
+def read_records(upload: IO[bytes], import_format: str) -> Iterator[Tuple[int, object]]:
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    if import_format == "csv":
+        for row, record in enumerate(csv.DictReader(text), start=1):
+            # Empty cells leave optional fields unset.
+            yield row, {key: value for key, value in record.items() if key is not None and value != ""}
+    elif import_format == "ndjson":
+        row = 0
+        for line in text:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                yield row, json.loads(line)
+            except ValueError:
+                yield row, ValueError("Invalid JSON")
+    else:
+        try:
+            records = json.load(text)
+        except ValueError:
+            records = None
+        if not isinstance(records, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array of sweets"
+            )
+        yield from enumerate(records, start=1)
+
+
+def _fail(report: dict, row: int, errors):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": row, "errors": errors})
+
+
+def _upsert_sweets(db: Session, values) -> list:
+    stmt = upsert(db, Sweet)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Sweet.name],
+        index_where=Sweet.deleted_at.is_(None),
+        set_={**{column: stmt.excluded[column] for column in IMPORT_COLUMNS}, "updated_at": func.now()},
+    )
+    return db.execute(stmt.returning(Sweet.id, Sweet.quantity, Sweet.is_available), values).all()
+
+
+def _write_chunk(db: Session, chunk: dict, report: dict):
+    names = list(chunk)
+    existing = len(db.execute(select(Sweet.name).where(Sweet.name.in_(names), Sweet.deleted_at.is_(None))).all())
+    try:
+        levels = _upsert_sweets(db, [values for _, values, _ in chunk.values()])
+        db.commit()
+    except Exception:
+        db.rollback()
+        if len(chunk) == 1:
+            row, _, repeats = next(iter(chunk.values()))
+            _fail(report, row, ["Could not be saved"])
+            # Earlier rows with the same name were folded into this one and
+            # were not saved either.
+            report["failed"] += repeats
+            return
+        # Isolate the rows the database rejected; the rest are still loaded.
+        for name in names:
+            _write_chunk(db, {name: chunk[name]}, report)
+        return
+    stock_broker.publish(levels)
+    report["created"] += len(chunk) - existing
+    report["updated"] += existing + sum(repeats for _, _, repeats in chunk.values())
+
+
+def import_sweets(db: Session, records) -> dict:
+    report = {"received": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+    chunk = {}
+    for row, record in records:
+        report["received"] += 1
+        if isinstance(record, Exception):
+            _fail(report, row, [str(record)])
+            continue
+        try:
+            sweet = SweetCreate.model_validate(record)
+        except ValidationError as exc:
+            _fail(report, row, [
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                for error in exc.errors()
+            ])
+            continue
+        # A name repeated within a chunk is applied once, with its last values;
+        # the earlier rows count as updates once the chunk is saved.
+        repeats = chunk[sweet.name][2] + 1 if sweet.name in chunk else 0
+        chunk[sweet.name] = (row, sweet.model_dump(), repeats)
+        if len(chunk) >= settings.IMPORT_CHUNK_ROWS:
+            _write_chunk(db, chunk, report)
+            chunk = {}
+    if chunk:
+        _write_chunk(db, chunk, report)
+    return report
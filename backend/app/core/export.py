@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Literal, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+ExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def created_between(column, start: Optional[date], end: Optional[date]):
+    if start and end and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    conditions = []
+    if start:
+        conditions.append(column >= datetime.combine(start, time.min, timezone.utc))
+    if end:
+        conditions.append(column < datetime.combine(end + timedelta(days=1), time.min, timezone.utc))
+    return conditions
+
+
+def _value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_rows(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _encoder(columns, export_format: ExportFormat):
+    if export_format == "csv":
+        return lambda rows: _csv_rows([_value(row[column]) for column in columns] for row in rows)
+    return lambda rows: "".join(
+        json.dumps({column: _value(row[column]) for column in columns}) + "\n" for row in rows
+    ).encode()
+
+
+# Exports outlive the request's session, so they stream from a session of their
+# own on the same engine. yield_per keeps a server-side cursor open and fetches
+# EXPORT_CHUNK_ROWS rows at a time; each chunk is sent as soon as it is encoded.
+def _sync_chunks(bind, query, header: bytes, encode):
+    if header:
+        yield header
+    with Session(bind=bind) as db:
+        result = db.execute(query.execution_options(yield_per=settings.EXPORT_CHUNK_ROWS))
+        for rows in result.mappings().partitions():
+            yield encode(rows)
+
+
+async def _async_chunks(bind, query, header: bytes, encode):
+    if header:
+        yield header
+    async with AsyncSession(bind=bind) as db:
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_CHUNK_ROWS))
+        async for rows in result.mappings().partitions():
+            yield encode(rows)
+
+
+def stream_export(db, query, columns, export_format: ExportFormat, filename: str) -> StreamingResponse:
+    header = _csv_rows([columns]) if export_format == "csv" else b""
+    encode = _encoder(columns, export_format)
+    if isinstance(db, AsyncSession):
+        chunks = _async_chunks(db.bind, query, header, encode)
+    else:
+        chunks = _sync_chunks(db.get_bind(), query, header, encode)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
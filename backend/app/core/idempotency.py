@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from types import SimpleNamespace
+from typing import List, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.redis import get_redis
+
+idempotent_replays = Counter(
+    "idempotent_replays_total",
+    "Requests answered from a stored response for a repeated Idempotency-Key",
+    ("route",),
+)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.05
+
+OWNED = object()
+MISMATCH = object()
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+    def encode(self) -> bytes:
+        headers = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in self.headers]
+        return json.dumps({"status": self.status, "headers": headers}).encode() + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "StoredResponse":
+        meta, body = raw.split(b"\n", 1)
+        meta = json.loads(meta)
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in meta["headers"]]
+        return cls(meta["status"], headers, body)
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires_at", "response", "done")
+
+    def __init__(self, fingerprint: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.response = None
+        self.done = Future()
+
+
+def _wake(entry: _Entry):
+    # Requests waiting on a dropped in-flight entry retry their claim.
+    if not entry.done.done():
+        entry.done.set_result(None)
+
+
+class InMemoryIdempotencyStore:
+    blocking = False
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, fingerprint: bytes):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = _Entry(fingerprint, now + self.ttl_seconds)
+                while len(self._entries) > self.maxsize:
+                    _wake(self._entries.popitem(last=False)[1])
+                return OWNED
+            if entry.fingerprint != fingerprint:
+                return MISMATCH
+            return entry.response or entry.done
+
+    def complete(self, key: str, response: StoredResponse):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.response = response
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+        entry.done.set_result(response)
+
+    def release(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            _wake(entry)
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            _wake(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, now: float):
+        # Entries sit in expiry order (a completed entry moves to the end with
+        # a fresh TTL), so eviction stops at the first live one.
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now:
+                break
+            del self._entries[key]
+            _wake(entry)
+
+
+class RedisIdempotencyStore:
+    blocking = True
+
+    def __init__(self, url: str, ttl_seconds: int, lock_seconds: float, prefix: str = "sweetshop:idempotency:"):
+        self._client = get_redis(url)
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = max(int(lock_seconds), 1)
+        self._prefix = prefix
+
+    def claim(self, key: str, fingerprint: bytes):
+        # A pending marker expires on its own, so a worker that dies mid-request
+        # does not block the key for the whole TTL.
+        raw_key = self._prefix + key
+        if self._client.set(raw_key, b"pending:" + fingerprint, nx=True, ex=self.lock_seconds):
+            return OWNED
+        raw = self._client.get(raw_key)
+        if raw is None:
+            return None
+        stored_fingerprint, _, response = raw.partition(b"\n")
+        if stored_fingerprint.removeprefix(b"pending:") != fingerprint:
+            return MISMATCH
+        if stored_fingerprint.startswith(b"pending:"):
+            return None
+        return StoredResponse.decode(response)
+
+    def complete(self, key: str, response: StoredResponse):
+        raw = self._client.get(self._prefix + key)
+        if raw is None:
+            return
+        fingerprint = raw.partition(b"\n")[0].removeprefix(b"pending:")
+        self._client.set(self._prefix + key, fingerprint + b"\n" + response.encode(), ex=self.ttl_seconds)
+
+    def release(self, key: str):
+        self._client.delete(self._prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+
+def make_idempotency_store(kind: str):
+    if kind == "redis":
+        return RedisIdempotencyStore(
+            settings.REDIS_URL, settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_WAIT_SECONDS
+        )
+    return InMemoryIdempotencyStore(settings.IDEMPOTENCY_STORE_SIZE, settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+async def _json_response(send, status_code: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, store, paths, wait_seconds: float):
+        self.app = app
+        self.store = store
+        self.paths = frozenset(paths)
+        self.wait_seconds = wait_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = _header(scope, IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        # Answers given here never reach the router; the paths are static
+        # templates, so metrics can still label them by route.
+        scope["route"] = SimpleNamespace(path_format=scope["path"])
+        if not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+            await _json_response(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        messages = []
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request" or not message.get("more_body", False):
+                break
+        body = b"".join(message.get("body", b"") for message in messages)
+
+        # Keys are scoped to the caller's credentials, so two users sending the
+        # same key never see each other's responses.
+        key = hashlib.sha256(b"\0".join((
+            scope["path"].encode(), _header(scope, b"authorization") or b"", idempotency_key,
+        ))).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest().encode()
+
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            outcome = await self._call(self.store.claim, key, fingerprint)
+            if outcome is OWNED:
+                break
+            if outcome is MISMATCH:
+                await _json_response(send, 422, "Idempotency-Key was already used with a different request body")
+                return
+            if isinstance(outcome, StoredResponse):
+                idempotent_replays.inc((scope["path"],))
+                await self._replay(send, outcome)
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await _json_response(send, 409, "A request with this Idempotency-Key is still in progress")
+                return
+            # Concurrent duplicates wait for the first request to finish and
+            # then take its stored response (or the key, if it failed).
+            if outcome is None:
+                await asyncio.sleep(min(POLL_SECONDS, remaining))
+            else:
+                await asyncio.wait([asyncio.wrap_future(outcome)], timeout=remaining)
+
+        del scope["route"]
+        await self._execute(scope, messages, send, key)
+
+    async def _execute(self, scope, messages, send, key: str):
+        replay = iter(messages)
+
+        async def receive_body():
+            return next(replay, {"type": "http.disconnect"})
+
+        start = None
+        chunks = []
+
+        async def send_and_record(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_record)
+        except BaseException:
+            await self._call(self.store.release, key)
+            raise
+        # Server errors are not stored, so the client's retry runs again.
+        if start is None or start["status"] >= 500:
+            await self._call(self.store.release, key)
+            return
+        response = StoredResponse(start["status"], list(start.get("headers", [])), b"".join(chunks))
+        await self._call(self.store.complete, key, response)
+
+    async def _replay(self, send, response: StoredResponse):
+        await send({
+            "type": "http.response.start",
+            "status": response.status,
+            "headers": [*response.headers, (b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": response.body})
+
+    async def _call(self, fn, *args):
+        if self.store.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+
+idempotency_store = make_idempotency_store(settings.IDEMPOTENCY_BACKEND)
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import NamedTuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert
+
+from app.core.analytics import record_sales
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.core.stock_events import stock_broker
+from app.core.stock import PURCHASE_COLUMNS, decrement_stock, raise_purchase_error
+from app.database import SessionLocal
+from app.models.purchase import Purchase
+
+logger = logging.getLogger(__name__)
+
+batch_sizes = Histogram(
+    "purchase_ledger_batch_size",
+    "Purchases committed per group-commit transaction",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+_STOP = object()
+
+
+class PendingPurchase(NamedTuple):
+    user_id: int
+    sweet_id: int
+    quantity: int
+    future: Future
+
+
+# Crash safety: a caller's future resolves only after the transaction holding
+# its purchase has committed, so a confirmed purchase is as durable as one
+# committed on its own. Purchases still queued, or in a batch that has not
+# committed, when the process dies are lost whole (never partially applied)
+# and none of them was confirmed to its caller. stop() drains the queue.
+class PurchaseLedger:
+    def __init__(self, session_factory, max_batch: int, max_delay_ms: float, queue_size: int):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.batches = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="purchase-ledger", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, user_id: int, sweet_id: int, quantity: int) -> Future:
+        self.start()
+        future = Future()
+        try:
+            self._queue.put_nowait(PendingPurchase(user_id, sweet_id, quantity, future))
+        except queue.Full:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many pending purchases, please retry",
+                headers={"Retry-After": "1"},
+            )
+        return future
+
+    async def purchase(self, user_id: int, sweet_id: int, quantity: int) -> dict:
+        return await asyncio.wrap_future(self.submit(user_id, sweet_id, quantity))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # Everything that queued up during the previous commit joins this
+            # batch; max_delay optionally holds the batch open a little longer.
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            # Requests whose caller went away before the write are dropped;
+            # the rest can no longer be cancelled.
+            batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch):
+        try:
+            results = self._apply(batch)
+        except Exception:
+            if len(batch) == 1:
+                logger.exception("Group-commit purchase failed")
+                batch[0].future.set_exception(HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Purchase could not be recorded, please retry",
+                ))
+                return
+            # Isolate whatever broke the shared transaction.
+            for pending in batch:
+                self._commit([pending])
+            return
+
+        self.batches += 1
+        batch_sizes.observe((), len(batch))
+        for pending, result in zip(batch, results):
+            if isinstance(result, Exception):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    def _apply(self, batch) -> list:
+        with self.session_factory() as db:
+            results = []
+            accepted = []
+            sweets = []
+            for pending in batch:
+                sweet = decrement_stock(db, pending.sweet_id, pending.quantity)
+                if sweet is None:
+                    try:
+                        raise_purchase_error(db, pending.sweet_id, pending.quantity)
+                    except HTTPException as exc:
+                        results.append(exc)
+                    continue
+                results.append(None)
+                sweets.append(sweet)
+                accepted.append(dict(
+                    user_id=pending.user_id,
+                    sweet_id=pending.sweet_id,
+                    quantity=pending.quantity,
+                    unit_price=sweet.price,
+                    total_price=sweet.price * pending.quantity,
+                    status="completed",
+                ))
+
+            if accepted:
+                rows = db.execute(
+                    insert(Purchase).returning(*PURCHASE_COLUMNS, sort_by_parameter_order=True),
+                    accepted,
+                ).mappings().all()
+                record_sales(db, rows)
+                purchases = iter(
+                    dict(row, sweet_name=sweet.name, stock_quantity=sweet.quantity)
+                    for row, sweet in zip(rows, sweets)
+                )
+                results = [next(purchases) if result is None else result for result in results]
+            db.commit()
+        # Later purchases of a sweet in the batch carry its final level.
+        stock_broker.publish({
+            result["sweet_id"]: (result["sweet_id"], result["stock_quantity"], True)
+            for result in results if isinstance(result, dict)
+        }.values())
+        return results
+
+
+purchase_ledger = PurchaseLedger(
+    SessionLocal,
+    settings.PURCHASE_BATCH_SIZE,
+    settings.PURCHASE_BATCH_DELAY_MS,
+    settings.PURCHASE_QUEUE_SIZE,
+)
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.db.slow")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, labels=(), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, labels, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (not cumulative) plus the +Inf bucket, sum.
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template and status",
+    ("method", "route", "status"),
+)
+http_request_db_queries = Histogram(
+    "http_request_db_queries",
+    "Database statements executed per request",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+http_request_db_duration = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database statements per request",
+    ("method", "route"),
+)
+db_query_duration = Histogram("db_query_duration_seconds", "Duration of every database statement")
+db_slow_queries = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS")
+
+
+class RequestStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# The stats object is shared, not copied, with the threadpool and the async
+# session greenlets, so statements run there are counted against the request.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+    db_query_duration.observe((), elapsed)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        db_slow_queries.inc()
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_query_timer(context):
+    started = context.connection.info.get("query_started_at") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    # Static routes such as /docs carry no path parameters; anything that
+    # matched no route is folded into one label to bound cardinality.
+    return scope["path"] if "endpoint" in scope else "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(token)
+            route = route_template(scope)
+            http_request_duration.observe((scope["method"], route, status_code), elapsed)
+            http_request_db_queries.observe((scope["method"], route), stats.queries)
+            http_request_db_duration.observe((scope["method"], route), stats.seconds)
+
+
+POOL_GAUGES = ("size", "checked_in", "checked_out", "overflow")
+POOL_COUNTERS = ("checkouts", "timeouts", "overflow_events")
+
+
+def _pool_samples(pools: dict):
+    for field in POOL_GAUGES:
+        yield f"# TYPE db_pool_{field} gauge"
+        for name, status in pools.items():
+            if field in status:
+                yield f'db_pool_{field}{{engine="{_escape(name)}"}} {status[field]}'
+    for field in POOL_COUNTERS:
+        yield f"# TYPE db_pool_{field}_total counter"
+        for name, status in pools.items():
+            if field in status:
+                yield f'db_pool_{field}_total{{engine="{_escape(name)}"}} {status[field]}'
+    yield "# TYPE db_pool_checkout_seconds histogram"
+    for name, status in pools.items():
+        if "checkout_seconds_buckets" not in status:
+            continue
+        engine = _escape(name)
+        for bound, count in status["checkout_seconds_buckets"].items():
+            yield f'db_pool_checkout_seconds_bucket{{engine="{engine}",le="{bound}"}} {count}'
+        yield f'db_pool_checkout_seconds_bucket{{engine="{engine}",le="+Inf"}} {status["checkouts"]}'
+        yield f'db_pool_checkout_seconds_sum{{engine="{engine}"}} {status["checkout_seconds_total"]}'
+        yield f'db_pool_checkout_seconds_count{{engine="{engine}"}} {status["checkouts"]}'
+
+
+def render_metrics(pools: dict) -> str:
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    lines.extend(_pool_samples(pools))
+    return "\n".join(lines) + "\n"
+
+
+def clear():
+    for metric in registry:
+        metric.clear()
@@ -0,0 +1,55 @@
+import base64
+import json
+from typing import Dict, List
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+
+def encode_cursor(values: List) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _matches(value, kind) -> bool:
+    # JSON true and false decode to bool, which Python counts as an int.
+    return isinstance(value, kind) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, *kinds) -> List:
+    # Each value must have the type given for its position, since it is bound
+    # straight into the keyset comparison.
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != len(kinds) or not all(map(_matches, values, kinds)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+
+def next_cursor_headers(request: Request, cursor: str) -> Dict[str, str]:
+    next_url = request.url.include_query_params(cursor=cursor)
+    return {"X-Next-Cursor": cursor, "Link": f'<{next_url}>; rel="next"'}
+
+
+def set_next_cursor(request: Request, response: Response, cursor: str):
+    response.headers.update(next_cursor_headers(request, cursor))
+
+
+def approximate_count(db: Session, model, *filters) -> int:
+    # On PostgreSQL the planner's row estimate is free to read and good enough
+    # for a pager; it covers the whole table, so filters are not applied.
+    if db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": model.__tablename__},
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.execute(select(func.count()).select_from(model).where(*filters)).scalar_one()
@@ -0,0 +1,204 @@
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Dict, NamedTuple, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.redis import get_redis
+from app.core.security import decode_access_token
+from app.core.token_cache import token_cache
+
+rate_limited_requests = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by the rate limiter",
+    ("route",),
+)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+RATE_PATTERN = re.compile(r"(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day|s)")
+
+
+class RateLimit(NamedTuple):
+    capacity: int
+    period: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_rate(rate: str) -> RateLimit:
+    match = RATE_PATTERN.fullmatch(rate.strip())
+    if match is None:
+        raise ValueError(f"Invalid rate limit {rate!r}, expected e.g. '10/minute' or '5/30s'")
+    count, multiple, unit = match.groups()
+    period = int(multiple or 1) * PERIODS.get(unit, 1)
+    if int(count) <= 0 or period <= 0:
+        raise ValueError(f"Invalid rate limit {rate!r}")
+    return RateLimit(int(count), period)
+
+
+def parse_rate_limits(spec: str) -> Dict[Tuple[str, str], RateLimit]:
+    # "POST /api/auth/login=10/minute, GET /api/sweets/search=120/minute"
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, rate = item.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        if not path:
+            raise ValueError(f"Invalid rate limit route {route!r}, expected 'METHOD /path'")
+        limits[(method.upper(), path.strip())] = parse_rate(rate)
+    return limits
+
+
+class InMemoryBucketStore:
+    blocking = False
+
+    def __init__(self, idle_seconds: float, clock=time.monotonic):
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit) -> float:
+        now = self._clock()
+        with self._lock:
+            # Buckets sit in last-used order. One left alone for idle_seconds
+            # (the longest refill period) is full again, which is the same as
+            # having no bucket, so it is dropped.
+            while self._buckets:
+                oldest = next(iter(self._buckets.values()))
+                if now - oldest[1] < self.idle_seconds:
+                    break
+                self._buckets.popitem(last=False)
+
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(limit.capacity), now]
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.refill_per_second)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / limit.refill_per_second
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Refill and take in one round trip, against the Redis server's clock so every
+# worker sees the same bucket. Returns the seconds to wait, 0 when allowed.
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(bucket[1]) or capacity
+local stamp = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - stamp, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "sweetshop:ratelimit:"):
+        self._client = get_redis(url)
+        self._prefix = prefix
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    def take(self, key: str, limit: RateLimit) -> float:
+        return float(self._take(keys=[self._prefix + key], args=[limit.capacity, limit.refill_per_second]))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+
+def make_bucket_store(kind: str, limits: Dict[Tuple[str, str], RateLimit]):
+    if kind == "redis":
+        return RedisBucketStore(settings.REDIS_URL)
+    return InMemoryBucketStore(max((limit.period for limit in limits.values()), default=0))
+
+
+def client_key(scope) -> str:
+    # Authenticated callers get their own bucket wherever they connect from;
+    # everyone else is bucketed by address.
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                break
+            user = token_cache.get(token)
+            if user is not None:
+                return "user:" + user.email
+            claims = decode_access_token(token)
+            if claims and claims.get("sub"):
+                return "user:" + claims["sub"]
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, store, limits: Dict[Tuple[str, str], RateLimit]):
+        self.app = app
+        self.store = store
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get((scope["method"], scope["path"])) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{scope['method']} {scope['path']}|{client_key(scope)}"
+        if self.store.blocking:
+            wait = await run_in_threadpool(self.store.take, key, limit)
+        else:
+            wait = self.store.take(key, limit)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        # Limited paths are static templates, so metrics can label the 429.
+        scope["route"] = SimpleNamespace(path_format=scope["path"])
+        rate_limited_requests.inc((scope["path"],))
+        retry_after = max(math.ceil(wait), 1)
+        body = json.dumps({"detail": f"Too many requests, retry in {retry_after} seconds"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+rate_limits = parse_rate_limits(settings.RATE_LIMITS) if settings.RATE_LIMIT_ENABLED else {}
+rate_limit_store = make_bucket_store(settings.RATE_LIMIT_BACKEND, rate_limits)
@@ -0,0 +1,10 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_redis(url: str):
+    try:
+        import redis
+    except ImportError as exc:
+        raise RuntimeError("The 'redis' package is required for Redis-backed shared state") from exc
+    return redis.Redis.from_url(url)
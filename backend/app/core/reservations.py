@@ -0,0 +1,239 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.analytics import record_sales
+from app.core.catalog_cache import catalog_cache
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.stock import PURCHASE_COLUMNS, decrement_stock, raise_purchase_error
+from app.core.stock_events import stock_broker
+from app.database import SessionLocal
+from app.models.purchase import Purchase
+from app.models.reservation import Reservation
+from app.models.sweet import Sweet
+
+logger = logging.getLogger(__name__)
+
+expired_reservations = Counter(
+    "reservations_expired_total",
+    "Stock reservations released by the sweeper after their hold ran out",
+)
+
+RESERVATION_COLUMNS = [
+    Reservation.id,
+    Reservation.user_id,
+    Reservation.sweet_id,
+    Reservation.quantity,
+    Reservation.expires_at,
+    Reservation.created_at,
+]
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def reserve_stock(db: Session, user_id: int, sweet_id: int, quantity: int, ttl_minutes: int) -> dict:
+    # Held stock leaves Sweet.quantity straight away, through the same
+    # conditional decrement as a purchase, so holds can never oversell.
+    sweet = decrement_stock(db, sweet_id, quantity)
+    if sweet is None:
+        db.rollback()
+        raise_purchase_error(db, sweet_id, quantity)
+
+    row = db.execute(
+        insert(Reservation)
+        .values(
+            user_id=user_id,
+            sweet_id=sweet_id,
+            quantity=quantity,
+            expires_at=utcnow() + timedelta(minutes=ttl_minutes),
+        )
+        .returning(*RESERVATION_COLUMNS)
+    ).mappings().one()
+    db.commit()
+    stock_broker.publish([(sweet_id, sweet.quantity, True)])
+    return dict(row, sweet_name=sweet.name)
+
+
+def _claim(db: Session, *conditions) -> list:
+    # Deleting the row is the claim: of a conversion, a release and the
+    # sweeper racing for the same hold, exactly one gets it back.
+    if db.get_bind().dialect.delete_returning:
+        return db.execute(
+            delete(Reservation).where(*conditions).returning(Reservation.sweet_id, Reservation.quantity)
+        ).all()
+    held = db.execute(select(Reservation.id, Reservation.sweet_id, Reservation.quantity).where(*conditions)).all()
+    claimed = db.execute(delete(Reservation).where(Reservation.id.in_([row.id for row in held])))
+    if claimed.rowcount != len(held):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Reservation changed concurrently, please retry"
+        )
+    return [(row.sweet_id, row.quantity) for row in held]
+
+
+def _return_stock(db: Session, held) -> list:
+    returned = {}
+    for sweet_id, quantity in held:
+        returned[sweet_id] = returned.get(sweet_id, 0) + quantity
+    if not returned:
+        return []
+
+    stmt = (
+        update(Sweet)
+        .where(Sweet.id.in_(list(returned)))
+        .values(quantity=Sweet.quantity + case(returned, value=Sweet.id))
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(Sweet.id, Sweet.quantity, Sweet.is_available)).all()
+    db.execute(stmt)
+    return db.execute(
+        select(Sweet.id, Sweet.quantity, Sweet.is_available).where(Sweet.id.in_(list(returned)))
+    ).all()
+
+
+def release_reservation(db: Session, user_id: int, reservation_id: int):
+    held = _claim(db, Reservation.id == reservation_id, Reservation.user_id == user_id)
+    if not held:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reservation not found"
+        )
+    levels = _return_stock(db, held)
+    db.commit()
+    stock_broker.publish(levels)
+
+
+def convert_reservation(db: Session, user_id: int, reservation_id: int) -> dict:
+    mine = (Reservation.id == reservation_id, Reservation.user_id == user_id)
+    held = _claim(db, *mine, Reservation.expires_at > utcnow())
+    if not held:
+        # A hold that ran out but has not been swept yet is released here.
+        expired = _claim(db, *mine)
+        if expired:
+            levels = _return_stock(db, expired)
+            db.commit()
+            catalog_cache.invalidate()
+            stock_broker.publish(levels)
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Reservation has expired"
+            )
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reservation not found"
+        )
+
+    sweet_id, quantity = held[0]
+    sweet = db.execute(
+        select(Sweet.name, Sweet.price, Sweet.is_available).where(Sweet.id == sweet_id, Sweet.deleted_at.is_(None))
+    ).first()
+    if sweet is None or not sweet.is_available:
+        # The sweet was deleted or withdrawn while held: the hold goes back
+        # to stock instead of becoming a sale.
+        levels = _return_stock(db, held)
+        db.commit()
+        catalog_cache.invalidate()
+        stock_broker.publish(levels)
+        if sweet is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sweet not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sweet is not available for purchase"
+        )
+    row = db.execute(
+        insert(Purchase)
+        .values(
+            user_id=user_id,
+            sweet_id=sweet_id,
+            quantity=quantity,
+            unit_price=sweet.price,
+            total_price=sweet.price * quantity,
+            status="completed",
+        )
+        .returning(*PURCHASE_COLUMNS)
+    ).mappings().one()
+    record_sales(db, [row])
+    db.commit()
+    return dict(row, sweet_name=sweet.name)
+
+
+def release_expired(db: Session, limit: int, now: datetime = None) -> int:
+    # Walks the expires_at index from the oldest hold and stops at the first
+    # one still live, so a sweep reads only what it releases. SKIP LOCKED
+    # lets sweepers in several workers split the backlog on PostgreSQL.
+    due = (
+        select(Reservation.id)
+        .where(Reservation.expires_at <= (now or utcnow()))
+        .order_by(Reservation.expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    held = _claim(db, Reservation.id.in_(due))
+    levels = _return_stock(db, held)
+    db.commit()
+    if held:
+        catalog_cache.invalidate()
+    stock_broker.publish(levels)
+    expired_reservations.inc((), len(held))
+    return len(held)
+
+
+class ReservationSweeper:
+    def __init__(self, session_factory, interval_seconds: float, batch_size: int):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="reservation-sweeper", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join(timeout)
+
+    def sweep(self) -> int:
+        released = 0
+        while True:
+            with self.session_factory() as db:
+                batch = release_expired(db, self.batch_size)
+            released += batch
+            if batch < self.batch_size:
+                return released
+
+    def _run(self):
+        while not self._stopping.wait(self.interval_seconds):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Reservation sweep failed")
+
+
+reservation_sweeper = ReservationSweeper(
+    SessionLocal,
+    settings.RESERVATION_SWEEP_SECONDS,
+    settings.RESERVATION_SWEEP_BATCH,
+)
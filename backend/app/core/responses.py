@@ -0,0 +1,65 @@
+from functools import lru_cache
+from typing import Iterable, Mapping, Optional, Tuple, Type
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if settings.RESPONSE_FAST_PATH and orjson is None:
+    raise RuntimeError("The 'orjson' package is required for RESPONSE_FAST_PATH")
+
+
+class FastJSONResponse(JSONResponse):
+    # Renders the same bytes as JSONResponse: compact, UTF-8, keys in order.
+    # The one spelling orjson does differently is float exponents (1e16 rather
+    # than 1e+16), which no field the API returns gets near.
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def fast_path_enabled() -> bool:
+    return settings.RESPONSE_FAST_PATH and orjson is not None
+
+
+def default_response_class():
+    return FastJSONResponse if fast_path_enabled() else JSONResponse
+
+
+@lru_cache(maxsize=None)
+def _fields(schema: Type[BaseModel]) -> Tuple[Tuple[str, bool, object], ...]:
+    return tuple(
+        (name, field.is_required(), None if field.is_required() else field.default)
+        for name, field in schema.model_fields.items()
+    )
+
+
+def _shape(row: Mapping, schema: Type[BaseModel]) -> dict:
+    return {name: row[name] if required else row.get(name, default) for name, required, default in _fields(schema)}
+
+
+# Rows on the fast path come from typed columns, so they are encoded as they
+# are instead of being validated into the response model once more. orjson
+# writes datetimes and floats exactly as pydantic's JSON serializer does.
+def dump_rows(rows: Iterable[Mapping], schema: Type[BaseModel]) -> bytes:
+    return orjson.dumps([_shape(row, schema) for row in rows], option=orjson.OPT_UTC_Z)
+
+
+def dump_row(row: Mapping, schema: Type[BaseModel]) -> bytes:
+    return orjson.dumps(_shape(row, schema), option=orjson.OPT_UTC_Z)
+
+
+def rows_response(rows, schema: Type[BaseModel], response: Optional[Response] = None, status_code: int = 200):
+    # Off the fast path the rows go back to FastAPI, which validates them
+    # against the route's response_model as before.
+    if not fast_path_enabled():
+        return rows
+    result = Response(content=dump_rows(rows, schema), status_code=status_code, media_type="application/json")
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
@@ -0,0 +1,204 @@
+import bisect
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.sweet import Sweet, search_vector
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [token.lower() for token in TOKEN_RE.findall(text or "")]
+
+
+class SearchQuery(NamedTuple):
+    text: List[str]
+    name: List[str]
+    category: List[str]
+    min_price: Optional[float]
+    max_price: Optional[float]
+    skip: int
+    limit: int
+
+    @property
+    def terms(self):
+        for token in self.text:
+            yield token, tuple(FIELD_WEIGHTS)
+        for token in self.name:
+            yield token, ("name",)
+        for token in self.category:
+            yield token, ("category",)
+
+
+class _Document(NamedTuple):
+    name: str
+    price: float
+    is_available: bool
+    tokens: Dict[str, Set[str]]
+
+
+class InMemorySearchIndex:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._docs: Dict[int, _Document] = {}
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in FIELD_WEIGHTS}
+        self._vocabulary: Dict[str, List[str]] = {field: [] for field in FIELD_WEIGHTS}
+
+    def clear(self):
+        with self._lock:
+            self._built_at = None
+            self._reset()
+
+    def upsert(self, sweet):
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(sweet.id)
+                self._add(sweet.id, sweet.name, sweet.category, sweet.description, sweet.price, sweet.is_available)
+
+    def remove(self, sweet_id: int):
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(sweet_id)
+
+    def ensure_fresh(self, db: Session):
+        built_at = self._built_at
+        if built_at is not None and time.monotonic() - built_at < self.refresh_seconds:
+            return
+        rows = db.execute(
+            select(Sweet.id, Sweet.name, Sweet.category, Sweet.description, Sweet.price, Sweet.is_available)
+            .where(Sweet.deleted_at.is_(None))
+        ).all()
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(*row)
+            self._built_at = time.monotonic()
+
+    def search(self, db: Session, query: SearchQuery) -> List[int]:
+        self.ensure_fresh(db)
+        with self._lock:
+            scores = None
+            for token, fields in query.terms:
+                matches = self._match(token, fields)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {doc_id: scores[doc_id] + score for doc_id, score in matches.items() if doc_id in scores}
+                if not scores:
+                    return []
+            if scores is None:
+                scores = dict.fromkeys(self._docs, 0.0)
+
+            hits = []
+            for doc_id, score in scores.items():
+                doc = self._docs[doc_id]
+                if not doc.is_available:
+                    continue
+                if query.min_price is not None and doc.price < query.min_price:
+                    continue
+                if query.max_price is not None and doc.price > query.max_price:
+                    continue
+                hits.append((-score, doc.name, doc_id))
+        hits.sort()
+        return [doc_id for _, _, doc_id in hits[query.skip:query.skip + query.limit]]
+
+    def _match(self, token: str, fields) -> Dict[int, float]:
+        matches: Dict[int, float] = {}
+        for field in fields:
+            weight = FIELD_WEIGHTS[field]
+            vocabulary = self._vocabulary[field]
+            start = bisect.bisect_left(vocabulary, token)
+            for position in range(start, len(vocabulary)):
+                candidate = vocabulary[position]
+                if not candidate.startswith(token):
+                    break
+                score = weight if candidate == token else weight * PREFIX_FACTOR
+                for doc_id in self._postings[field][candidate]:
+                    if matches.get(doc_id, 0.0) < score:
+                        matches[doc_id] = score
+        return matches
+
+    def _reset(self):
+        self._docs = {}
+        self._postings = {field: {} for field in FIELD_WEIGHTS}
+        self._vocabulary = {field: [] for field in FIELD_WEIGHTS}
+
+    def _add(self, sweet_id, name, category, description, price, is_available):
+        tokens = {
+            "name": set(tokenize(name)),
+            "category": set(tokenize(category)),
+            "description": set(tokenize(description)),
+        }
+        self._docs[sweet_id] = _Document(name, price, bool(is_available), tokens)
+        for field, field_tokens in tokens.items():
+            postings = self._postings[field]
+            for token in field_tokens:
+                if token not in postings:
+                    postings[token] = set()
+                    bisect.insort(self._vocabulary[field], token)
+                postings[token].add(sweet_id)
+
+    def _remove(self, sweet_id: int):
+        doc = self._docs.pop(sweet_id, None)
+        if doc is None:
+            return
+        for field, field_tokens in doc.tokens.items():
+            postings = self._postings[field]
+            for token in field_tokens:
+                ids = postings[token]
+                ids.discard(sweet_id)
+                if not ids:
+                    del postings[token]
+                    vocabulary = self._vocabulary[field]
+                    del vocabulary[bisect.bisect_left(vocabulary, token)]
+
+
+class PostgresSearch:
+    def search(self, db: Session, query: SearchQuery) -> List[int]:
+        # Each kind of term is matched against its own GIN-indexed vector: GIN
+        # cannot filter on weight labels, so restricting a term to the name
+        # through the combined document would recheck every description hit.
+        vectors = (
+            (Sweet.search_document(), query.text),
+            (search_vector(Sweet.name), query.name),
+            (search_vector(Sweet.category), query.category),
+        )
+        stmt = select(Sweet.id).where(Sweet.is_available == True)
+        ranks = []
+        for vector, tokens in vectors:
+            if tokens:
+                tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{token}:*" for token in tokens))
+                stmt = stmt.where(vector.op("@@")(tsquery))
+                ranks.append(func.ts_rank(vector, tsquery))
+        if query.min_price is not None:
+            stmt = stmt.where(Sweet.price >= query.min_price)
+        if query.max_price is not None:
+            stmt = stmt.where(Sweet.price <= query.max_price)
+        order_by = [Sweet.name, Sweet.id]
+        if ranks:
+            order_by.insert(0, sum(ranks[1:], ranks[0]).desc())
+        stmt = stmt.order_by(*order_by).offset(query.skip).limit(query.limit)
+        return list(db.execute(stmt).scalars())
+
+
+search_index = InMemorySearchIndex(settings.SEARCH_INDEX_REFRESH_SECONDS)
+postgres_search = PostgresSearch()
+
+
+def search_sweet_ids(db: Session, query: SearchQuery) -> List[int]:
+    backend = settings.SEARCH_BACKEND
+    if backend == "auto":
+        backend = "postgres" if db.get_bind().dialect.name == "postgresql" else "memory"
+    if backend == "postgres":
+        return postgres_search.search(db, query)
+    return search_index.search(db, query)
@@ -0,0 +1,45 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._last = clock()
+        self.phases = {}
+
+    def mark(self, name: str):
+        # Records the time since the timer was created or the previous mark.
+        now = self._clock()
+        self.phases[name] = now - self._last
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self._clock() - started
+
+    def report(self) -> dict:
+        return {
+            "total_ms": round(sum(self.phases.values()) * 1000, 1),
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+        }
+
+    def log(self):
+        report = self.report()
+        logger.info(
+            "Started in %.1f ms (%s)",
+            report["total_ms"],
+            ", ".join(f"{name} {ms} ms" for name, ms in report["phases_ms"].items()),
+        )
+
+
+# Import and app phases are marked once, when app.main is imported;
+# lifespan phases are timed again on every startup of the app.
+startup_timer = StartupTimer()
@@ -0,0 +1,267 @@
+from fastapi import HTTPException, status
+from sqlalchemy import case, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.core.analytics import record_sales
+from app.core.stock_events import stock_broker
+from app.models.sweet import Sweet
+from app.models.purchase import Purchase
+from app.models.stock_movement import StockMovement
+
+PURCHASE_COLUMNS = [
+    Purchase.id,
+    Purchase.user_id,
+    Purchase.sweet_id,
+    Purchase.quantity,
+    Purchase.unit_price,
+    Purchase.total_price,
+    Purchase.status,
+    Purchase.created_at,
+]
+
+MOVEMENT_COLUMNS = [
+    StockMovement.id,
+    StockMovement.sweet_id,
+    StockMovement.user_id,
+    StockMovement.delta,
+    StockMovement.quantity_after,
+    StockMovement.reason,
+    StockMovement.created_at,
+]
+
+
+def _decrement_stmt(sweet_id: int, quantity: int):
+    return (
+        update(Sweet)
+        .where(
+            Sweet.id == sweet_id,
+            Sweet.quantity >= quantity,
+            Sweet.is_available == True,
+            Sweet.deleted_at.is_(None),
+        )
+        .values(quantity=Sweet.quantity - quantity)
+    )
+
+
+def raise_purchase_error(db: Session, sweet_id: int, quantity: int):
+    sweet = db.execute(
+        select(Sweet.quantity, Sweet.is_available).where(Sweet.id == sweet_id, Sweet.deleted_at.is_(None))
+    ).first()
+    if sweet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sweet not found"
+        )
+    if not sweet.is_available:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sweet is not available for purchase"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Insufficient stock. Only {sweet.quantity} items available"
+    )
+
+
+def _purchase_single_statement(db: Session, user_id: int, sweet_id: int, quantity: int):
+    decremented = (
+        _decrement_stmt(sweet_id, quantity)
+        .returning(Sweet.id, Sweet.name, Sweet.price, Sweet.quantity)
+        .cte("decremented")
+    )
+    inserted = (
+        insert(Purchase)
+        .from_select(
+            ["user_id", "sweet_id", "quantity", "unit_price", "total_price", "status"],
+            select(
+                literal(user_id),
+                decremented.c.id,
+                literal(quantity),
+                decremented.c.price,
+                decremented.c.price * quantity,
+                literal("completed"),
+            ),
+        )
+        .returning(*PURCHASE_COLUMNS)
+        .cte("inserted")
+    )
+    stmt = select(
+        inserted,
+        decremented.c.name.label("sweet_name"),
+        decremented.c.quantity.label("stock_quantity"),
+    ).join(
+        decremented, inserted.c.sweet_id == decremented.c.id
+    )
+    row = db.execute(stmt).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def decrement_stock(db: Session, sweet_id: int, quantity: int):
+    if db.get_bind().dialect.update_returning:
+        return db.execute(
+            _decrement_stmt(sweet_id, quantity).returning(Sweet.name, Sweet.price, Sweet.quantity)
+        ).first()
+    result = db.execute(_decrement_stmt(sweet_id, quantity))
+    if result.rowcount != 1:
+        return None
+    return db.execute(
+        select(Sweet.name, Sweet.price, Sweet.quantity).where(Sweet.id == sweet_id)
+    ).first()
+
+
+def _purchase_two_statements(db: Session, user_id: int, sweet_id: int, quantity: int):
+    sweet = decrement_stock(db, sweet_id, quantity)
+    if sweet is None:
+        return None
+
+    values = dict(
+        user_id=user_id,
+        sweet_id=sweet_id,
+        quantity=quantity,
+        unit_price=sweet.price,
+        total_price=sweet.price * quantity,
+        status="completed",
+    )
+    row = db.execute(insert(Purchase).values(**values).returning(*PURCHASE_COLUMNS)).mappings().one()
+    return dict(row, sweet_name=sweet.name, stock_quantity=sweet.quantity)
+
+
+def purchase_stock(db: Session, user_id: int, sweet_id: int, quantity: int) -> dict:
+    # A single conditional UPDATE is the only guard against overselling: the
+    # stock check and the decrement happen atomically inside the database, so
+    # concurrent buyers never observe the same quantity.
+    if db.get_bind().dialect.name == "postgresql":
+        row = _purchase_single_statement(db, user_id, sweet_id, quantity)
+    else:
+        row = _purchase_two_statements(db, user_id, sweet_id, quantity)
+
+    if row is None:
+        db.rollback()
+        raise_purchase_error(db, sweet_id, quantity)
+
+    record_sales(db, [row])
+    db.commit()
+    stock_broker.publish([(sweet_id, row["stock_quantity"], True)])
+    return row
+
+
+def purchase_stock_batch(db: Session, user_id: int, items) -> list:
+    wanted = {}
+    for item in items:
+        wanted[item.sweet_id] = wanted.get(item.sweet_id, 0) + item.quantity
+
+    needed = case(wanted, value=Sweet.id)
+    stmt = (
+        update(Sweet)
+        .where(
+            Sweet.id.in_(list(wanted)),
+            Sweet.quantity >= needed,
+            Sweet.is_available == True,
+            Sweet.deleted_at.is_(None),
+        )
+        .values(quantity=Sweet.quantity - needed)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        sweets = db.execute(stmt.returning(Sweet.id, Sweet.name, Sweet.price, Sweet.quantity)).all()
+    else:
+        sweets = []
+        if db.execute(stmt).rowcount == len(wanted):
+            sweets = db.execute(
+                select(Sweet.id, Sweet.name, Sweet.price, Sweet.quantity).where(Sweet.id.in_(list(wanted)))
+            ).all()
+
+    if len(sweets) != len(wanted):
+        db.rollback()
+        decremented = {sweet.id for sweet in sweets}
+        for sweet_id, quantity in wanted.items():
+            if sweet_id not in decremented:
+                raise_purchase_error(db, sweet_id, quantity)
+
+    sweets = {sweet.id: sweet for sweet in sweets}
+    values = [
+        dict(
+            user_id=user_id,
+            sweet_id=item.sweet_id,
+            quantity=item.quantity,
+            unit_price=sweets[item.sweet_id].price,
+            total_price=sweets[item.sweet_id].price * item.quantity,
+            status="completed",
+        )
+        for item in items
+    ]
+    rows = db.execute(
+        insert(Purchase).returning(*PURCHASE_COLUMNS, sort_by_parameter_order=True),
+        values,
+    ).mappings().all()
+
+    record_sales(db, rows)
+    db.commit()
+    stock_broker.publish((sweet.id, sweet.quantity, True) for sweet in sweets.values())
+    return [dict(row, sweet_name=sweets[row["sweet_id"]].name) for row in rows]
+
+
+def raise_adjustment_error(db: Session, sweet_id: int, delta: int):
+    quantity = db.execute(
+        select(Sweet.quantity).where(Sweet.id == sweet_id, Sweet.deleted_at.is_(None))
+    ).scalar()
+    if quantity is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sweet not found"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Adjustment of {delta} would leave sweet {sweet_id} with negative stock ({quantity} in stock)"
+    )
+
+
+def adjust_stock(db: Session, user_id: int, items, reason: str) -> list:
+    deltas = {}
+    for item in items:
+        deltas[item.sweet_id] = deltas.get(item.sweet_id, 0) + item.delta
+
+    # One set-based UPDATE applies the net change per sweet; stock never goes
+    # negative, and any sweet that is missing or would fails the whole batch.
+    change = case(deltas, value=Sweet.id)
+    stmt = (
+        update(Sweet)
+        .where(Sweet.id.in_(list(deltas)), Sweet.quantity + change >= 0, Sweet.deleted_at.is_(None))
+        .values(quantity=Sweet.quantity + change)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        sweets = db.execute(stmt.returning(Sweet.id, Sweet.name, Sweet.quantity, Sweet.is_available)).all()
+    else:
+        sweets = []
+        if db.execute(stmt).rowcount == len(deltas):
+            sweets = db.execute(
+                select(Sweet.id, Sweet.name, Sweet.quantity, Sweet.is_available).where(Sweet.id.in_(list(deltas)))
+            ).all()
+
+    if len(sweets) != len(deltas):
+        db.rollback()
+        adjusted = {sweet.id for sweet in sweets}
+        for sweet_id, delta in deltas.items():
+            if sweet_id not in adjusted:
+                raise_adjustment_error(db, sweet_id, delta)
+
+    sweets = {sweet.id: sweet for sweet in sweets}
+    running = {sweet_id: sweets[sweet_id].quantity - delta for sweet_id, delta in deltas.items()}
+    values = []
+    for item in items:
+        running[item.sweet_id] += item.delta
+        values.append(dict(
+            sweet_id=item.sweet_id,
+            user_id=user_id,
+            delta=item.delta,
+            quantity_after=running[item.sweet_id],
+            reason=reason,
+        ))
+    # Returned rows describe themselves, so they need not match the parameter
+    # order; that keeps the insert to one statement on SQLite as well.
+    rows = db.execute(insert(StockMovement).returning(*MOVEMENT_COLUMNS), values).mappings().all()
+
+    db.commit()
+    stock_broker.publish((sweet.id, sweet.quantity, sweet.is_available) for sweet in sweets.values())
+    return [dict(row, sweet_name=sweets[row["sweet_id"]].name) for row in sorted(rows, key=lambda row: row["id"])]
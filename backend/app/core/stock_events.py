@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+stream_resyncs = Counter(
+    "stock_stream_resyncs_total",
+    "Stock streams told to refetch the catalog because they fell too far behind",
+)
+
+RESYNC = object()
+
+Level = Tuple[int, bool]
+
+
+class InMemoryBroadcastBackend:
+    def __init__(self):
+        self._listeners = []
+
+    def publish(self, message: bytes):
+        for listener in self._listeners:
+            listener(message)
+
+    def listen(self, listener):
+        self._listeners.append(listener)
+
+
+class RedisBroadcastBackend:
+    def __init__(self, url: str, channel: str = "sweetshop:stock"):
+        self._client = get_redis(url)
+        self._channel = channel
+        self._thread = None
+
+    def publish(self, message: bytes):
+        self._client.publish(self._channel, message)
+
+    def listen(self, listener):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self._channel: lambda message: listener(message["data"])})
+        self._thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+
+class Subscription:
+    def __init__(self, broker: "StockBroker", loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._broker = broker
+        self._pending: Dict[int, Level] = {}
+        self._resync = False
+        self._ready = asyncio.Event()
+
+    def offer(self, levels: Dict[int, Level]):
+        # Only the latest level per sweet is kept, so a slow reader holds at
+        # most one entry per changed sweet; past max_pending it is told to
+        # refetch instead.
+        self._pending.update(levels)
+        if len(self._pending) > self._broker.max_pending:
+            self._pending.clear()
+            self._resync = True
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None):
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        if self._resync:
+            self._resync = False
+            self._pending.clear()
+            stream_resyncs.inc(())
+            return RESYNC
+        levels, self._pending = self._pending, {}
+        return levels
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class StockBroker:
+    def __init__(self, backend, max_pending: int):
+        self.backend = backend
+        self.max_pending = max_pending
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(subscription.loop, set()).add(subscription)
+            if not self._listening:
+                self.backend.listen(self._receive)
+                self._listening = True
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.loop)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.loop]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, levels: Iterable[Tuple[int, int, bool]]):
+        # Called right after a commit, from any thread. The change is already
+        # durable, so a broadcast failure is logged rather than raised.
+        levels = [list(level) for level in levels]
+        if not levels:
+            return
+        try:
+            self.backend.publish(json.dumps(levels, separators=(",", ":")).encode())
+        except Exception:
+            logger.exception("Could not broadcast stock levels")
+
+    def _receive(self, message: bytes):
+        levels = {sweet_id: (quantity, bool(is_available)) for sweet_id, quantity, is_available in json.loads(message)}
+        with self._lock:
+            targets = list(self._subscriptions.items())
+        # One wakeup per event loop; the fan-out to its streams runs there.
+        # A loop's set only changes on that loop, so it is not copied here.
+        for loop, subscriptions in targets:
+            try:
+                loop.call_soon_threadsafe(_fan_out, subscriptions, levels)
+            except RuntimeError:
+                pass
+
+
+def _fan_out(subscriptions, levels):
+    for subscription in subscriptions:
+        subscription.offer(levels)
+
+
+def encode_event(levels) -> bytes:
+    if levels is RESYNC:
+        return b"event: resync\ndata: {}\n\n"
+    data = [
+        {"sweet_id": sweet_id, "quantity": quantity, "is_available": is_available}
+        for sweet_id, (quantity, is_available) in sorted(levels.items())
+    ]
+    return b"event: stock\ndata: " + json.dumps(data, separators=(",", ":")).encode() + b"\n\n"
+
+
+async def stock_event_stream(broker: StockBroker, keepalive_seconds: float):
+    subscription = broker.subscribe()
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            levels = await subscription.next(keepalive_seconds)
+            yield b": keepalive\n\n" if levels is None else encode_event(levels)
+    finally:
+        subscription.close()
+
+
+def make_broadcast_backend(kind: str):
+    if kind == "redis":
+        return RedisBroadcastBackend(settings.REDIS_URL)
+    return InMemoryBroadcastBackend()
+
+
+stock_broker = StockBroker(make_broadcast_backend(settings.BROADCAST_BACKEND), settings.STOCK_STREAM_MAX_PENDING)
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.user import User
+
+
+class UserSnapshot(NamedTuple):
+    id: int
+    email: str
+    is_admin: bool
+    is_active: bool
+
+
+class TokenCache:
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._tokens_by_email = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._discard(token)
+            self.misses += 1
+            return None
+
+    def set(self, token: str, claims: dict, user: User) -> UserSnapshot:
+        snapshot = UserSnapshot(user.id, user.email, bool(user.is_admin), bool(user.is_active))
+        # Never cache past the token's own expiry, so a cache hit cannot
+        # resurrect a token that the JWT check would already reject.
+        expires_at = min(time.time() + self.ttl_seconds, claims.get("exp", 0))
+        if self.maxsize <= 0 or expires_at <= time.time():
+            return snapshot
+        with self._lock:
+            self._discard(token)
+            self._entries[token] = (expires_at, claims, snapshot)
+            self._tokens_by_email.setdefault(snapshot.email, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+        return snapshot
+
+    def invalidate_user(self, email: str):
+        with self._lock:
+            for token in list(self._tokens_by_email.get(email, ())):
+                self._discard(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_email.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def _discard(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_email.get(entry[2].email)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_email[entry[2].email]
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+
+
+def _changed_emails(target: User):
+    history = inspect(target).attrs.email.history
+    return {target.email, *history.deleted}
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    emails = _changed_emails(target)
+    for email in emails:
+        token_cache.invalidate_user(email)
+    # A concurrent request may re-cache the old row before this transaction
+    # commits, so drop the entries once more after the commit lands.
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_user_emails", set()).update(emails)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for email in session.info.pop("invalidated_user_emails", ()):
+        token_cache.invalidate_user(email)
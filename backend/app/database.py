@@ -1,20 +1,281 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import logging
+import threading
+from contextlib import AsyncExitStack, ExitStack
+
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateColumn
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.core.pool import INSTRUMENTED_POOLS, pool_status
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if url.get_driver_name() in ("aiosqlite", "asyncpg"):
+        return url.render_as_string(hide_password=False)
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def engine_options(url: str) -> dict:
+    url = make_url(url)
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    pool_class = url.get_dialect().get_pool_class(url)
+    if pool_class in INSTRUMENTED_POOLS:
+        options.update(
+            poolclass=INSTRUMENTED_POOLS[pool_class],
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0 and url.get_backend_name() == "postgresql":
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+class LazySessionmaker(sessionmaker):
+    def __init__(self, engine_name: str, **kw):
+        super().__init__(**kw)
+        self.engine_name = engine_name
+
+    def __call__(self, **local_kw):
+        if self.kw["bind"] is None:
+            self.configure(bind=get_engine(self.engine_name))
+        return super().__call__(**local_kw)
+
+class LazyAsyncSessionmaker(async_sessionmaker):
+    def __init__(self, engine_name: str, **kw):
+        super().__init__(**kw)
+        self.engine_name = engine_name
+
+    def __call__(self, **local_kw):
+        if self.kw["bind"] is None:
+            self.configure(bind=get_engine(self.engine_name))
+        return super().__call__(**local_kw)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-)
+# Engines are created on first use rather than on import: creating one loads
+# its dialect and DBAPI driver, which neither `import app.main` nor a
+# gunicorn master that only forks workers needs. Session factories bind to
+# them the first time they are called.
+engines = {}
+async_engines = {}
+_engines_lock = threading.Lock()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def connect():
+    if engines:
+        return
+    with _engines_lock:
+        if engines:
+            return
+        created = {"primary": create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))}
+        if settings.DATABASE_REPLICA_URL:
+            created["replica"] = create_engine(
+                settings.DATABASE_REPLICA_URL, **engine_options(settings.DATABASE_REPLICA_URL)
+            )
+        if settings.DATABASE_ASYNC:
+            async_url = async_database_url(settings.DATABASE_URL)
+            async_engines["primary_async"] = create_async_engine(async_url, **engine_options(async_url))
+            if settings.DATABASE_REPLICA_URL:
+                async_replica_url = async_database_url(settings.DATABASE_REPLICA_URL)
+                async_engines["replica_async"] = create_async_engine(
+                    async_replica_url, **engine_options(async_replica_url)
+                )
+        created.update((name, bound.sync_engine) for name, bound in async_engines.items())
+        engines.update(created)
+
+def get_engine(name: str = "primary"):
+    connect()
+    return async_engines.get(name) or engines[name]
+
+SessionLocal = LazySessionmaker("primary", autocommit=False, autoflush=False)
+ReadSessionLocal = SessionLocal
+if settings.DATABASE_REPLICA_URL:
+    ReadSessionLocal = LazySessionmaker("replica", autocommit=False, autoflush=False)
 Base = declarative_base()
 
-def get_db():
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if settings.DATABASE_ASYNC:
+    # Objects handed back to a handler are read after the session work is
+    # done, outside the greenlet that can lazy-load them, so keep them loaded.
+    AsyncSessionLocal = LazyAsyncSessionmaker("primary_async", autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = AsyncSessionLocal
+    if settings.DATABASE_REPLICA_URL:
+        AsyncReadSessionLocal = LazyAsyncSessionmaker("replica_async", autoflush=False, expire_on_commit=False)
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_sync_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+get_db = get_async_db if settings.DATABASE_ASYNC else get_sync_db
+# Catalog reads may go to a replica when DATABASE_REPLICA_URL is set; without
+# one this is the primary session.
+get_read_db = get_async_read_db if settings.DATABASE_ASYNC else get_sync_read_db
+
+def pool_statuses() -> dict:
+    connect()
+    return {name: pool_status(bound.pool) for name, bound in engines.items()}
+
+# Any fixed key works; it only has to be the same for every migrate run.
+SCHEMA_LOCK_KEY = 7_310_547
+
+def create_schema(bind=None):
+    import app.models  # registers every table on Base.metadata
+    
+    with (bind or get_engine()).begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Several containers running migrate at once take turns.
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        upgrade_tables(conn)
+        Base.metadata.create_all(bind=conn)
+
+def _index_where(index, dialect: str):
+    return index.dialect_options[dialect].get("where") if dialect in index.dialect_options else None
+
+def _index_outdated(index, reflected, dialect: str) -> bool:
+    where = _index_where(index, dialect)
+    return (
+        bool(reflected["unique"]) != bool(index.unique)
+        or (where is not None) != (reflected.get("dialect_options", {}).get(f"{dialect}_where") is not None)
+    )
+
+def _check_unique(conn, table, index):
+    # Checked before anything is dropped: SQLite commits each DDL statement,
+    # so a failed CREATE would leave the table without the old index.
+    columns = list(index.expressions)
+    query = select(*columns).group_by(*columns).having(func.count() > 1).limit(10)
+    where = _index_where(index, conn.dialect.name)
+    if where is not None:
+        query = query.where(where)
+    duplicates = [", ".join(map(str, row)) for row in conn.execute(query)]
+    if duplicates:
+        raise RuntimeError(
+            f"Cannot create unique index {index.name}: {table.name} has duplicate rows for "
+            f"{', '.join(map(repr, duplicates))}. Rename or delete them and run migrate again."
+        )
+
+def upgrade_tables(conn):
+    # create_all only creates missing tables. Tables left by an older release
+    # get their new columns here, and indexes that are missing or were
+    # declared differently (plain rather than unique, or not partial) are
+    # rebuilt.
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(f"Cannot add required column {table.name}.{column.name} to existing rows")
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {conn.dialect.identifier_preparer.format_table(table)} ADD COLUMN {ddl}"))
+            logger.info("Added column %s.%s", table.name, column.name)
+
+        reflected = {index["name"]: index for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in reflected:
+                if not _index_outdated(index, reflected[index.name], conn.dialect.name):
+                    continue
+                if index.unique:
+                    _check_unique(conn, table, index)
+                index.drop(conn)
+            elif index.unique:
+                _check_unique(conn, table, index)
+            index.create(conn)
+
+def _warm_size(bound, size: int) -> int:
+    # Only queue pools keep connections around; the SQLite pools either hold
+    # one per thread or none at all.
+    return min(size, bound.pool.size()) if isinstance(bound.pool, QueuePool) else 0
+
+def _open_connections(bound, size: int) -> int:
+    with ExitStack() as stack:
+        for _ in range(size):
+            stack.enter_context(bound.connect())
+    return size
+
+async def warm_pools(size: int) -> dict:
+    # Fills each pool up to `size` connections at startup, so the first
+    # requests a worker serves do not pay for connecting.
+    warmed = {}
+    if size <= 0:
+        return warmed
+    connect()
+    for name, bound in engines.items():
+        target = _warm_size(bound, size)
+        if not target:
+            continue
+        try:
+            if name in async_engines:
+                async with AsyncExitStack() as stack:
+                    for _ in range(target):
+                        await stack.enter_async_context(async_engines[name].connect())
+            else:
+                await run_in_threadpool(_open_connections, bound, target)
+        except Exception:
+            logger.warning("Could not warm the %s connection pool", name, exc_info=True)
+            continue
+        warmed[name] = target
+    return warmed
+
+async def dispose_engines():
+    # Runs once the sweeper and the purchase ledger have stopped, so no
+    # connection is still checked out of the pools being closed.
+    for bound in async_engines.values():
+        await bound.dispose()
+    for bound in list(engines.values()):
+        await run_in_threadpool(bound.dispose)
+
+async def run_db(db, fn, *args, **kwargs):
+    # Database work is written once against the sync Session API. With an
+    # AsyncSession it runs on the event loop through the async driver; with a
+    # plain Session it is pushed to the threadpool as before.
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+def upsert(db, model):
+    # INSERT with the dialect's ON CONFLICT support.
+    from sqlalchemy.dialects import postgresql, sqlite
+    
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
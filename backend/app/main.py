@@ -1,33 +1,81 @@
+# Imported first so the timer's clock covers every import below.
+from app.core.startup import startup_timer
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, sweets, inventory
+from starlette.concurrency import run_in_threadpool
+from app.api import analytics, auth, sweets, inventory
 from app.core.config import settings
-from app.database import engine, Base
-
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="Sweet Shop Management System",
-    description="A comprehensive TDD-based sweet shop management API",
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc",
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(auth.router, prefix="/api", tags=["authentication"])
-app.include_router(sweets.router, prefix="/api", tags=["sweets"])
-app.include_router(inventory.router, prefix="/api", tags=["inventory"])
+from app.core.idempotency import IdempotencyMiddleware, idempotency_store
+from app.core.ledger import purchase_ledger
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.rate_limit import RateLimitMiddleware, rate_limit_store, rate_limits
+from app.core.reservations import reservation_sweeper
+from app.core.responses import default_response_class
+from app.database import dispose_engines, pool_statuses, warm_pools
+
+# GET /health/startup shows where a cold start goes; the crypto backends and
+# database engines load on first use, not here.
+startup_timer.mark("imports")
+
+# The schema is created by `python -m app migrate`, not on import, so
+# starting a worker never touches it.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_timer.phase("pool_warmup"):
+        await warm_pools(settings.DB_POOL_WARMUP)
+    with startup_timer.phase("background_tasks"):
+        if settings.RESERVATION_SWEEP_SECONDS > 0:
+            reservation_sweeper.start()
+    startup_timer.log()
+    yield
+    await run_in_threadpool(reservation_sweeper.stop)
+    await run_in_threadpool(purchase_ledger.stop)
+    await dispose_engines()
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="Sweet Shop Management System",
+        description="A comprehensive TDD-based sweet shop management API",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        lifespan=lifespan,
+        default_response_class=default_response_class(),
+    )
+
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=idempotency_store,
+        paths=["/api/auth/register", "/api/inventory/purchase", "/api/inventory/purchase/batch"],
+        wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+    )
+
+    app.add_middleware(RateLimitMiddleware, store=rate_limit_store, limits=rate_limits)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(auth.router, prefix="/api", tags=["authentication"])
+    app.include_router(sweets.router, prefix="/api", tags=["sweets"])
+    app.include_router(inventory.router, prefix="/api", tags=["inventory"])
+    app.include_router(analytics.router, prefix="/api", tags=["analytics"])
+    return app
+
+app = create_app()
+startup_timer.mark("app")
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "Welcome to Sweet Shop Management System API",
         "version": "1.0.0",
@@ -36,9 +84,21 @@ def read_root():
     }
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {
         "status": "healthy",
         "message": "Sweet Shop API is running!",
         "version": "1.0.0"
-    }
\ No newline at end of file
+    }
+
+@app.get("/health/startup")
+async def startup_health():
+    return startup_timer.report()
+
+@app.get("/health/pool")
+async def pool_health():
+    return pool_statuses()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(pool_statuses()), media_type="text/plain; version=0.0.4")
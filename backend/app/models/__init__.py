@@ -1,5 +1,9 @@
 from .user import User
 from .sweet import Sweet
 from .purchase import Purchase
+from .purchase_archive import PurchaseArchive
+from .analytics import DailySweetSales, SweetSales
+from .stock_movement import StockMovement
+from .reservation import Reservation
 
-__all__ = ["User", "Sweet", "Purchase"]
\ No newline at end of file
+__all__ = ["User", "Sweet", "Purchase", "PurchaseArchive", "DailySweetSales", "SweetSales", "StockMovement", "Reservation"]
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Date, Float, Integer
+from app.database import Base
+
+class DailySweetSales(Base):
+    __tablename__ = "daily_sweet_sales"
+    
+    day = Column(Date, primary_key=True)
+    sweet_id = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    orders = Column(Integer, nullable=False, default=0)
+
+class SweetSales(Base):
+    __tablename__ = "sweet_sales"
+    
+    sweet_id = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    orders = Column(Integer, nullable=False, default=0)
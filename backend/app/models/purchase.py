@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float, String
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float, String, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Purchase(Base):
     __tablename__ = "purchases"
+    __table_args__ = (
+        Index("ix_purchases_user_created_id", "user_id", "created_at", "id"),
+        # The archiver walks this from the oldest purchase.
+        Index("ix_purchases_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float, String, Index
+from app.database import Base
+
+class PurchaseArchive(Base):
+    __tablename__ = "purchases_archive"
+    __table_args__ = (
+        Index("ix_purchases_archive_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_purchases_archive_created_at", "created_at"),
+    )
+    
+    # Same columns as purchases; rows keep the id they had there, so an
+    # archived purchase is still found by id and ordered with live ones.
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sweet_id = Column(Integer, ForeignKey("sweets.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=False)
+    total_price = Column(Float, nullable=False)
+    status = Column(String(50))
+    created_at = Column(DateTime(timezone=True))
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+from app.database import Base
+
+class StockMovement(Base):
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        Index("ix_stock_movements_sweet_id_id", "sweet_id", "id"),
+    )
+    
+    # sweet_id has no foreign key so the trail outlives a deleted sweet.
+    id = Column(Integer, primary_key=True, index=True)
+    sweet_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    delta = Column(Integer, nullable=False)
+    quantity_after = Column(Integer, nullable=False)
+    reason = Column(String(50), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
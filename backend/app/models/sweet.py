@@ -1,13 +1,29 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, Index, literal_column
+from sqlalchemy.dialects import postgresql  # registers the full text search functions used below
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+def search_vector(column):
+    # Literal arguments keep the expression text identical between the index
+    # definitions and queries, which PostgreSQL needs to match them up.
+    return func.to_tsvector(literal_column("'simple'"), column)
+
+def search_document(name, category, description):
+    def weighted(column, weight):
+        return func.setweight(search_vector(column), literal_column(f"'{weight}'"))
+
+    return (
+        weighted(name, "A")
+        .op("||")(weighted(category, "B"))
+        .op("||")(weighted(func.coalesce(description, literal_column("''")), "C"))
+    )
+
 class Sweet(Base):
     __tablename__ = "sweets"
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False, index=True)
+    name = Column(String(100), nullable=False)
     category = Column(String(50), nullable=False, index=True)
     price = Column(Float, nullable=False)
     quantity = Column(Integer, nullable=False, default=0)
@@ -16,9 +32,38 @@ class Sweet(Base):
     is_available = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Deleted sweets keep their row, so purchases, reservations and stock
+    # movements still point at them; they are also marked unavailable, which
+    # every catalog read and stock change already filters on.
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        # A name only has to be unique among live sweets, so a deleted
+        # sweet's name can be used again.
+        Index(
+            "ix_sweets_name",
+            "name",
+            unique=True,
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        Index("ix_sweets_available_name_id", "is_available", "name", "id"),
+        Index("ix_sweets_available_price_id", "is_available", "price", "id"),
+        Index(
+            "ix_sweets_search_document",
+            search_document(name, category, description),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_sweets_search_name", search_vector(name), postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_sweets_search_category", search_vector(category), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
     
     purchases = relationship("Purchase", back_populates="sweet")
     
     @property
     def is_in_stock(self):
-        return self.quantity > 0 and self.is_available
\ No newline at end of file
+        return self.quantity > 0 and self.is_available
+
+    @classmethod
+    def search_document(cls):
+        return search_document(cls.name, cls.category, cls.description)
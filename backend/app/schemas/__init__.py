@@ -1,11 +1,17 @@
 from .user import UserCreate, UserResponse, UserUpdate
-from .sweet import SweetCreate, SweetResponse, SweetUpdate
+from .sweet import SweetCreate, SweetResponse, SweetUpdate, SweetImportError, SweetImportResponse
 from .auth import Token, TokenData, LoginRequest
-from .purchase import PurchaseCreate, PurchaseResponse
+from .purchase import PurchaseCreate, PurchaseBatchCreate, PurchaseResponse
+from .analytics import SweetSalesResponse, CategorySalesResponse, DailySalesResponse
+from .stock import StockAdjustment, StockAdjustmentBatch, StockMovementResponse
+from .reservation import ReservationCreate, ReservationResponse
 
 __all__ = [
     "UserCreate", "UserResponse", "UserUpdate",
-    "SweetCreate", "SweetResponse", "SweetUpdate",
+    "SweetCreate", "SweetResponse", "SweetUpdate", "SweetImportError", "SweetImportResponse",
     "Token", "TokenData", "LoginRequest",
-    "PurchaseCreate", "PurchaseResponse"
+    "PurchaseCreate", "PurchaseBatchCreate", "PurchaseResponse",
+    "SweetSalesResponse", "CategorySalesResponse", "DailySalesResponse",
+    "StockAdjustment", "StockAdjustmentBatch", "StockMovementResponse",
+    "ReservationCreate", "ReservationResponse"
 ]
\ No newline at end of file
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import date
+
+class SalesTotals(BaseModel):
+    quantity: int
+    revenue: float
+    orders: int
+
+class SweetSalesResponse(SalesTotals):
+    sweet_id: int
+    sweet_name: str
+    category: str
+
+class CategorySalesResponse(SalesTotals):
+    category: str
+
+class DailySalesResponse(SalesTotals):
+    day: date
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class PurchaseBase(BaseModel):
     quantity: int = Field(..., gt=0, le=100)
@@ -21,4 +21,7 @@ class PurchaseResponse(BaseModel):
     user_email: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PurchaseBatchCreate(BaseModel):
+    items: List[PurchaseCreate] = Field(..., min_length=1, max_length=100)
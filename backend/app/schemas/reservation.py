@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import settings
+from app.schemas.purchase import PurchaseCreate
+
+class ReservationCreate(PurchaseCreate):
+    ttl_minutes: Optional[int] = Field(None, ge=1, le=settings.RESERVATION_MAX_TTL_MINUTES)
+
+class ReservationResponse(BaseModel):
+    id: int
+    user_id: int
+    sweet_id: int
+    quantity: int
+    expires_at: datetime
+    created_at: datetime
+    sweet_name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
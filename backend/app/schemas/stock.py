@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime
+from typing import List, Optional
+
+class StockAdjustment(BaseModel):
+    sweet_id: int
+    delta: int = Field(..., ge=-1_000_000, le=1_000_000)
+
+    @field_validator("delta")
+    @classmethod
+    def delta_not_zero(cls, delta: int) -> int:
+        if delta == 0:
+            raise ValueError("delta must not be zero")
+        return delta
+
+class StockAdjustmentBatch(BaseModel):
+    items: List[StockAdjustment] = Field(..., min_length=1, max_length=1000)
+    reason: str = Field("restock", min_length=1, max_length=50)
+
+class StockMovementResponse(BaseModel):
+    id: int
+    sweet_id: int
+    user_id: int
+    delta: int
+    quantity_after: int
+    reason: str
+    created_at: datetime
+    sweet_name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
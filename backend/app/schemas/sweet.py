@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class SweetBase(BaseModel):
@@ -31,3 +31,14 @@ class SweetResponse(SweetBase):
 
     class Config:
         from_attributes = True
+
+class SweetImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class SweetImportResponse(BaseModel):
+    received: int
+    created: int
+    updated: int
+    failed: int
+    errors: List[SweetImportError]
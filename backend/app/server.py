@@ -0,0 +1,61 @@
+import logging
+
+from app.core.config import settings
+from app.database import engines
+
+logger = logging.getLogger(__name__)
+
+
+def _post_fork(server, worker):
+    # The master imported the app before forking; any connection it opened
+    # must not be shared, so each worker starts with empty pools.
+    for bound in engines.values():
+        bound.dispose(close=False)
+
+
+def gunicorn_options(host: str, port: int, workers: int, graceful_timeout: float) -> dict:
+    return {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        # Workers are forked from a master that already imported the app, so
+        # they share its memory pages instead of importing it again.
+        "preload_app": True,
+        # On SIGTERM a worker stops accepting, finishes in-flight requests and
+        # runs the lifespan shutdown (which drains the purchase ledger)
+        # before it is killed after graceful_timeout.
+        "graceful_timeout": graceful_timeout,
+        "timeout": max(30, graceful_timeout),
+        "post_fork": _post_fork,
+        "accesslog": "-",
+    }
+
+
+def serve(host: str, port: int, workers: int, graceful_timeout: float = settings.SHUTDOWN_GRACE_SECONDS):
+    from app.main import app
+
+    if workers <= 1:
+        import uvicorn
+
+        # uvicorn drains the same way on SIGTERM: stop accepting, wait up to
+        # graceful_timeout for open requests, then run the lifespan shutdown.
+        uvicorn.Server(uvicorn.Config(
+            app, host=host, port=port, timeout_graceful_shutdown=graceful_timeout,
+        )).run()
+        return
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as exc:
+        raise RuntimeError("The 'gunicorn' package is required to serve with more than one worker") from exc
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_options(host, port, workers, graceful_timeout).items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    logger.info("Serving with %d workers on %s:%d", workers, host, port)
+    Server().run()
@@ -1,16 +1,34 @@
+import os
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RESERVATION_SWEEP_SECONDS", "0")
+os.environ.setdefault("DB_POOL_WARMUP", "0")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.database import get_db, Base
+from app.database import get_db, get_read_db, Base
 from app.models.user import User
 from app.models.sweet import Sweet
 from app.core.security import get_password_hash, create_access_token
+from app.core.token_cache import token_cache
+from app.core.catalog_cache import catalog_cache
+from app.core.idempotency import idempotency_store
+from app.core.rate_limit import rate_limit_store
+from app.core.search import search_index
+from app.core import metrics
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Each TestClient runs its own event loop, so async connections are not pooled
+# across tests.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 def override_get_db():
     try:
@@ -19,10 +37,39 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+DB_MODES = {
+    "sync": (override_get_db, engine),
+    "async": (override_get_async_db, async_engine.sync_engine),
+}
+
+def use_db_override(override):
+    app.dependency_overrides[get_db] = override
+    app.dependency_overrides[get_read_db] = override
+
+use_db_override(override_get_db)
+
+@pytest.fixture(params=list(DB_MODES))
+def db_mode(request):
+    use_db_override(DB_MODES[request.param][0])
+    yield request.param
+    use_db_override(override_get_db)
+
+@pytest.fixture
+def db_engine(db_mode):
+    return DB_MODES[db_mode][1]
 
 @pytest.fixture
-def client():
+def client(db_mode):
+    token_cache.clear()
+    catalog_cache.clear()
+    idempotency_store.clear()
+    rate_limit_store.clear()
+    search_index.clear()
+    metrics.clear()
     Base.metadata.create_all(bind=engine)
     with TestClient(app) as c:
         yield c
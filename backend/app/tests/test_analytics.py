@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.analytics import backfill_sales
+from app.core.ledger import PurchaseLedger
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+from app.tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def catalog(test_db):
+    sweets = [
+        Sweet(name="Chocolate Cake", category="Cakes", price=10.0, quantity=100),
+        Sweet(name="Lemon Tart", category="Tarts", price=4.0, quantity=100),
+        Sweet(name="Carrot Cake", category="Cakes", price=6.0, quantity=100),
+    ]
+    test_db.add_all(sweets)
+    test_db.commit()
+    return [sweet.id for sweet in sweets]
+
+
+class TestSalesAnalytics:
+    def _buy(self, client, headers, sweet_id, quantity):
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": sweet_id, "quantity": quantity},
+            headers=headers
+        )
+        assert response.status_code == 201
+
+    def test_purchases_update_summaries(self, client: TestClient, catalog, auth_headers_user, auth_headers_admin):
+        cake, tart, carrot = catalog
+        self._buy(client, auth_headers_user, cake, 2)
+        self._buy(client, auth_headers_user, tart, 5)
+        client.post(
+            "/api/inventory/purchase/batch",
+            json={"items": [{"sweet_id": cake, "quantity": 1}, {"sweet_id": carrot, "quantity": 1}]},
+            headers=auth_headers_user
+        )
+
+        by_sweet = client.get("/api/inventory/analytics/sweets", headers=auth_headers_admin).json()
+        assert [(s["sweet_name"], s["quantity"], s["revenue"], s["orders"]) for s in by_sweet] == [
+            ("Chocolate Cake", 3, 30.0, 2),
+            ("Lemon Tart", 5, 20.0, 1),
+            ("Carrot Cake", 1, 6.0, 1),
+        ]
+
+        categories = client.get("/api/inventory/analytics/categories", headers=auth_headers_admin).json()
+        assert categories == [
+            {"category": "Cakes", "quantity": 4, "revenue": 36.0, "orders": 3},
+            {"category": "Tarts", "quantity": 5, "revenue": 20.0, "orders": 1},
+        ]
+
+        daily = client.get("/api/inventory/analytics/daily", headers=auth_headers_admin).json()
+        assert daily == [{
+            "day": datetime.now(timezone.utc).date().isoformat(),
+            "quantity": 9,
+            "revenue": 56.0,
+            "orders": 4,
+        }]
+
+        top = client.get("/api/inventory/analytics/top-sellers?days=7&limit=2", headers=auth_headers_admin).json()
+        assert [s["sweet_name"] for s in top] == ["Lemon Tart", "Chocolate Cake"]
+        top = client.get("/api/inventory/analytics/top-sellers?by=revenue&limit=1", headers=auth_headers_admin).json()
+        assert [s["sweet_name"] for s in top] == ["Chocolate Cake"]
+
+    def test_failed_purchases_are_not_counted(
+        self, client: TestClient, test_db, catalog, auth_headers_user, auth_headers_admin
+    ):
+        test_db.get(Sweet, catalog[0]).quantity = 1
+        test_db.commit()
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": catalog[0], "quantity": 2},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 400
+        assert client.get("/api/inventory/analytics/sweets", headers=auth_headers_admin).json() == []
+
+    def test_group_commit_purchases_are_counted(self, client: TestClient, test_user, catalog, auth_headers_admin):
+        ledger = PurchaseLedger(TestingSessionLocal, max_batch=10, max_delay_ms=20, queue_size=100)
+        try:
+            futures = [ledger.submit(test_user.id, catalog[1], 1) for _ in range(4)]
+            for future in futures:
+                future.result(timeout=10)
+        finally:
+            ledger.stop()
+
+        by_sweet = client.get("/api/inventory/analytics/sweets", headers=auth_headers_admin).json()
+        assert [(s["sweet_id"], s["quantity"], s["orders"]) for s in by_sweet] == [(catalog[1], 4, 4)]
+
+    def test_reads_never_scan_purchases(self, client: TestClient, db_engine, catalog, auth_headers_user, auth_headers_admin):
+        self._buy(client, auth_headers_user, catalog[0], 1)
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_engine, "before_cursor_execute", listener)
+        try:
+            for path in ("sweets", "categories", "daily", "top-sellers", "top-sellers?days=30"):
+                assert client.get(f"/api/inventory/analytics/{path}", headers=auth_headers_admin).status_code == 200
+        finally:
+            event.remove(db_engine, "before_cursor_execute", listener)
+
+        assert statements
+        assert not [s for s in statements if "purchases" in s]
+
+    def test_backfill_matches_incremental_totals(
+        self, client: TestClient, test_db, test_user, catalog, auth_headers_user, auth_headers_admin
+    ):
+        self._buy(client, auth_headers_user, catalog[0], 2)
+        self._buy(client, auth_headers_user, catalog[2], 1)
+        incremental = client.get("/api/inventory/analytics/sweets", headers=auth_headers_admin).json()
+
+        backfill_sales(test_db)
+
+        assert client.get("/api/inventory/analytics/sweets", headers=auth_headers_admin).json() == incremental
+
+    def test_backfill_rebuilds_history(self, client: TestClient, test_db, test_user, catalog, auth_headers_admin):
+        today = datetime.now(timezone.utc).replace(hour=12)
+        test_db.add_all([
+            Purchase(user_id=test_user.id, sweet_id=catalog[1], quantity=3, unit_price=4.0, total_price=12.0,
+                     status="completed", created_at=today - timedelta(days=2)),
+            Purchase(user_id=test_user.id, sweet_id=catalog[1], quantity=1, unit_price=4.0, total_price=4.0,
+                     status="completed", created_at=today),
+            Purchase(user_id=test_user.id, sweet_id=catalog[0], quantity=1, unit_price=10.0, total_price=10.0,
+                     status="completed", created_at=today),
+        ])
+        test_db.commit()
+
+        assert backfill_sales(test_db) == 2
+
+        daily = client.get("/api/inventory/analytics/daily?start=" + (today - timedelta(days=6)).date().isoformat(),
+                           headers=auth_headers_admin).json()
+        assert [(d["day"], d["quantity"], d["revenue"]) for d in daily] == [
+            ((today - timedelta(days=2)).date().isoformat(), 3, 12.0),
+            (today.date().isoformat(), 2, 14.0),
+        ]
+        top = client.get("/api/inventory/analytics/top-sellers?days=1", headers=auth_headers_admin).json()
+        assert [(s["sweet_name"], s["quantity"]) for s in top] == [("Chocolate Cake", 1), ("Lemon Tart", 1)]
+
+    def test_analytics_require_admin(self, client: TestClient, auth_headers_user):
+        response = client.get("/api/inventory/analytics/sweets", headers=auth_headers_user)
+
+        assert response.status_code == 403
+
+    def test_invalid_window(self, client: TestClient, auth_headers_admin):
+        response = client.get(
+            "/api/inventory/analytics/daily?start=2024-02-01&end=2024-01-01", headers=auth_headers_admin
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,151 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app import cli, database
+from app.core import archive
+from app.core.analytics import backfill_sales
+from app.core.archive import archive_old_purchases, archive_purchases, months_before
+from app.database import Base
+from app.models.analytics import SweetSales
+from app.models.purchase import Purchase
+from app.models.purchase_archive import PurchaseArchive
+from app.models.sweet import Sweet
+from app.models.user import User
+from app.tests.conftest import TestingSessionLocal, engine
+
+CUTOFF = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def history(test_db, test_user, test_sweet):
+    # Six purchases, one a month from October 2023; the first three are
+    # older than CUTOFF.
+    purchases = [
+        Purchase(
+            user_id=test_user.id, sweet_id=test_sweet.id, quantity=month, unit_price=2.0,
+            total_price=2.0 * month, status="completed",
+            created_at=datetime(2023 + (8 + month) // 12, (8 + month) % 12 + 1, 15, tzinfo=timezone.utc),
+        )
+        for month in range(1, 7)
+    ]
+    test_db.add_all(purchases)
+    test_db.commit()
+    return [purchase.id for purchase in purchases]
+
+
+def _ids(db, model):
+    return sorted(db.scalars(select(model.id)))
+
+
+class TestMonthsBefore:
+    def test_clamps_to_the_end_of_shorter_months(self):
+        assert months_before(datetime(2024, 3, 31, 8), 1) == datetime(2024, 2, 29, 8)
+        assert months_before(datetime(2023, 3, 31), 1) == datetime(2023, 2, 28)
+
+    def test_crosses_year_boundaries(self):
+        assert months_before(datetime(2024, 1, 15), 1) == datetime(2023, 12, 15)
+        assert months_before(datetime(2024, 5, 15), 29) == datetime(2021, 12, 15)
+        assert months_before(datetime(2024, 5, 15), 0) == datetime(2024, 5, 15)
+
+
+class TestArchivePurchases:
+    def test_moves_old_purchases_in_bounded_batches(self, test_db, history):
+        assert archive_purchases(test_db, CUTOFF, 2) == 2
+        assert _ids(test_db, PurchaseArchive) == history[:2]
+        assert archive_purchases(test_db, CUTOFF, 2) == 1
+        assert archive_purchases(test_db, CUTOFF, 2) == 0
+
+        assert _ids(test_db, PurchaseArchive) == history[:3]
+        assert _ids(test_db, Purchase) == history[3:]
+        archived = test_db.get(PurchaseArchive, history[0])
+        assert (archived.quantity, archived.total_price, archived.status) == (1, 2.0, "completed")
+
+    def test_archive_old_purchases_runs_until_done(self, test_db, history, monkeypatch):
+        archived = []
+        monkeypatch.setattr(archive.archived_purchases, "inc", lambda labels, amount=1: archived.append(amount))
+
+        assert archive_old_purchases(TestingSessionLocal, CUTOFF, 2) == 3
+        assert archived == [2, 1]
+
+    def test_cli(self, test_db, history, monkeypatch, capsys):
+        monkeypatch.setattr(cli, "SessionLocal", TestingSessionLocal)
+        monkeypatch.setattr(database, "get_engine", lambda name="primary": engine)
+        monkeypatch.setattr(cli, "archive_cutoff", lambda months: months_before(CUTOFF, months))
+
+        cli.main(["archive-purchases", "--months", "2", "--batch-size", "1"])
+
+        assert capsys.readouterr().out.strip() == "Archived 1 purchases made before 2023-11-01"
+        assert _ids(test_db, PurchaseArchive) == history[:1]
+
+
+class TestPurchaseHistory:
+    @pytest.fixture
+    def archived(self, test_db, history):
+        archive_purchases(test_db, CUTOFF, 100)
+        return history
+
+    def test_my_purchases_are_live_only_by_default(self, client: TestClient, archived, auth_headers_user):
+        response = client.get("/api/inventory/purchases/my", headers=auth_headers_user)
+
+        assert [row["id"] for row in response.json()] == archived[:2:-1]
+
+    def test_full_history_pages_across_both_tables(self, client: TestClient, archived, auth_headers_user):
+        seen = []
+        url = "/api/inventory/purchases/my?include_archived=true&limit=2"
+        while url:
+            response = client.get(url, headers=auth_headers_user)
+            assert response.status_code == 200
+            seen.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            url = cursor and f"/api/inventory/purchases/my?include_archived=true&limit=2&cursor={cursor}"
+
+        assert [row["id"] for row in seen] == archived[::-1]
+        assert {row["sweet_name"] for row in seen} == {"Chocolate Cake"}
+
+    def test_export_includes_archived_purchases_on_request(
+        self, client: TestClient, archived, auth_headers_admin
+    ):
+        url = "/api/inventory/purchases/export?format=ndjson&start=2023-11-01"
+        live = client.get(url, headers=auth_headers_admin).text.splitlines()
+        full = client.get(url + "&include_archived=true", headers=auth_headers_admin).text.splitlines()
+
+        assert [json.loads(line)["id"] for line in live] == archived[3:]
+        assert [json.loads(line)["id"] for line in full] == archived[1:]
+
+    def test_backfill_counts_archived_purchases(self, test_db, archived, test_sweet):
+        backfill_sales(test_db)
+
+        sales = test_db.get(SweetSales, test_sweet.id)
+        assert (sales.quantity, sales.orders) == (21, 6)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+def test_postgres_archive_and_name_reuse():
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(bind=engine)
+    try:
+        with Session(engine) as db:
+            user = User(email="archive@example.com", hashed_password="x", full_name="Archive")
+            deleted = Sweet(name="Fudge", category="Candy", price=1.0, quantity=1, is_available=False,
+                            deleted_at=datetime(2024, 1, 2, tzinfo=timezone.utc))
+            live = Sweet(name="Fudge", category="Candy", price=2.0, quantity=1)
+            db.add_all([user, deleted, live])
+            db.flush()
+            db.add_all([
+                Purchase(user_id=user.id, sweet_id=deleted.id, quantity=1, unit_price=1.0, total_price=1.0,
+                         created_at=datetime(2023, 6, day, tzinfo=timezone.utc))
+                for day in range(1, 4)
+            ])
+            db.commit()
+
+            assert archive_purchases(db, CUTOFF, 2) == 2
+            assert archive_purchases(db, CUTOFF, 2) == 1
+            assert db.scalar(select(PurchaseArchive.id).where(PurchaseArchive.sweet_id == deleted.id).limit(1))
+    finally:
+        Base.metadata.drop_all(bind=engine)
@@ -1,5 +1,13 @@
+import time
+
 import pytest
 from fastapi.testclient import TestClient
+from passlib.hash import bcrypt
+
+from app.core import security
+from app.core.config import settings
+from app.core.security import PasswordHasher, password_context, verify_password
+from app.core.token_cache import TokenCache, UserSnapshot, token_cache
 
 class TestAuthentication:
     def test_register_user_success(self, client: TestClient):
@@ -66,4 +74,83 @@ class TestAuthentication:
         
         assert response.status_code == 200
         assert "Admin user created successfully" in response.json()["message"]
-        assert admin_data["email"] in response.json()["message"]
\ No newline at end of file
+        assert admin_data["email"] in response.json()["message"]
+
+class TestTokenCache:
+    def test_repeated_requests_hit_cache(self, client: TestClient, auth_headers_user):
+        for _ in range(3):
+            response = client.get("/api/inventory/purchases/my", headers=auth_headers_user)
+            assert response.status_code == 200
+
+        assert token_cache.stats()["misses"] == 1
+        assert token_cache.stats()["hits"] == 2
+
+    def test_deactivated_user_is_rejected(self, client: TestClient, test_db, test_user, auth_headers_user):
+        assert client.get("/api/inventory/purchases/my", headers=auth_headers_user).status_code == 200
+
+        test_user.is_active = False
+        test_db.commit()
+
+        response = client.get("/api/inventory/purchases/my", headers=auth_headers_user)
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Inactive user"
+
+    def test_promoted_user_gains_admin_access(self, client: TestClient, test_db, test_user, auth_headers_user):
+        assert client.get("/api/auth/token-cache/stats", headers=auth_headers_user).status_code == 403
+
+        test_user.is_admin = True
+        test_db.commit()
+
+        response = client.get("/api/auth/token-cache/stats", headers=auth_headers_user)
+        assert response.status_code == 200
+        assert set(response.json()) == {"hits", "misses", "size", "maxsize"}
+
+    def test_entries_never_outlive_token_expiry(self):
+        cache = TokenCache(maxsize=10, ttl_seconds=3600)
+        user = UserSnapshot(1, "a@example.com", False, True)
+
+        cache.set("expired", {"exp": time.time() - 1}, user)
+        cache.set("valid", {"exp": time.time() + 60}, user)
+
+        assert cache.get("expired") is None
+        assert cache.get("valid") == user
+
+    def test_cache_is_bounded(self):
+        cache = TokenCache(maxsize=2, ttl_seconds=60)
+        claims = {"exp": time.time() + 60}
+        for i in range(3):
+            cache.set(f"token-{i}", claims, UserSnapshot(i, f"user{i}@example.com", False, True))
+
+        assert cache.get("token-0") is None
+        assert cache.stats()["size"] == 2
+
+
+class TestPasswordHashing:
+    def test_login_rehashes_password_with_changed_cost(self, client: TestClient, test_db, test_user):
+        old_rounds = 5 if settings.BCRYPT_ROUNDS != 5 else 6
+        test_user.hashed_password = bcrypt.using(rounds=old_rounds).hash("testpassword123")
+        test_db.commit()
+
+        response = client.post(
+            "/api/auth/login",
+            data={"username": test_user.email, "password": "testpassword123"}
+        )
+
+        assert response.status_code == 200
+        test_db.refresh(test_user)
+        assert password_context().identify(test_user.hashed_password) == "bcrypt"
+        assert test_user.hashed_password.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+        assert verify_password("testpassword123", test_user.hashed_password)
+
+    def test_login_returns_503_when_hashing_pool_is_full(self, client: TestClient, test_user, monkeypatch):
+        busy = PasswordHasher(workers=1, queue_size=0)
+        busy._slots.acquire()
+        monkeypatch.setattr(security, "password_hasher", busy)
+
+        response = client.post(
+            "/api/auth/login",
+            data={"username": test_user.email, "password": "testpassword123"}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
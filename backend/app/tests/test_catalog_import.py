@@ -0,0 +1,167 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app import cli, database
+from app.core import catalog_import
+from app.core.config import settings
+from app.models.sweet import Sweet
+from app.tests.conftest import TestingSessionLocal, engine
+
+CSV_CATALOG = (
+    "name,category,price,quantity,description\n"
+    "Chocolate Cake,Cakes,12.5,10,\"Rich, dark\"\n"
+    "Lemon Tart,Tarts,4,20,\n"
+    "Mint Candy,Candy,1.25,100,Fresh\n"
+)
+
+
+def _import(client, headers, body, content_type, query=""):
+    return client.post(
+        f"/api/sweets/bulk{query}",
+        content=body,
+        headers={**headers, "Content-Type": content_type}
+    )
+
+
+class TestBulkImport:
+    def test_import_csv(self, client: TestClient, auth_headers_admin):
+        response = _import(client, auth_headers_admin, CSV_CATALOG, "text/csv")
+
+        assert response.status_code == 200
+        assert response.json() == {"received": 3, "created": 3, "updated": 0, "failed": 0, "errors": []}
+        sweets = {sweet["name"]: sweet for sweet in client.get("/api/sweets/").json()}
+        assert sweets["Chocolate Cake"]["price"] == 12.5
+        assert sweets["Chocolate Cake"]["description"] == "Rich, dark"
+        assert sweets["Lemon Tart"]["description"] is None
+
+    def test_import_upserts_by_name(self, client: TestClient, test_db, auth_headers_admin):
+        existing = Sweet(name="Lemon Tart", category="Tarts", price=3.0, quantity=1, description="Old")
+        test_db.add(existing)
+        test_db.commit()
+
+        response = _import(client, auth_headers_admin, CSV_CATALOG, "text/csv; charset=utf-8")
+
+        assert response.json()["created"] == 2
+        assert response.json()["updated"] == 1
+        test_db.refresh(existing)
+        assert (existing.price, existing.quantity, existing.description) == (4.0, 20, None)
+        assert existing.updated_at is not None
+        assert test_db.query(Sweet).count() == 3
+
+    def test_import_reports_row_errors(self, client: TestClient, auth_headers_admin):
+        body = (
+            "name,category,price,quantity\n"
+            "Good Cookie,Cookies,2,5\n"
+            "Free Cookie,Cookies,0,5\n"
+            "No Category,,2,5\n"
+            "Another Cookie,Cookies,3,7\n"
+        )
+
+        response = _import(client, auth_headers_admin, body, "text/csv")
+
+        report = response.json()
+        assert (report["received"], report["created"], report["failed"]) == (4, 2, 2)
+        assert [error["row"] for error in report["errors"]] == [2, 3]
+        assert report["errors"][0]["errors"][0].startswith("price:")
+        assert report["errors"][1]["errors"][0].startswith("category:")
+
+    def test_import_json_and_ndjson(self, client: TestClient, auth_headers_admin):
+        sweets = [
+            {"name": "Caramel Fudge", "category": "Candy", "price": 3, "quantity": 4},
+            {"name": "Vanilla Slice", "category": "Pastries", "price": 5, "quantity": 2},
+        ]
+        response = _import(client, auth_headers_admin, json.dumps(sweets), "application/json")
+
+        assert response.json()["created"] == 2
+
+        lines = [json.dumps(dict(sweets[0], price=4)), "", "{not json", json.dumps(sweets[1])]
+        response = _import(client, auth_headers_admin, "\n".join(lines), "application/x-ndjson")
+
+        report = response.json()
+        assert (report["received"], report["updated"], report["failed"]) == (3, 2, 1)
+        assert report["errors"] == [{"row": 2, "errors": ["Invalid JSON"]}]
+
+    def test_import_repeated_names_keep_last(self, client: TestClient, auth_headers_admin, monkeypatch):
+        monkeypatch.setattr(settings, "IMPORT_CHUNK_ROWS", 2)
+        body = "name,category,price,quantity\n" + "".join(
+            f"Sweet {i % 3},Bench,{i + 1},{i}\n" for i in range(7)
+        )
+
+        response = _import(client, auth_headers_admin, body, "text/csv")
+
+        report = response.json()
+        assert (report["received"], report["created"], report["updated"]) == (7, 3, 4)
+        prices = {sweet["name"]: sweet["price"] for sweet in client.get("/api/sweets/").json()}
+        assert prices == {"Sweet 0": 7.0, "Sweet 1": 5.0, "Sweet 2": 6.0}
+
+    def test_repeated_names_in_a_failed_chunk_are_not_counted_as_updates(
+        self, client: TestClient, auth_headers_admin, monkeypatch
+    ):
+        upsert_sweets = catalog_import._upsert_sweets
+
+        def reject_fudge(db, values):
+            if any(value["name"] == "Fudge" for value in values):
+                raise ValueError("rejected")
+            return upsert_sweets(db, values)
+
+        monkeypatch.setattr(catalog_import, "_upsert_sweets", reject_fudge)
+        body = "name,category,price,quantity\nFudge,Candy,1,1\nFudge,Candy,2,2\nToffee,Candy,3,3\n"
+
+        response = _import(client, auth_headers_admin, body, "text/csv")
+
+        report = response.json()
+        assert (report["received"], report["created"], report["updated"], report["failed"]) == (3, 1, 0, 2)
+        assert report["errors"] == [{"row": 2, "errors": ["Could not be saved"]}]
+
+    def test_import_refreshes_search(self, client: TestClient, auth_headers_admin):
+        assert client.get("/api/sweets/search?q=mint").json() == []
+
+        _import(client, auth_headers_admin, CSV_CATALOG, "text/csv")
+
+        assert [sweet["name"] for sweet in client.get("/api/sweets/search?q=mint").json()] == ["Mint Candy"]
+
+    def test_import_format(self, client: TestClient, auth_headers_admin):
+        response = _import(client, auth_headers_admin, CSV_CATALOG, "application/octet-stream")
+
+        assert response.status_code == 415
+
+        response = _import(client, auth_headers_admin, CSV_CATALOG, "application/octet-stream", "?format=csv")
+
+        assert response.json()["created"] == 3
+
+    def test_import_rejects_non_array_json(self, client: TestClient, auth_headers_admin):
+        response = _import(client, auth_headers_admin, '{"name": "Cake"}', "application/json")
+
+        assert response.status_code == 400
+
+    def test_import_requires_admin(self, client: TestClient, auth_headers_user):
+        response = _import(client, auth_headers_user, CSV_CATALOG, "text/csv")
+
+        assert response.status_code == 403
+
+    def test_import_cli(self, test_db, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(cli, "SessionLocal", TestingSessionLocal)
+        monkeypatch.setattr(database, "get_engine", lambda name="primary": engine)
+        path = tmp_path / "catalog.csv"
+        path.write_text(CSV_CATALOG)
+
+        cli.main(["import-sweets", str(path)])
+
+        assert json.loads(capsys.readouterr().out) == {"received": 3, "created": 3, "updated": 0, "failed": 0}
+        assert test_db.query(Sweet).count() == 3
+
+
+class TestUniqueNames:
+    def test_rename_to_existing_name(self, client: TestClient, test_db, auth_headers_admin):
+        test_db.add_all([
+            Sweet(name="Chocolate Cake", category="Cakes", price=10.0, quantity=1),
+            Sweet(name="Lemon Tart", category="Tarts", price=4.0, quantity=1),
+        ])
+        test_db.commit()
+        tart = test_db.query(Sweet).filter(Sweet.name == "Lemon Tart").one()
+
+        response = client.put(f"/api/sweets/{tart.id}", json={"name": "Chocolate Cake"}, headers=auth_headers_admin)
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Sweet with name 'Chocolate Cake' already exists"
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.core.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, pool_status
+from app.database import Base, async_database_url, engine_options, get_read_db
+from app.main import app
+from app.models.sweet import Sweet
+
+
+class TestEngineOptions:
+    def test_queue_pools_are_sized_from_settings(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 3)
+        monkeypatch.setattr(settings, "DB_POOL_PRE_PING", False)
+
+        options = engine_options("postgresql://user@localhost/sweetshop")
+
+        assert options["poolclass"] is InstrumentedQueuePool
+        assert options["pool_size"] == 7
+        assert options["max_overflow"] == 3
+        assert options["pool_pre_ping"] is False
+        assert engine_options("postgresql+asyncpg://user@localhost/sweetshop")["poolclass"] is (
+            InstrumentedAsyncAdaptedQueuePool
+        )
+
+    def test_in_memory_sqlite_keeps_its_own_pool(self):
+        assert "poolclass" not in engine_options("sqlite://")
+
+    def test_statement_timeout_per_driver(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 1500)
+
+        assert engine_options("postgresql://user@localhost/sweetshop")["connect_args"] == {
+            "options": "-c statement_timeout=1500"
+        }
+        assert engine_options("postgresql+asyncpg://user@localhost/sweetshop")["connect_args"] == {
+            "server_settings": {"statement_timeout": "1500"}
+        }
+        assert "connect_args" not in engine_options("sqlite:///./sweets.db")
+
+    def test_async_database_url(self):
+        assert async_database_url("sqlite:///./sweets.db") == "sqlite+aiosqlite:///./sweets.db"
+        assert async_database_url("postgresql://user:pw@db/sweetshop") == "postgresql+asyncpg://user:pw@db/sweetshop"
+
+
+class TestPoolMetrics:
+    def test_checkouts_overflow_and_timeouts_are_counted(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=1,
+            pool_timeout=0.05,
+        )
+        first = engine.connect()
+        second = engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        status = pool_status(engine.pool)
+        assert status["checked_out"] == 2
+        assert status["overflow"] == 1
+        assert status["checkouts"] == 2
+        assert status["overflow_events"] == 1
+        assert status["timeouts"] == 1
+
+        first.close()
+        second.close()
+        engine.dispose()
+        assert pool_status(engine.pool)["checkouts"] == 2
+
+
+class TestReadReplica:
+    def test_uncached_reads_use_the_read_session(
+        self, client: TestClient, test_sweet, auth_headers_admin, tmp_path
+    ):
+        replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=replica)
+        ReplicaSession = sessionmaker(autocommit=False, autoflush=False, bind=replica)
+        with ReplicaSession() as db:
+            db.add(Sweet(name="Replica Rock", category="Candy", price=1.0, quantity=3))
+            db.commit()
+
+        def replica_db():
+            db = ReplicaSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        primary_override = app.dependency_overrides[get_read_db]
+        app.dependency_overrides[get_read_db] = replica_db
+        try:
+            exported = client.get("/api/sweets/export?format=ndjson", headers=auth_headers_admin).text
+            listed = [sweet["name"] for sweet in client.get("/api/sweets/").json()]
+            single = client.get(f"/api/sweets/{test_sweet.id}").json()["name"]
+        finally:
+            app.dependency_overrides[get_read_db] = primary_override
+            replica.dispose()
+
+        assert [json.loads(line)["name"] for line in exported.splitlines()] == ["Replica Rock"]
+        # Cached routes read the primary, so a lagging replica is never cached.
+        assert listed == [test_sweet.name]
+        assert single == test_sweet.name
@@ -0,0 +1,118 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.export import stream_export
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+
+
+@pytest.fixture
+def history(test_db, test_user):
+    sweets = [
+        Sweet(name="Chocolate Cake", category="Cakes", price=10.0, quantity=100),
+        Sweet(name="Lemon Tart", category="Tarts", price=4.0, quantity=0, is_available=False),
+    ]
+    test_db.add_all(sweets)
+    test_db.flush()
+    for day in range(1, 6):
+        sweet = sweets[day % 2]
+        test_db.add(Purchase(
+            user_id=test_user.id, sweet_id=sweet.id, quantity=day, unit_price=sweet.price,
+            total_price=sweet.price * day, status="completed",
+            created_at=datetime(2024, 3, day, 12, tzinfo=timezone.utc),
+        ))
+    test_db.commit()
+    return [sweet.id for sweet in sweets]
+
+
+def _csv(response):
+    return list(csv.DictReader(io.StringIO(response.text)))
+
+
+class TestPurchaseExport:
+    def test_export_csv(self, client: TestClient, history, auth_headers_admin):
+        response = client.get("/api/inventory/purchases/export", headers=auth_headers_admin)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/csv; charset=utf-8"
+        assert response.headers["content-disposition"] == 'attachment; filename="purchases.csv"'
+        rows = _csv(response)
+        assert [row["quantity"] for row in rows] == ["1", "2", "3", "4", "5"]
+        assert rows[0]["sweet_name"] == "Lemon Tart"
+        assert rows[0]["user_email"] == "testuser@example.com"
+        assert rows[0]["total_price"] == "4.0"
+        assert rows[0]["created_at"].startswith("2024-03-01T12:00:00")
+
+    def test_export_ndjson(self, client: TestClient, history, auth_headers_admin):
+        response = client.get("/api/inventory/purchases/export?format=ndjson", headers=auth_headers_admin)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 5
+        assert rows[1]["sweet_name"] == "Chocolate Cake"
+        assert rows[1]["total_price"] == 20.0
+
+    def test_export_filters(self, client: TestClient, history, auth_headers_admin):
+        response = client.get(
+            f"/api/inventory/purchases/export?start=2024-03-02&end=2024-03-04&sweet_id={history[1]}",
+            headers=auth_headers_admin
+        )
+
+        assert [row["quantity"] for row in _csv(response)] == ["3"]
+
+    def test_export_invalid_range(self, client: TestClient, auth_headers_admin):
+        response = client.get(
+            "/api/inventory/purchases/export?start=2024-03-04&end=2024-03-02", headers=auth_headers_admin
+        )
+
+        assert response.status_code == 400
+
+    def test_export_requires_admin(self, client: TestClient, auth_headers_user):
+        response = client.get("/api/inventory/purchases/export", headers=auth_headers_user)
+
+        assert response.status_code == 403
+
+    def test_export_streams_in_chunks(self, test_db, history, monkeypatch):
+        monkeypatch.setattr(settings, "EXPORT_CHUNK_ROWS", 2)
+        response = stream_export(test_db, select(Purchase.id).order_by(Purchase.id), ["id"], "csv", "purchases")
+
+        async def collect():
+            return [chunk async for chunk in response.body_iterator]
+
+        chunks = asyncio.run(collect())
+        assert chunks == [b"id\r\n", b"1\r\n2\r\n", b"3\r\n4\r\n", b"5\r\n"]
+
+
+class TestSweetExport:
+    def test_export_catalog(self, client: TestClient, history, auth_headers_admin):
+        response = client.get("/api/sweets/export", headers=auth_headers_admin)
+
+        assert response.status_code == 200
+        assert response.headers["content-disposition"] == 'attachment; filename="sweets.csv"'
+        rows = _csv(response)
+        assert [row["name"] for row in rows] == ["Chocolate Cake", "Lemon Tart"]
+        assert rows[1]["is_available"] == "False"
+        assert rows[0]["description"] == ""
+
+    def test_export_catalog_filters(self, client: TestClient, history, auth_headers_admin):
+        response = client.get("/api/sweets/export?format=ndjson&is_available=true", headers=auth_headers_admin)
+
+        assert [json.loads(line)["name"] for line in response.text.splitlines()] == ["Chocolate Cake"]
+
+        response = client.get("/api/sweets/export?category=Tarts", headers=auth_headers_admin)
+
+        assert [row["name"] for row in _csv(response)] == ["Lemon Tart"]
+
+    def test_export_catalog_requires_admin(self, client: TestClient, auth_headers_user):
+        response = client.get("/api/sweets/export", headers=auth_headers_user)
+
+        assert response.status_code == 403
@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.core import security
+from app.core.idempotency import IdempotencyMiddleware, InMemoryIdempotencyStore, OWNED, StoredResponse
+from app.models.purchase import Purchase
+from app.models.user import User
+
+
+def make_app(store, handler):
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, store=store, paths=["/work"], wait_seconds=5)
+    app.post("/work")(handler)
+    return app
+
+
+class TestIdempotentPurchase:
+    def test_retry_replays_the_first_purchase(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        headers = {**auth_headers_user, "Idempotency-Key": "order-1"}
+        payload = {"sweet_id": test_sweet.id, "quantity": 2}
+
+        first = client.post("/api/inventory/purchase", json=payload, headers=headers)
+        retry = client.post("/api/inventory/purchase", json=payload, headers=headers)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+        assert test_db.scalar(select(func.count(Purchase.id))) == 1
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 8
+
+    def test_without_key_each_request_runs(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        payload = {"sweet_id": test_sweet.id, "quantity": 1}
+
+        client.post("/api/inventory/purchase", json=payload, headers=auth_headers_user)
+        client.post("/api/inventory/purchase", json=payload, headers=auth_headers_user)
+
+        assert test_db.scalar(select(func.count(Purchase.id))) == 2
+
+    def test_key_reused_with_different_body(self, client: TestClient, test_sweet, auth_headers_user):
+        headers = {**auth_headers_user, "Idempotency-Key": "order-1"}
+        client.post("/api/inventory/purchase", json={"sweet_id": test_sweet.id, "quantity": 1}, headers=headers)
+
+        response = client.post(
+            "/api/inventory/purchase", json={"sweet_id": test_sweet.id, "quantity": 3}, headers=headers
+        )
+
+        assert response.status_code == 422
+        assert "different request body" in response.json()["detail"]
+
+    def test_keys_are_scoped_to_the_caller(
+        self, client: TestClient, test_db, test_sweet, auth_headers_user, auth_headers_admin
+    ):
+        payload = {"sweet_id": test_sweet.id, "quantity": 1}
+
+        mine = client.post("/api/inventory/purchase", json=payload, headers={**auth_headers_user, "Idempotency-Key": "k"})
+        theirs = client.post("/api/inventory/purchase", json=payload, headers={**auth_headers_admin, "Idempotency-Key": "k"})
+
+        assert mine.json()["user_email"] != theirs.json()["user_email"]
+        assert test_db.scalar(select(func.count(Purchase.id))) == 2
+
+    def test_client_errors_are_replayed(self, client: TestClient, test_sweet, auth_headers_user):
+        headers = {**auth_headers_user, "Idempotency-Key": "too-many"}
+        payload = {"sweet_id": test_sweet.id, "quantity": 11}
+
+        first = client.post("/api/inventory/purchase", json=payload, headers=headers)
+        retry = client.post("/api/inventory/purchase", json=payload, headers=headers)
+
+        assert first.status_code == retry.status_code == 400
+        assert retry.headers["idempotent-replayed"] == "true"
+
+    def test_overlong_key_is_rejected(self, client: TestClient, test_sweet, auth_headers_user):
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": test_sweet.id, "quantity": 1},
+            headers={**auth_headers_user, "Idempotency-Key": "k" * 256},
+        )
+
+        assert response.status_code == 400
+
+
+class TestIdempotentRegistration:
+    def test_retry_does_not_hash_again(self, client: TestClient, test_db, monkeypatch):
+        hashed = []
+        original = security.password_context().hash
+        monkeypatch.setattr(security.password_context(), "hash", lambda password: hashed.append(1) or original(password))
+        payload = {"email": "retry@example.com", "password": "password123", "full_name": "Retry"}
+        headers = {"Idempotency-Key": "signup-1"}
+
+        first = client.post("/api/auth/register", json=payload, headers=headers)
+        retry = client.post("/api/auth/register", json=payload, headers=headers)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert len(hashed) == 1
+        assert test_db.scalar(select(func.count(User.id)).where(User.email == "retry@example.com")) == 1
+
+
+class TestIdempotencyMiddleware:
+    def test_concurrent_duplicates_wait_for_the_first(self):
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.2)
+            return {"call": len(calls)}
+
+        app = make_app(InMemoryIdempotencyStore(100, 60), handler)
+
+        async def burst():
+            async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+                return await asyncio.gather(*[
+                    http.post("/work", json={}, headers={"Idempotency-Key": "same"}) for _ in range(5)
+                ])
+
+        responses = asyncio.run(burst())
+
+        assert len(calls) == 1
+        assert [response.json() for response in responses] == [{"call": 1}] * 5
+        assert sum(response.headers.get("idempotent-replayed") == "true" for response in responses) == 4
+
+    def test_server_errors_are_not_stored(self):
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            if len(calls) == 1:
+                raise HTTPException(status_code=503, detail="try again")
+            return {"call": len(calls)}
+
+        client = TestClient(make_app(InMemoryIdempotencyStore(100, 60), handler))
+        headers = {"Idempotency-Key": "flaky"}
+
+        assert client.post("/work", json={}, headers=headers).status_code == 503
+        assert client.post("/work", json={}, headers=headers).json() == {"call": 2}
+        assert client.post("/work", json={}, headers=headers).json() == {"call": 2}
+        assert len(calls) == 2
+
+    def test_store_evicts_expired_and_oldest_entries(self):
+        store = InMemoryIdempotencyStore(maxsize=2, ttl_seconds=0.05)
+        response = StoredResponse(201, [], b"{}")
+
+        for key in ("a", "b", "c"):
+            assert store.claim(key, b"f") is OWNED
+            store.complete(key, response)
+        assert len(store) == 2
+        assert store.claim("a", b"f") is OWNED
+        assert store.claim("c", b"f") == response
+
+        time.sleep(0.06)
+        assert store.claim("b", b"f") is OWNED
+        assert len(store) == 1
+
+    def test_stored_response_round_trips(self):
+        response = StoredResponse(201, [(b"content-type", b"application/json")], b'{"id": 1}\n')
+
+        assert StoredResponse.decode(response.encode()) == response
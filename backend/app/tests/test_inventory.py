@@ -0,0 +1,472 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.api import inventory
+from app.config import settings
+from app.core.ledger import PurchaseLedger
+from app.core.pagination import encode_cursor
+from app.core.stock import purchase_stock
+from app.database import Base
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+from app.models.user import User
+from app.tests.conftest import TestingSessionLocal, engine as sqlite_engine
+
+
+class TestPurchase:
+    def test_purchase_sweet_success(self, client: TestClient, test_sweet, auth_headers_user):
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": test_sweet.id, "quantity": 3},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["sweet_id"] == test_sweet.id
+        assert data["quantity"] == 3
+        assert data["unit_price"] == test_sweet.price
+        assert data["total_price"] == pytest.approx(test_sweet.price * 3)
+        assert data["sweet_name"] == test_sweet.name
+        assert data["user_email"] == "testuser@example.com"
+        assert data["status"] == "completed"
+
+        sweet = client.get(f"/api/sweets/{test_sweet.id}").json()
+        assert sweet["quantity"] == 7
+
+    def test_purchase_insufficient_stock(self, client: TestClient, test_sweet, auth_headers_user):
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": test_sweet.id, "quantity": 11},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 400
+        assert "Only 10 items available" in response.json()["detail"]
+
+    def test_purchase_unavailable_sweet(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        test_sweet.is_available = False
+        test_db.commit()
+
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": test_sweet.id, "quantity": 1},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 400
+        assert "not available" in response.json()["detail"]
+
+    def test_purchase_unknown_sweet(self, client: TestClient, auth_headers_user):
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": 999, "quantity": 1},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 404
+
+
+class TestBatchPurchase:
+    @pytest.fixture
+    def second_sweet(self, test_db):
+        sweet = Sweet(name="Vanilla Cupcake", category="Cupcakes", price=3.5, quantity=5, is_available=True)
+        test_db.add(sweet)
+        test_db.commit()
+        test_db.refresh(sweet)
+        return sweet
+
+    def test_batch_purchase_success(self, client: TestClient, test_sweet, second_sweet, auth_headers_user):
+        items = [
+            {"sweet_id": test_sweet.id, "quantity": 2},
+            {"sweet_id": second_sweet.id, "quantity": 5},
+            {"sweet_id": test_sweet.id, "quantity": 1},
+        ]
+
+        response = client.post(
+            "/api/inventory/purchase/batch",
+            json={"items": items},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 201
+        data = response.json()
+        assert [(p["sweet_id"], p["quantity"]) for p in data] == [
+            (item["sweet_id"], item["quantity"]) for item in items
+        ]
+        assert data[1]["sweet_name"] == second_sweet.name
+        assert data[1]["total_price"] == pytest.approx(17.5)
+        assert all(p["user_email"] == "testuser@example.com" for p in data)
+
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 7
+        assert client.get(f"/api/sweets/{second_sweet.id}").json()["quantity"] == 0
+
+    def test_batch_purchase_is_all_or_nothing(
+        self, client: TestClient, test_db, test_sweet, second_sweet, auth_headers_user
+    ):
+        response = client.post(
+            "/api/inventory/purchase/batch",
+            json={"items": [
+                {"sweet_id": test_sweet.id, "quantity": 2},
+                {"sweet_id": second_sweet.id, "quantity": 3},
+                {"sweet_id": second_sweet.id, "quantity": 3},
+            ]},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 400
+        assert "Only 5 items available" in response.json()["detail"]
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+        assert test_db.query(Purchase).count() == 0
+
+    def test_batch_purchase_unknown_sweet(self, client: TestClient, test_sweet, auth_headers_user):
+        response = client.post(
+            "/api/inventory/purchase/batch",
+            json={"items": [
+                {"sweet_id": test_sweet.id, "quantity": 1},
+                {"sweet_id": 999, "quantity": 1},
+            ]},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 404
+
+    def test_batch_purchase_requires_items(self, client: TestClient, auth_headers_user):
+        response = client.post(
+            "/api/inventory/purchase/batch",
+            json={"items": []},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 422
+
+
+class TestRestock:
+    @pytest.fixture
+    def second_sweet(self, test_db):
+        sweet = Sweet(name="Vanilla Cupcake", category="Cupcakes", price=3.5, quantity=5, is_available=True)
+        test_db.add(sweet)
+        test_db.commit()
+        test_db.refresh(sweet)
+        return sweet
+
+    def test_restock_records_movement(self, client: TestClient, test_sweet, test_admin_user, auth_headers_admin):
+        response = client.post(f"/api/inventory/restock/{test_sweet.id}?quantity=5", headers=auth_headers_admin)
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "message": f"Sweet '{test_sweet.name}' restocked successfully",
+            "old_quantity": 10,
+            "new_quantity": 15,
+            "added_quantity": 5,
+        }
+        movements = client.get("/api/inventory/movements", headers=auth_headers_admin).json()
+        assert [(m["sweet_id"], m["delta"], m["quantity_after"], m["reason"], m["user_id"]) for m in movements] == [
+            (test_sweet.id, 5, 15, "restock", test_admin_user.id)
+        ]
+
+    def test_restock_unknown_sweet(self, client: TestClient, auth_headers_admin):
+        response = client.post("/api/inventory/restock/999?quantity=5", headers=auth_headers_admin)
+
+        assert response.status_code == 404
+
+    def test_batch_restock(self, client: TestClient, db_engine, test_sweet, second_sweet, auth_headers_admin):
+        items = [
+            {"sweet_id": test_sweet.id, "delta": 20},
+            {"sweet_id": second_sweet.id, "delta": -5},
+            {"sweet_id": test_sweet.id, "delta": -3},
+        ]
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_engine, "before_cursor_execute", listener)
+        try:
+            response = client.post(
+                "/api/inventory/restock/batch",
+                json={"items": items, "reason": "delivery"},
+                headers=auth_headers_admin
+            )
+        finally:
+            event.remove(db_engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        assert [(m["sweet_name"], m["delta"], m["quantity_after"], m["reason"]) for m in response.json()] == [
+            (test_sweet.name, 20, 30, "delivery"),
+            ("Vanilla Cupcake", -5, 0, "delivery"),
+            (test_sweet.name, -3, 27, "delivery"),
+        ]
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 27
+        assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE SWEETS")]) == 1
+        assert len([s for s in statements if "INSERT INTO stock_movements" in s]) == 1
+
+        movements = client.get(
+            f"/api/inventory/movements?sweet_id={test_sweet.id}&limit=1", headers=auth_headers_admin
+        )
+        assert [m["delta"] for m in movements.json()] == [-3]
+        next_page = client.get(
+            f"/api/inventory/movements?sweet_id={test_sweet.id}&limit=1&cursor={movements.headers['X-Next-Cursor']}",
+            headers=auth_headers_admin
+        )
+        assert [m["delta"] for m in next_page.json()] == [20]
+
+    def test_batch_restock_is_all_or_nothing(
+        self, client: TestClient, test_sweet, second_sweet, auth_headers_admin
+    ):
+        response = client.post(
+            "/api/inventory/restock/batch",
+            json={"items": [{"sweet_id": test_sweet.id, "delta": 5}, {"sweet_id": second_sweet.id, "delta": -6}]},
+            headers=auth_headers_admin
+        )
+
+        assert response.status_code == 400
+        assert "negative stock (5 in stock)" in response.json()["detail"]
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+        assert client.get("/api/inventory/movements", headers=auth_headers_admin).json() == []
+
+        response = client.post(
+            "/api/inventory/restock/batch",
+            json={"items": [{"sweet_id": test_sweet.id, "delta": 5}, {"sweet_id": 999, "delta": 1}]},
+            headers=auth_headers_admin
+        )
+
+        assert response.status_code == 404
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+
+    def test_batch_restock_validation(self, client: TestClient, test_sweet, auth_headers_admin, auth_headers_user):
+        response = client.post(
+            "/api/inventory/restock/batch",
+            json={"items": [{"sweet_id": test_sweet.id, "delta": 0}]},
+            headers=auth_headers_admin
+        )
+
+        assert response.status_code == 422
+
+        response = client.post(
+            "/api/inventory/restock/batch",
+            json={"items": [{"sweet_id": test_sweet.id, "delta": 1}]},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 403
+
+
+class TestGroupCommit:
+    @pytest.fixture
+    def ledger(self, monkeypatch):
+        ledger = PurchaseLedger(TestingSessionLocal, max_batch=100, max_delay_ms=50, queue_size=1000)
+        monkeypatch.setattr(settings, "PURCHASE_GROUP_COMMIT", True)
+        monkeypatch.setattr(inventory, "purchase_ledger", ledger)
+        yield ledger
+        ledger.stop()
+
+    def test_purchase_through_ledger(self, client: TestClient, ledger, test_sweet, auth_headers_user):
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": test_sweet.id, "quantity": 3},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["quantity"] == 3
+        assert data["total_price"] == pytest.approx(test_sweet.price * 3)
+        assert data["sweet_name"] == test_sweet.name
+        assert data["user_email"] == "testuser@example.com"
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 7
+
+    def test_ledger_reports_stock_errors(self, client: TestClient, ledger, test_sweet, auth_headers_user):
+        response = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": test_sweet.id, "quantity": 11},
+            headers=auth_headers_user
+        )
+        missing = client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": 999, "quantity": 1},
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 400
+        assert "Only 10 items available" in response.json()["detail"]
+        assert missing.status_code == 404
+
+    def test_concurrent_purchases_share_transactions(self, ledger, test_db, test_user, test_sweet):
+        futures = [ledger.submit(test_user.id, test_sweet.id, 1) for _ in range(15)]
+
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result(timeout=10)["quantity"])
+            except HTTPException as exc:
+                outcomes.append(exc.status_code)
+
+        assert outcomes == [1] * 10 + [400] * 5
+        assert ledger.batches < len(futures)
+        test_db.expire_all()
+        assert test_db.get(Sweet, test_sweet.id).quantity == 0
+        assert test_db.query(Purchase).count() == 10
+
+    def test_cancelled_requests_are_not_applied(self, ledger, test_db, test_user, test_sweet):
+        cancelled = ledger.submit(test_user.id, test_sweet.id, 1)
+        cancelled.cancel()
+        kept = ledger.submit(test_user.id, test_sweet.id, 2)
+
+        assert kept.result(timeout=10)["quantity"] == 2
+        assert test_db.query(Purchase).count() == 1
+
+    def test_failed_batch_is_retried_one_by_one(self, ledger, test_db, test_user, test_sweet):
+        ledger.max_delay = 0.2
+        apply = ledger._apply
+
+        def fail_shared_batches(batch):
+            if len(batch) > 1:
+                raise RuntimeError("shared transaction failed")
+            return apply(batch)
+
+        ledger._apply = fail_shared_batches
+        futures = [ledger.submit(test_user.id, test_sweet.id, 1) for _ in range(3)]
+
+        assert [future.result(timeout=10)["quantity"] for future in futures] == [1, 1, 1]
+        assert test_db.query(Purchase).count() == 3
+
+
+class TestPurchaseHistory:
+    @pytest.fixture
+    def purchases(self, test_db, test_user, test_sweet):
+        purchases = [
+            Purchase(
+                user_id=test_user.id,
+                sweet_id=test_sweet.id,
+                quantity=1,
+                unit_price=test_sweet.price,
+                total_price=test_sweet.price,
+            )
+            for _ in range(5)
+        ]
+        test_db.add_all(purchases)
+        test_db.commit()
+        return [purchase.id for purchase in purchases]
+
+    def test_my_purchases_uses_constant_queries(self, client: TestClient, db_engine, purchases, auth_headers_user):
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", count)
+        try:
+            response = client.get("/api/inventory/purchases/my", headers=auth_headers_user)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", count)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 5
+        assert all(p["sweet_name"] == "Chocolate Cake" for p in data)
+        assert all(p["user_email"] == "testuser@example.com" for p in data)
+        assert len([s for s in statements if "FROM purchases" in s]) == 1
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_my_purchases_keyset_pagination(self, client: TestClient, purchases, auth_headers_user):
+        seen = []
+        url = "/api/inventory/purchases/my?limit=2"
+        while True:
+            response = client.get(url, headers=auth_headers_user)
+            assert response.status_code == 200
+            seen.extend(p["id"] for p in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            assert 'rel="next"' in response.headers["Link"]
+            url = f"/api/inventory/purchases/my?limit=2&cursor={cursor}"
+
+        assert seen == sorted(purchases, reverse=True)
+
+    def test_my_purchases_invalid_cursor(self, client: TestClient, auth_headers_user):
+        response = client.get("/api/inventory/purchases/my?cursor=not-a-cursor", headers=auth_headers_user)
+
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("values", [[{"a": 1}], ["7"], [True], [1.5]])
+    def test_cursor_id_must_be_an_integer(
+        self, client: TestClient, auth_headers_user, auth_headers_admin, values
+    ):
+        cursor = encode_cursor(values)
+
+        mine = client.get(f"/api/inventory/purchases/my?cursor={cursor}", headers=auth_headers_user)
+        movements = client.get(f"/api/inventory/movements?cursor={cursor}", headers=auth_headers_admin)
+
+        assert (mine.status_code, mine.json()) == (400, {"detail": "Invalid cursor"})
+        assert (movements.status_code, movements.json()) == (400, {"detail": "Invalid cursor"})
+
+
+def _engines():
+    yield pytest.param(sqlite_engine, id="sqlite")
+    postgres_url = os.getenv("TEST_POSTGRES_URL")
+    yield pytest.param(
+        postgres_url,
+        id="postgresql",
+        marks=pytest.mark.skipif(not postgres_url, reason="TEST_POSTGRES_URL not set"),
+    )
+
+
+@pytest.fixture(params=list(_engines()))
+def stress_engine(request):
+    engine = request.param
+    if isinstance(engine, str):
+        engine = create_engine(engine, pool_size=20, max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+class TestPurchaseConcurrency:
+    THREADS = 16
+    ATTEMPTS_PER_THREAD = 10
+    STOCK = 50
+
+    def test_concurrent_purchases_never_oversell(self, stress_engine):
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=stress_engine)
+        with Session() as db:
+            user = User(email="buyer@example.com", hashed_password="x", is_active=True)
+            sweet = Sweet(name="Flash Sale Fudge", category="Fudge", price=2.5, quantity=self.STOCK)
+            db.add_all([user, sweet])
+            db.commit()
+            user_id, sweet_id = user.id, sweet.id
+
+        def buyer(_):
+            sold = 0
+            with Session() as db:
+                for _ in range(self.ATTEMPTS_PER_THREAD):
+                    try:
+                        purchase_stock(db, user_id, sweet_id, 1)
+                        sold += 1
+                    except HTTPException as exc:
+                        assert exc.status_code == 400
+            return sold
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            sold = sum(pool.map(buyer, range(self.THREADS)))
+        elapsed = time.perf_counter() - started
+
+        with Session() as db:
+            remaining = db.execute(select(Sweet.quantity).where(Sweet.id == sweet_id)).scalar_one()
+            purchased = db.execute(
+                select(func.sum(Purchase.quantity)).where(Purchase.sweet_id == sweet_id)
+            ).scalar_one()
+
+        attempts = self.THREADS * self.ATTEMPTS_PER_THREAD
+        print(
+            f"\n[{stress_engine.dialect.name}] {attempts} attempts, {sold} sold in "
+            f"{elapsed:.3f}s ({attempts / elapsed:.0f} purchases/s)"
+        )
+        assert sold == self.STOCK
+        assert purchased == self.STOCK
+        assert remaining == 0
@@ -15,4 +15,11 @@ def test_health_check(client: TestClient):
     data = response.json()
     assert data["status"] == "healthy"
     assert "Sweet Shop API is running!" in data["message"]
-    assert data["version"] == "1.0.0"
\ No newline at end of file
+    assert data["version"] == "1.0.0"
+
+def test_pool_health(client: TestClient):
+    response = client.get("/health/pool")
+    assert response.status_code == 200
+    primary = response.json()["primary"]
+    assert primary["pool"] == "InstrumentedQueuePool"
+    assert {"size", "checked_out", "overflow", "checkouts", "timeouts", "overflow_events"} <= set(primary)
@@ -0,0 +1,66 @@
+import logging
+import re
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+
+
+def _sample(text: str, name: str, **labels) -> float:
+    for line in text.splitlines():
+        match = re.fullmatch(rf"{name}(?:\{{(.*)\}})? (\S+)", line)
+        if match and all(f'{key}="{value}"' in (match.group(1) or "") for key, value in labels.items()):
+            return float(match.group(2))
+    raise AssertionError(f"{name} {labels} not found")
+
+
+class TestMetrics:
+    def test_requests_are_recorded_by_route_template(self, client: TestClient, test_sweet):
+        client.get(f"/api/sweets/{test_sweet.id}")
+        client.get("/api/sweets/999")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        route = "/api/sweets/{sweet_id}"
+        assert _sample(text, "http_request_duration_seconds_count", route=route, status="200") == 1
+        assert _sample(text, "http_request_duration_seconds_count", route=route, status="404") == 1
+        assert _sample(text, "http_request_duration_seconds_bucket", route=route, status="200", le="+Inf") == 1
+        assert f'/api/sweets/{test_sweet.id}"' not in text
+
+    def test_unknown_paths_share_one_label(self, client: TestClient):
+        client.get("/no/such/path")
+        client.get("/another/missing/path")
+
+        text = client.get("/metrics").text
+
+        assert _sample(text, "http_request_duration_seconds_count", route="unmatched", status="404") == 2
+
+    def test_database_statements_are_counted_per_request(
+        self, client: TestClient, test_sweet, auth_headers_user
+    ):
+        client.post("/api/inventory/purchase", json={"sweet_id": test_sweet.id, "quantity": 1}, headers=auth_headers_user)
+
+        text = client.get("/metrics").text
+
+        route = "/api/inventory/purchase"
+        assert _sample(text, "http_request_db_queries_count", route=route) == 1
+        assert _sample(text, "http_request_db_queries_sum", route=route) >= 2
+        assert _sample(text, "http_request_db_duration_seconds_sum", route=route) > 0
+
+    def test_pool_metrics_are_exposed(self, client: TestClient):
+        text = client.get("/metrics").text
+
+        assert _sample(text, "db_pool_size", engine="primary") == settings.DB_POOL_SIZE
+        assert "db_pool_checkout_seconds_count" in text
+
+    def test_slow_queries_are_logged(self, client: TestClient, test_sweet, monkeypatch, caplog):
+        monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+
+        with caplog.at_level(logging.WARNING, logger="app.db.slow"):
+            client.get(f"/api/sweets/{test_sweet.id}")
+
+        assert any("Slow query" in record.message and "FROM sweets" in record.message for record in caplog.records)
+        assert _sample(client.get("/metrics").text, "db_slow_queries_total") >= 1
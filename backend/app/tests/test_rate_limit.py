@@ -0,0 +1,108 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.rate_limit import InMemoryBucketStore, RateLimit, RateLimitMiddleware, parse_rate, parse_rate_limits
+from app.core.security import create_access_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_client(store, limits):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, store=store, limits=limits)
+    app.get("/limited")(lambda: {"ok": True})
+    app.get("/open")(lambda: {"ok": True})
+    return TestClient(app)
+
+
+def bearer(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+class TestRateLimitParsing:
+    def test_parse_rates(self):
+        assert parse_rate("10/minute") == RateLimit(10, 60)
+        assert parse_rate("5/30s") == RateLimit(5, 30)
+        assert parse_rate("100 / hour") == RateLimit(100, 3600)
+
+    def test_parse_route_limits(self):
+        limits = parse_rate_limits("post /api/auth/login=10/minute, GET /api/sweets/search=2/second")
+
+        assert limits == {
+            ("POST", "/api/auth/login"): RateLimit(10, 60),
+            ("GET", "/api/sweets/search"): RateLimit(2, 1),
+        }
+
+    @pytest.mark.parametrize("spec", ["/login=10/minute", "POST /login=ten/minute", "POST /login=0/minute"])
+    def test_invalid_limits(self, spec):
+        with pytest.raises(ValueError):
+            parse_rate_limits(spec)
+
+
+class TestRateLimitMiddleware:
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        client = make_client(InMemoryBucketStore(60, clock), {("GET", "/limited"): RateLimit(3, 60)})
+
+        assert [client.get("/limited").status_code for _ in range(4)] == [200, 200, 200, 429]
+        limited = client.get("/limited")
+        assert limited.headers["retry-after"] == "20"
+        assert "Too many requests" in limited.json()["detail"]
+
+        clock.now += 20
+        assert client.get("/limited").status_code == 200
+        assert client.get("/limited").status_code == 429
+
+    def test_other_routes_are_not_limited(self):
+        client = make_client(InMemoryBucketStore(60, FakeClock()), {("GET", "/limited"): RateLimit(1, 60)})
+
+        assert [client.get("/open").status_code for _ in range(5)] == [200] * 5
+
+    def test_buckets_are_per_user(self):
+        client = make_client(InMemoryBucketStore(60, FakeClock()), {("GET", "/limited"): RateLimit(1, 60)})
+
+        assert client.get("/limited", headers=bearer("a@example.com")).status_code == 200
+        assert client.get("/limited", headers=bearer("a@example.com")).status_code == 429
+        assert client.get("/limited", headers=bearer("b@example.com")).status_code == 200
+        assert client.get("/limited").status_code == 200
+        assert client.get("/limited").status_code == 429
+
+    def test_invalid_token_falls_back_to_address(self):
+        client = make_client(InMemoryBucketStore(60, FakeClock()), {("GET", "/limited"): RateLimit(1, 60)})
+
+        assert client.get("/limited", headers={"Authorization": "Bearer nope"}).status_code == 200
+        assert client.get("/limited").status_code == 429
+
+    def test_idle_buckets_are_evicted(self):
+        clock = FakeClock()
+        store = InMemoryBucketStore(60, clock)
+        limit = RateLimit(5, 60)
+        for n in range(100):
+            store.take(f"ip:{n}", limit)
+        assert len(store) == 100
+
+        clock.now += 30
+        store.take("ip:0", limit)
+        clock.now += 30
+        store.take("ip:new", limit)
+
+        assert len(store) == 2
+
+
+class TestAppRateLimits:
+    def test_login_is_limited_per_address(self, client: TestClient, test_user):
+        form = {"username": test_user.email, "password": "wrong-password"}
+
+        statuses = [client.post("/api/auth/login", data=form).status_code for _ in range(11)]
+
+        assert statuses == [401] * 10 + [429]
+        metrics = client.get("/metrics").text
+        assert 'rate_limited_requests_total{route="/api/auth/login"} 1' in metrics
+        assert 'route="/api/auth/login",status="429"' in metrics
@@ -0,0 +1,219 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select, update
+
+from app.core.reservations import ReservationSweeper, release_expired
+from app.core.security import create_access_token, get_password_hash
+from app.models.purchase import Purchase
+from app.models.reservation import Reservation
+from app.models.user import User
+from app.tests.conftest import TestingSessionLocal
+
+
+def reserve(client, headers, sweet_id, quantity, **extra):
+    return client.post(
+        "/api/inventory/reservations",
+        json={"sweet_id": sweet_id, "quantity": quantity, **extra},
+        headers=headers
+    )
+
+
+def expire(test_db, reservation_id):
+    test_db.execute(
+        update(Reservation)
+        .where(Reservation.id == reservation_id)
+        .values(expires_at=datetime.now(timezone.utc) - timedelta(minutes=1))
+    )
+    test_db.commit()
+
+
+class TestReservations:
+    def test_reserve_holds_stock(self, client: TestClient, test_sweet, auth_headers_user):
+        response = reserve(client, auth_headers_user, test_sweet.id, 4, ttl_minutes=5)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["quantity"] == 4
+        assert data["sweet_name"] == test_sweet.name
+        expires_at = datetime.fromisoformat(data["expires_at"])
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        assert timedelta(minutes=4) < expires_at - datetime.now(timezone.utc) <= timedelta(minutes=5)
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 6
+
+        mine = client.get("/api/inventory/reservations", headers=auth_headers_user).json()
+        assert [reservation["id"] for reservation in mine] == [data["id"]]
+
+    def test_reserve_insufficient_stock(self, client: TestClient, test_sweet, auth_headers_user):
+        response = reserve(client, auth_headers_user, test_sweet.id, 11)
+
+        assert response.status_code == 400
+        assert "Only 10 items available" in response.json()["detail"]
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+
+    def test_reserve_rejects_long_ttl(self, client: TestClient, test_sweet, auth_headers_user):
+        response = reserve(client, auth_headers_user, test_sweet.id, 1, ttl_minutes=10_000)
+
+        assert response.status_code == 422
+
+    def test_purchase_converts_reservation(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 3).json()
+
+        response = client.post(
+            f"/api/inventory/reservations/{reservation['id']}/purchase",
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["quantity"] == 3
+        assert data["total_price"] == pytest.approx(test_sweet.price * 3)
+        assert data["user_email"] == "testuser@example.com"
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 7
+        assert client.get("/api/inventory/reservations", headers=auth_headers_user).json() == []
+        assert test_db.scalar(select(func.count(Purchase.id))) == 1
+
+        again = client.post(
+            f"/api/inventory/reservations/{reservation['id']}/purchase",
+            headers=auth_headers_user
+        )
+        assert again.status_code == 404
+
+    def test_purchase_expired_reservation(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 3).json()
+        expire(test_db, reservation["id"])
+
+        response = client.post(
+            f"/api/inventory/reservations/{reservation['id']}/purchase",
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 410
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+        assert test_db.scalar(select(func.count(Purchase.id))) == 0
+
+    def test_purchase_expired_reservation_refreshes_catalog(
+        self, client: TestClient, test_db, test_sweet, auth_headers_user
+    ):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 3).json()
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 7
+        expire(test_db, reservation["id"])
+
+        client.post(f"/api/inventory/reservations/{reservation['id']}/purchase", headers=auth_headers_user)
+
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+
+    def test_purchase_reservation_of_deleted_sweet(
+        self, client: TestClient, test_db, test_sweet, auth_headers_user, auth_headers_admin
+    ):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 3).json()
+        assert client.delete(f"/api/sweets/{test_sweet.id}", headers=auth_headers_admin).status_code == 204
+
+        response = client.post(
+            f"/api/inventory/reservations/{reservation['id']}/purchase",
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 404
+        assert test_db.scalar(select(func.count(Purchase.id))) == 0
+        assert client.get("/api/inventory/reservations", headers=auth_headers_user).json() == []
+
+    def test_purchase_reservation_of_unavailable_sweet(
+        self, client: TestClient, test_db, test_sweet, auth_headers_user, auth_headers_admin
+    ):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 3).json()
+        client.put(f"/api/sweets/{test_sweet.id}", json={"is_available": False}, headers=auth_headers_admin)
+
+        response = client.post(
+            f"/api/inventory/reservations/{reservation['id']}/purchase",
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 400
+        assert test_db.scalar(select(func.count(Purchase.id))) == 0
+        test_db.refresh(test_sweet)
+        assert test_sweet.quantity == 10
+
+    def test_release_returns_stock(self, client: TestClient, test_sweet, auth_headers_user):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 5).json()
+
+        response = client.delete(
+            f"/api/inventory/reservations/{reservation['id']}",
+            headers=auth_headers_user
+        )
+
+        assert response.status_code == 204
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+
+    def test_other_users_reservation_not_found(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 2).json()
+        other = User(email="other@example.com", hashed_password=get_password_hash("x"), is_active=True)
+        test_db.add(other)
+        test_db.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': other.email})}"}
+
+        assert client.delete(f"/api/inventory/reservations/{reservation['id']}", headers=headers).status_code == 404
+        assert client.post(
+            f"/api/inventory/reservations/{reservation['id']}/purchase", headers=headers
+        ).status_code == 404
+        assert client.get("/api/inventory/reservations", headers=headers).json() == []
+
+    def test_reservations_require_auth(self, client: TestClient, test_sweet):
+        assert client.post(
+            "/api/inventory/reservations", json={"sweet_id": test_sweet.id, "quantity": 1}
+        ).status_code == 401
+
+
+class TestReservationSweeper:
+    def test_sweep_releases_only_expired(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        live = reserve(client, auth_headers_user, test_sweet.id, 2).json()
+        stale = [reserve(client, auth_headers_user, test_sweet.id, 1).json() for _ in range(3)]
+        for reservation in stale:
+            expire(test_db, reservation["id"])
+
+        released = ReservationSweeper(TestingSessionLocal, 60, batch_size=2).sweep()
+
+        assert released == 3
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 8
+        mine = client.get("/api/inventory/reservations", headers=auth_headers_user).json()
+        assert [reservation["id"] for reservation in mine] == [live["id"]]
+
+    def test_sweep_refreshes_catalog(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 2).json()
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 8
+        expire(test_db, reservation["id"])
+
+        with TestingSessionLocal() as db:
+            assert release_expired(db, 100) == 1
+
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+
+    def test_sweep_reads_through_expiry_index(self, client: TestClient, test_db, test_sweet, auth_headers_user):
+        reservation = reserve(client, auth_headers_user, test_sweet.id, 1).json()
+        expire(test_db, reservation["id"])
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        bind = test_db.get_bind()
+        event.listen(bind, "before_cursor_execute", record)
+        try:
+            with TestingSessionLocal() as db:
+                assert release_expired(db, 100) == 1
+        finally:
+            event.remove(bind, "before_cursor_execute", record)
+
+        claim = next(statement for statement in statements if statement.startswith("DELETE FROM reservations"))
+        assert "ORDER BY reservations.expires_at" in claim
+        assert "LIMIT" in claim
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+
+    def test_sweep_with_nothing_due(self, client: TestClient, test_sweet, auth_headers_user):
+        reserve(client, auth_headers_user, test_sweet.id, 1)
+
+        with TestingSessionLocal() as db:
+            assert release_expired(db, 100) == 0
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 9
@@ -0,0 +1,94 @@
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core.catalog_cache import catalog_cache
+from app.core.responses import FastJSONResponse, fast_path_enabled, rows_response
+from app.models.sweet import Sweet
+from app.schemas.analytics import SweetSalesResponse
+
+
+@pytest.fixture
+def shop(client: TestClient, test_db, test_sweet, auth_headers_user, auth_headers_admin):
+    test_db.add_all([
+        Sweet(name="Crème brûlée", category="Desserts", price=4.5, quantity=0, is_available=True),
+        Sweet(name="Lemon Tart", category="Pastries", price=3.1, quantity=7, description="Tangy", is_available=True),
+        Sweet(name="Hidden Fudge", category="Candy", price=1.0, quantity=3, is_available=False),
+    ])
+    test_db.commit()
+    for quantity in (1, 2, 3):
+        client.post("/api/inventory/purchase", json={"sweet_id": test_sweet.id, "quantity": quantity}, headers=auth_headers_user)
+    client.post(
+        "/api/inventory/restock/batch",
+        json={"items": [{"sweet_id": test_sweet.id, "delta": 5}, {"sweet_id": 3, "delta": 2}]},
+        headers=auth_headers_admin,
+    )
+    client.post("/api/inventory/reservations", json={"sweet_id": 3, "quantity": 2}, headers=auth_headers_user)
+    return client
+
+
+ENDPOINTS = [
+    ("/api/sweets/", "user"),
+    ("/api/sweets/?limit=2&order_by=price", "user"),
+    ("/api/sweets/1", "user"),
+    ("/api/sweets/search?q=tart", "user"),
+    ("/api/sweets/search?category=desserts", "user"),
+    ("/api/inventory/purchases/my?limit=2", "user"),
+    ("/api/inventory/reservations", "user"),
+    ("/api/inventory/movements?limit=1", "admin"),
+    ("/api/inventory/analytics/sweets", "admin"),
+    ("/api/inventory/analytics/categories", "admin"),
+    ("/api/inventory/analytics/daily", "admin"),
+    ("/api/inventory/analytics/top-sellers?by=revenue", "admin"),
+]
+
+
+class TestResponseFastPath:
+    @pytest.mark.parametrize("path,caller", ENDPOINTS)
+    def test_fast_path_is_byte_identical(
+        self, shop, monkeypatch, path, caller, auth_headers_user, auth_headers_admin
+    ):
+        headers = auth_headers_admin if caller == "admin" else auth_headers_user
+        responses = []
+        for enabled in (False, True):
+            monkeypatch.setattr(settings, "RESPONSE_FAST_PATH", enabled)
+            # Without orjson both requests would take the slow path and the
+            # comparison below would prove nothing.
+            assert fast_path_enabled() is enabled
+            catalog_cache.clear()
+            responses.append(shop.get(path, headers=headers))
+
+        baseline, fast = responses
+        assert baseline.status_code == fast.status_code == 200
+        assert baseline.json()
+        assert fast.content == baseline.content
+        assert fast.headers["content-type"] == baseline.headers["content-type"]
+        assert fast.headers.get("link") == baseline.headers.get("link")
+
+    def test_fast_path_keeps_not_found(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(settings, "RESPONSE_FAST_PATH", True)
+
+        assert client.get("/api/sweets/999").status_code == 404
+
+    def test_fast_json_response_matches_json_response(self):
+        content = {
+            "name": "Crème brûlée ☕",
+            "price": 12.99,
+            "total": 0.1 + 0.2,
+            "quantity": 3,
+            "tags": [None, True, False],
+            "nested": {"1": [1.5, -2]},
+        }
+
+        assert FastJSONResponse(content).body == JSONResponse(content).body
+
+    def test_rows_response_skips_validation_only_on_fast_path(self, monkeypatch):
+        rows = [{"sweet_id": 1, "category": "Cakes", "sweet_name": "Cake", "quantity": 2, "revenue": 5.0, "orders": 1}]
+
+        monkeypatch.setattr(settings, "RESPONSE_FAST_PATH", False)
+        assert rows_response(rows, SweetSalesResponse) is rows
+
+        monkeypatch.setattr(settings, "RESPONSE_FAST_PATH", True)
+        response = rows_response(rows, SweetSalesResponse)
+        assert response.body == b'[{"quantity":2,"revenue":5.0,"orders":1,"sweet_id":1,"sweet_name":"Cake","category":"Cakes"}]'
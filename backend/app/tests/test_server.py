@@ -0,0 +1,224 @@
+import asyncio
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+
+from app import database
+from app.core.pool import InstrumentedQueuePool
+from app.database import create_schema, dispose_engines, warm_pools
+from app.server import gunicorn_options
+
+BACKEND = Path(__file__).resolve().parents[2]
+
+# The sweets table as the first release created it on SQLite.
+BASELINE_SWEETS = """
+    CREATE TABLE sweets (
+        id INTEGER NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        category VARCHAR(50) NOT NULL,
+        price FLOAT NOT NULL,
+        quantity INTEGER NOT NULL,
+        description TEXT,
+        image_url VARCHAR(500),
+        is_available BOOLEAN,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        updated_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE INDEX ix_sweets_name ON sweets (name);
+    CREATE INDEX ix_sweets_category ON sweets (category);
+    CREATE INDEX ix_sweets_id ON sweets (id);
+"""
+
+
+def run_env(db_path, **overrides):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DATABASE_ASYNC="false")
+    env.update(overrides)
+    return env
+
+
+def tables(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestMigrate:
+    def test_importing_the_app_leaves_the_schema_alone(self, tmp_path):
+        db_path = tmp_path / "import.db"
+
+        subprocess.run([sys.executable, "-c", "import app.main"], cwd=BACKEND, env=run_env(db_path), check=True)
+
+        assert not db_path.exists() or not tables(db_path)
+
+    def test_migrate_creates_every_table_and_can_run_again(self, tmp_path):
+        db_path = tmp_path / "migrate.db"
+
+        for _ in range(2):
+            result = subprocess.run(
+                [sys.executable, "-m", "app", "migrate"],
+                cwd=BACKEND, env=run_env(db_path), capture_output=True, text=True,
+            )
+            assert result.returncode == 0, result.stderr
+
+        assert {"users", "sweets", "purchases", "reservations", "stock_movements"} <= tables(db_path)
+
+    def test_migrate_upgrades_tables_from_an_older_release(self, tmp_path):
+        db_path = tmp_path / "upgrade.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript(BASELINE_SWEETS + """
+                INSERT INTO sweets (name, category, price, quantity, is_available) VALUES ('Toffee', 'Candy', 2.5, 10, 1);
+            """)
+
+        create_schema(create_engine(f"sqlite:///{db_path}"))
+
+        with sqlite3.connect(db_path) as conn:
+            assert "deleted_at" in {row[1] for row in conn.execute("PRAGMA table_info(sweets)")}
+            index = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'ix_sweets_name'").fetchone()[0]
+            assert index.startswith("CREATE UNIQUE INDEX")
+            assert "WHERE deleted_at IS NULL" in index
+            conn.execute("UPDATE sweets SET deleted_at = CURRENT_TIMESTAMP")
+            conn.execute("INSERT INTO sweets (name, category, price, quantity) VALUES ('Toffee', 'Candy', 3, 5)")
+            with pytest.raises(sqlite3.IntegrityError):
+                conn.execute("INSERT INTO sweets (name, category, price, quantity) VALUES ('Toffee', 'Candy', 3, 5)")
+            assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'ix_purchases_created_at'").fetchone()
+
+        create_schema(create_engine(f"sqlite:///{db_path}"))
+
+    def test_migrate_refuses_duplicate_names_and_keeps_the_old_index(self, tmp_path):
+        db_path = tmp_path / "duplicates.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript(BASELINE_SWEETS + """
+                INSERT INTO sweets (name, category, price, quantity, is_available) VALUES ('Toffee', 'Candy', 2.5, 10, 1);
+                INSERT INTO sweets (name, category, price, quantity, is_available) VALUES ('Toffee', 'Candy', 3.0, 4, 1);
+            """)
+
+        result = subprocess.run(
+            [sys.executable, "-m", "app", "migrate"], cwd=BACKEND, env=run_env(db_path), capture_output=True, text=True,
+        )
+
+        assert result.returncode != 0
+        assert "Cannot create unique index ix_sweets_name: sweets has duplicate rows for 'Toffee'" in result.stderr
+        with sqlite3.connect(db_path) as conn:
+            index = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'ix_sweets_name'").fetchone()[0]
+        assert index == "CREATE INDEX ix_sweets_name ON sweets (name)"
+
+
+class TestWarmPools:
+    def test_fills_each_pool_up_to_its_size(self, tmp_path, monkeypatch):
+        bound = create_engine(f"sqlite:///{tmp_path / 'warm.db'}", poolclass=InstrumentedQueuePool, pool_size=3)
+        monkeypatch.setattr(database, "engines", {"primary": bound})
+        monkeypatch.setattr(database, "async_engines", {})
+
+        assert asyncio.run(warm_pools(10)) == {"primary": 3}
+        assert bound.pool.checkedin() == 3
+        assert bound.pool.checkedout() == 0
+
+    def test_disabled_or_unsized_pools_are_skipped(self, monkeypatch):
+        bound = create_engine("sqlite://")
+        monkeypatch.setattr(database, "engines", {"primary": bound})
+
+        assert asyncio.run(warm_pools(0)) == {}
+        assert asyncio.run(warm_pools(5)) == {}
+
+    def test_unreachable_database_does_not_stop_startup(self, monkeypatch):
+        bound = create_engine(
+            "postgresql://nobody@127.0.0.1:1/none", poolclass=InstrumentedQueuePool, pool_size=2,
+            connect_args={"connect_timeout": 1},
+        )
+        monkeypatch.setattr(database, "engines", {"primary": bound})
+
+        assert asyncio.run(warm_pools(2)) == {}
+
+    def test_shutdown_closes_every_pool(self, tmp_path, monkeypatch):
+        bound = create_engine(f"sqlite:///{tmp_path / 'dispose.db'}", poolclass=InstrumentedQueuePool, pool_size=2)
+        monkeypatch.setattr(database, "engines", {"primary": bound})
+        monkeypatch.setattr(database, "async_engines", {})
+        asyncio.run(warm_pools(2))
+
+        asyncio.run(dispose_engines())
+
+        assert bound.pool.checkedin() == 0
+
+
+class TestServe:
+    def test_gunicorn_preloads_the_app_and_drains_on_shutdown(self):
+        options = gunicorn_options("0.0.0.0", 8000, 4, 20)
+
+        assert options["bind"] == "0.0.0.0:8000"
+        assert options["workers"] == 4
+        assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+        assert options["preload_app"] is True
+        assert options["graceful_timeout"] == 20
+        assert callable(options["post_fork"])
+
+    def test_sigterm_finishes_in_flight_purchases(self, tmp_path):
+        db_path = tmp_path / "serve.db"
+        env = run_env(
+            db_path,
+            PURCHASE_GROUP_COMMIT="true",
+            PURCHASE_BATCH_DELAY_MS="500",
+            BCRYPT_ROUNDS="4",
+            RESERVATION_SWEEP_SECONDS="0",
+            RATE_LIMIT_ENABLED="false",
+        )
+        subprocess.run([sys.executable, "-m", "app", "migrate"], cwd=BACKEND, env=env, check=True)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "INSERT INTO sweets (name, category, price, quantity, is_available) VALUES ('Toffee', 'Candy', 2.5, 10, 1)"
+            )
+
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app", "serve", "--host", "127.0.0.1", "--port", str(port), "--workers", "1"],
+            cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            base = f"http://127.0.0.1:{port}"
+            for _ in range(100):
+                try:
+                    httpx.get(base + "/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            user = {"email": "buyer@example.com", "password": "password123", "full_name": "Buyer"}
+            assert httpx.post(base + "/api/auth/register", json=user).status_code == 201
+            token = httpx.post(
+                base + "/api/auth/login", data={"username": user["email"], "password": user["password"]}
+            ).json()["access_token"]
+
+            responses = []
+            buyer = threading.Thread(target=lambda: responses.append(httpx.post(
+                base + "/api/inventory/purchase",
+                json={"sweet_id": 1, "quantity": 2},
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=10,
+            )))
+            buyer.start()
+            time.sleep(0.2)
+            server.send_signal(signal.SIGTERM)
+            buyer.join(10)
+
+            assert server.wait(10) == 0
+        finally:
+            if server.poll() is None:
+                server.kill()
+
+        assert responses[0].status_code == 201
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT quantity FROM sweets").fetchone()[0] == 8
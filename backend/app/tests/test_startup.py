@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+from itertools import count
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.core.startup import StartupTimer
+
+BACKEND = Path(__file__).resolve().parents[2]
+
+# Seconds `import app.main` may take in a fresh interpreter, best of a few
+# runs. Most of it is FastAPI and SQLAlchemy themselves; override the budget
+# with IMPORT_BUDGET_SECONDS on slow machines.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+
+# Loaded on first use, never by the import.
+LAZY_MODULES = ("jose", "passlib", "bcrypt", "psycopg2", "asyncpg", "aiosqlite")
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+from app import database
+print(json.dumps({
+    "seconds": elapsed,
+    "loaded": sorted(name for name in json.loads(sys.argv[1]) if name in sys.modules),
+    "engines": sorted(database.engines),
+    "phases": sorted(app.main.startup_timer.phases),
+}))
+"""
+
+
+def probe_import(tmp_path, **env):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'probe.db'}", **env)
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE, json.dumps(LAZY_MODULES)],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+class TestStartupTimer:
+    def test_phases_are_reported_in_order(self):
+        ticks = count()
+        timer = StartupTimer(clock=lambda: next(ticks) / 1000)
+
+        timer.mark("imports")
+        with timer.phase("pool_warmup"):
+            pass
+
+        assert timer.report() == {"total_ms": 2.0, "phases_ms": {"imports": 1.0, "pool_warmup": 1.0}}
+
+    def test_marks_measure_from_the_previous_mark(self):
+        clock = iter([0.0, 0.25, 0.75])
+        timer = StartupTimer(clock=lambda: next(clock))
+
+        timer.mark("imports")
+        timer.mark("app")
+
+        assert timer.report()["phases_ms"] == {"imports": 250.0, "app": 500.0}
+
+    def test_repeating_a_phase_replaces_its_time(self):
+        clock = iter([0.0, 0.0, 0.5, 1.0, 1.1])
+        timer = StartupTimer(clock=lambda: next(clock))
+
+        for _ in range(2):
+            with timer.phase("pool_warmup"):
+                pass
+
+        assert timer.report()["phases_ms"] == {"pool_warmup": 100.0}
+
+    def test_startup_report_endpoint(self, client: TestClient):
+        report = client.get("/health/startup").json()
+
+        assert list(report["phases_ms"]) == ["imports", "app", "pool_warmup", "background_tasks"]
+        assert report["total_ms"] > 0
+
+
+class TestImportTime:
+    def test_import_defers_crypto_and_engines(self, tmp_path):
+        result = probe_import(tmp_path)
+
+        assert result["loaded"] == []
+        assert result["engines"] == []
+        assert result["phases"] == ["app", "imports"]
+
+    def test_import_stays_under_budget(self, tmp_path):
+        best = min(probe_import(tmp_path)["seconds"] for _ in range(3))
+
+        assert best < IMPORT_BUDGET_SECONDS, f"import app.main took {best:.3f}s"
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.core.ledger import PurchaseLedger
+from app.core.stock_events import (
+    RESYNC, InMemoryBroadcastBackend, StockBroker, stock_broker, stock_event_stream,
+)
+from app.main import app
+from app.tests.conftest import TestingSessionLocal
+
+
+def _publish_from_thread(broker, levels):
+    thread = threading.Thread(target=broker.publish, args=(levels,))
+    thread.start()
+    thread.join()
+
+
+async def _next_event(client, method, url, **kwargs):
+    subscription = stock_broker.subscribe()
+    try:
+        response = await asyncio.to_thread(getattr(client, method), url, **kwargs)
+        assert response.status_code < 400, response.text
+        return await subscription.next(5)
+    finally:
+        subscription.close()
+
+
+class TestStockBroker:
+    def test_fan_out_from_other_threads(self):
+        broker = StockBroker(InMemoryBroadcastBackend(), max_pending=10)
+
+        async def scenario():
+            first, second = broker.subscribe(), broker.subscribe()
+            _publish_from_thread(broker, [(1, 5, True)])
+            return await first.next(5), await second.next(5)
+
+        assert asyncio.run(scenario()) == ({1: (5, True)}, {1: (5, True)})
+
+    def test_slow_reader_gets_latest_level_per_sweet(self):
+        broker = StockBroker(InMemoryBroadcastBackend(), max_pending=10)
+
+        async def scenario():
+            subscription = broker.subscribe()
+            for quantity in (9, 8, 7):
+                _publish_from_thread(broker, [(1, quantity, True), (quantity, 1, True)])
+            await asyncio.sleep(0)
+            return await subscription.next(5)
+
+        assert asyncio.run(scenario()) == {1: (7, True), 9: (1, True), 8: (1, True), 7: (1, True)}
+
+    def test_reader_far_behind_is_told_to_resync(self):
+        broker = StockBroker(InMemoryBroadcastBackend(), max_pending=2)
+
+        async def scenario():
+            subscription = broker.subscribe()
+            _publish_from_thread(broker, [(1, 1, True), (2, 2, True), (3, 3, True)])
+            _publish_from_thread(broker, [(4, 4, True)])
+            await asyncio.sleep(0)
+            return await subscription.next(5), await subscription.next(0.01)
+
+        # Levels queued behind the resync are covered by the client's refetch.
+        assert asyncio.run(scenario()) == (RESYNC, None)
+
+    def test_idle_reader_times_out(self):
+        broker = StockBroker(InMemoryBroadcastBackend(), max_pending=10)
+
+        async def scenario():
+            subscription = broker.subscribe()
+            result = await subscription.next(0.01)
+            subscription.close()
+            return result
+
+        assert asyncio.run(scenario()) is None
+        assert broker.subscriber_count() == 0
+
+    def test_broadcast_failure_does_not_raise(self):
+        class BrokenBackend(InMemoryBroadcastBackend):
+            def publish(self, message):
+                raise ConnectionError("broadcast backend is down")
+
+        StockBroker(BrokenBackend(), max_pending=10).publish([(1, 1, True)])
+
+
+class TestStockStream:
+    def test_stream_endpoint(self):
+        messages = []
+        done = asyncio.Event()
+
+        async def receive():
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and message["body"].startswith(b"retry"):
+                _publish_from_thread(stock_broker, [(3, 0, False), (1, 4, True)])
+            elif message["type"] == "http.response.body" and message["body"].startswith(b"event"):
+                done.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/sweets/stream", "raw_path": b"/api/sweets/stream",
+            "root_path": "", "query_string": b"", "headers": [],
+            "client": ("test", 1), "server": ("test", 80),
+        }
+        asyncio.run(asyncio.wait_for(app(scope, receive, send), 5))
+
+        assert messages[0]["status"] == 200
+        assert (b"content-type", b"text/event-stream; charset=utf-8") in messages[0]["headers"]
+        event = messages[2]["body"].decode()
+        assert event.startswith("event: stock\ndata: ")
+        assert json.loads(event.split("data: ", 1)[1]) == [
+            {"sweet_id": 1, "quantity": 4, "is_available": True},
+            {"sweet_id": 3, "quantity": 0, "is_available": False},
+        ]
+        assert stock_broker.subscriber_count() == 0
+
+    def test_keepalive_and_resync_encoding(self):
+        broker = StockBroker(InMemoryBroadcastBackend(), max_pending=1)
+
+        async def scenario():
+            stream = stock_event_stream(broker, 0.01)
+            chunks = [await stream.__anext__(), await stream.__anext__()]
+            _publish_from_thread(broker, [(1, 1, True), (2, 2, True)])
+            await asyncio.sleep(0)
+            chunks.append(await stream.__anext__())
+            await stream.aclose()
+            return chunks
+
+        assert asyncio.run(scenario()) == [b"retry: 3000\n\n", b": keepalive\n\n", b"event: resync\ndata: {}\n\n"]
+        assert broker.subscriber_count() == 0
+
+
+class TestStockPublishing:
+    def test_purchase_publishes_level(self, client: TestClient, test_sweet, auth_headers_user):
+        levels = asyncio.run(_next_event(
+            client, "post", "/api/inventory/purchase",
+            json={"sweet_id": test_sweet.id, "quantity": 3}, headers=auth_headers_user
+        ))
+
+        assert levels == {test_sweet.id: (7, True)}
+
+    def test_batch_purchase_publishes_final_level(self, client: TestClient, test_sweet, auth_headers_user):
+        items = [{"sweet_id": test_sweet.id, "quantity": 2}, {"sweet_id": test_sweet.id, "quantity": 3}]
+        levels = asyncio.run(_next_event(
+            client, "post", "/api/inventory/purchase/batch", json={"items": items}, headers=auth_headers_user
+        ))
+
+        assert levels == {test_sweet.id: (5, True)}
+
+    def test_restocks_publish_levels(self, client: TestClient, test_sweet, auth_headers_admin):
+        levels = asyncio.run(_next_event(
+            client, "post", f"/api/inventory/restock/{test_sweet.id}?quantity=5", headers=auth_headers_admin
+        ))
+
+        assert levels == {test_sweet.id: (15, True)}
+
+        levels = asyncio.run(_next_event(
+            client, "post", "/api/inventory/restock/batch",
+            json={"items": [{"sweet_id": test_sweet.id, "delta": -15}]}, headers=auth_headers_admin
+        ))
+
+        assert levels == {test_sweet.id: (0, True)}
+
+    def test_catalog_changes_publish_levels(self, client: TestClient, test_sweet, auth_headers_admin):
+        levels = asyncio.run(_next_event(
+            client, "put", f"/api/sweets/{test_sweet.id}",
+            json={"is_available": False}, headers=auth_headers_admin
+        ))
+
+        assert levels == {test_sweet.id: (10, False)}
+
+        levels = asyncio.run(_next_event(
+            client, "post", "/api/sweets/bulk",
+            content="name,category,price,quantity\nChocolate Cake,Cakes,12.99,40\n",
+            headers={**auth_headers_admin, "Content-Type": "text/csv"}
+        ))
+
+        assert levels == {test_sweet.id: (40, False)}
+
+        levels = asyncio.run(_next_event(client, "delete", f"/api/sweets/{test_sweet.id}", headers=auth_headers_admin))
+
+        assert levels == {test_sweet.id: (0, False)}
+
+    def test_group_commit_publishes_levels(self, test_db, test_user, test_sweet):
+        ledger = PurchaseLedger(TestingSessionLocal, max_batch=10, max_delay_ms=20, queue_size=100)
+
+        async def scenario():
+            subscription = stock_broker.subscribe()
+            futures = [ledger.submit(test_user.id, test_sweet.id, 1) for _ in range(3)]
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+            levels = await subscription.next(5)
+            subscription.close()
+            return levels
+
+        try:
+            assert asyncio.run(scenario()) == {test_sweet.id: (7, True)}
+        finally:
+            ledger.stop()
@@ -1,5 +1,16 @@
+import json
+import os
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.core.catalog_cache import CatalogCache, InMemoryCacheBackend
+from app.core.pagination import encode_cursor
+from app.core.search import PostgresSearch, SearchQuery, tokenize
+from app.database import Base
+from app.models.sweet import Sweet
 
 class TestSweetManagement:
     def test_create_sweet_admin_success(self, client: TestClient, auth_headers_admin):
@@ -93,4 +104,311 @@ class TestSweetManagement:
         assert response.status_code == 204
         
         get_response = client.get(f"/api/sweets/{test_sweet.id}")
-        assert get_response.status_code == 404
\ No newline at end of file
+        assert get_response.status_code == 404
+
+class TestCatalogCache:
+    def test_repeated_reads_are_served_from_cache(self, client: TestClient, db_engine, test_sweet):
+        first = client.get("/api/sweets/")
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_engine, "before_cursor_execute", listener)
+        try:
+            second = client.get("/api/sweets/")
+        finally:
+            event.remove(db_engine, "before_cursor_execute", listener)
+
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert statements == []
+
+    def test_if_none_match_returns_304(self, client: TestClient, test_sweet):
+        etag = client.get(f"/api/sweets/{test_sweet.id}").headers["ETag"]
+
+        response = client.get(f"/api/sweets/{test_sweet.id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+    def test_admin_write_invalidates_cache(self, client: TestClient, test_sweet, auth_headers_admin):
+        before = client.get("/api/sweets/")
+
+        client.put(f"/api/sweets/{test_sweet.id}", json={"price": 9.5}, headers=auth_headers_admin)
+
+        after = client.get("/api/sweets/", headers={"If-None-Match": before.headers["ETag"]})
+        assert after.status_code == 200
+        assert after.headers["ETag"] != before.headers["ETag"]
+        assert after.json()[0]["price"] == 9.5
+
+    def test_purchase_invalidates_cache(self, client: TestClient, test_sweet, auth_headers_user):
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 10
+
+        client.post(
+            "/api/inventory/purchase",
+            json={"sweet_id": test_sweet.id, "quantity": 4},
+            headers=auth_headers_user
+        )
+
+        assert client.get(f"/api/sweets/{test_sweet.id}").json()["quantity"] == 6
+
+    def test_categories_are_cached(self, client: TestClient, test_sweet):
+        response = client.get("/api/sweets/categories/list")
+
+        assert response.json() == ["Cakes"]
+        assert "ETag" in response.headers
+
+    def test_invalidation_is_shared_across_workers(self):
+        backend = InMemoryCacheBackend()
+        worker_a = CatalogCache(backend, ttl_seconds=60)
+        worker_b = CatalogCache(backend, ttl_seconds=60)
+        builds = []
+
+        def build():
+            builds.append(1)
+            return f"[{len(builds)}]".encode()
+
+        assert worker_a.fetch("sweets", build).body == b"[1]"
+        assert worker_b.fetch("sweets", build).body == b"[1]"
+
+        worker_b.invalidate()
+
+        assert worker_a.fetch("sweets", build).body == b"[2]"
+        assert len(builds) == 2
+
+
+class TestSweetPagination:
+    @pytest.fixture
+    def many_sweets(self, test_db):
+        sweets = [
+            Sweet(name=f"Sweet {i:02d}", category="Bulk", price=float(10 - i % 3), quantity=1, is_available=True)
+            for i in range(7)
+        ]
+        test_db.add_all(sweets)
+        test_db.commit()
+        return sweets
+
+    def _walk(self, client, url):
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            pages.append(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/api/sweets/?limit=3&cursor={cursor}" if cursor else None
+        return pages
+
+    def test_cursor_pagination_by_name(self, client: TestClient, many_sweets):
+        pages = self._walk(client, "/api/sweets/?limit=3&order_by=name")
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        names = [sweet["name"] for page in pages for sweet in page]
+        assert names == sorted(sweet.name for sweet in many_sweets)
+
+    def test_cursor_pagination_by_price_breaks_ties_on_id(self, client: TestClient, many_sweets):
+        pages = self._walk(client, "/api/sweets/?limit=3&order_by=price")
+
+        rows = [(sweet["price"], sweet["id"]) for page in pages for sweet in page]
+        assert rows == sorted((sweet.price, sweet.id) for sweet in many_sweets)
+
+    def test_next_link_header(self, client: TestClient, many_sweets):
+        response = client.get("/api/sweets/?limit=3&order_by=name")
+
+        assert response.headers["Link"].endswith('rel="next"')
+        assert "cursor=" in response.headers["Link"]
+
+    def test_cursor_must_match_ordering(self, client: TestClient, many_sweets):
+        cursor = client.get("/api/sweets/?limit=3&order_by=name").headers["X-Next-Cursor"]
+
+        response = client.get(f"/api/sweets/?limit=3&order_by=price&cursor={cursor}")
+
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("values", [
+        ["name", {"a": 1}, 1],
+        ["name", 3, 1],
+        ["price", "3", 1],
+        ["price", 3.5, True],
+        ["price", 3.5, "1"],
+        [["name"], "Fudge", 1],
+    ])
+    def test_malformed_cursor_is_rejected(self, client: TestClient, many_sweets, values):
+        response = client.get(f"/api/sweets/?limit=3&cursor={encode_cursor(values)}")
+
+        assert (response.status_code, response.json()) == (400, {"detail": "Invalid cursor"})
+
+    def test_approximate_count_header(self, client: TestClient, many_sweets):
+        response = client.get("/api/sweets/?limit=3&include_count=true")
+
+        assert response.headers["X-Approximate-Count"] == "7"
+        assert "X-Approximate-Count" not in client.get("/api/sweets/?limit=3").headers
+
+
+class TestSweetSearch:
+    @pytest.fixture
+    def catalog(self, test_db):
+        sweets = [
+            Sweet(name="Chocolate Cake", category="Cakes", price=12.0, quantity=5),
+            Sweet(name="Chocolate Chip Cookie", category="Cookies", price=2.0, quantity=50),
+            Sweet(name="Vanilla Cupcake", category="Cakes", price=3.0, quantity=20,
+                  description="Topped with chocolate shavings"),
+            Sweet(name="Lemon Tart", category="Tarts", price=4.5, quantity=8),
+            Sweet(name="Chocolate Truffle", category="Candy", price=1.5, quantity=0, is_available=False),
+        ]
+        test_db.add_all(sweets)
+        test_db.commit()
+        return sweets
+
+    def _names(self, response):
+        assert response.status_code == 200
+        return [sweet["name"] for sweet in response.json()]
+
+    def test_free_text_is_ranked_by_field(self, client: TestClient, catalog):
+        names = self._names(client.get("/api/sweets/search?q=chocolate"))
+
+        assert names == ["Chocolate Cake", "Chocolate Chip Cookie", "Vanilla Cupcake"]
+
+    def test_prefix_and_multiple_terms(self, client: TestClient, catalog):
+        assert self._names(client.get("/api/sweets/search?q=choc coo")) == ["Chocolate Chip Cookie"]
+        assert self._names(client.get("/api/sweets/search?name=lem")) == ["Lemon Tart"]
+
+    def test_field_and_price_filters(self, client: TestClient, catalog):
+        names = self._names(client.get("/api/sweets/search?category=cakes&max_price=5"))
+
+        assert names == ["Vanilla Cupcake"]
+
+    def test_results_are_paginated(self, client: TestClient, catalog):
+        first = self._names(client.get("/api/sweets/search?q=chocolate&limit=2"))
+        second = self._names(client.get("/api/sweets/search?q=chocolate&limit=2&skip=2"))
+
+        assert first == ["Chocolate Cake", "Chocolate Chip Cookie"]
+        assert second == ["Vanilla Cupcake"]
+
+    def test_index_follows_writes(self, client: TestClient, catalog, auth_headers_admin):
+        assert self._names(client.get("/api/sweets/search?name=lemon")) == ["Lemon Tart"]
+
+        client.put(f"/api/sweets/{catalog[3].id}", json={"name": "Lime Tart"}, headers=auth_headers_admin)
+        client.post(
+            "/api/sweets/",
+            json={"name": "Lemon Drizzle", "category": "Cakes", "price": 6.0, "quantity": 4},
+            headers=auth_headers_admin
+        )
+        client.delete(f"/api/sweets/{catalog[0].id}", headers=auth_headers_admin)
+
+        assert self._names(client.get("/api/sweets/search?name=lemon")) == ["Lemon Drizzle"]
+        assert self._names(client.get("/api/sweets/search?name=lime")) == ["Lime Tart"]
+        assert "Chocolate Cake" not in self._names(client.get("/api/sweets/search?q=chocolate"))
+
+    @pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+    def test_postgres_backend_matches_in_memory_ranking(self):
+        engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+        Base.metadata.create_all(bind=engine)
+        try:
+            with Session(engine) as db:
+                db.add_all([
+                    Sweet(name="Chocolate Cake", category="Cakes", price=12.0, quantity=5),
+                    Sweet(name="Vanilla Cupcake", category="Cakes", price=3.0, quantity=20,
+                          description="Topped with chocolate shavings"),
+                    Sweet(name="Lemon Tart", category="Tarts", price=4.5, quantity=8),
+                ])
+                db.commit()
+                query = SearchQuery(tokenize("choc"), [], [], None, None, 0, 10)
+                names = [db.get(Sweet, sweet_id).name for sweet_id in PostgresSearch().search(db, query)]
+                name_only = SearchQuery([], tokenize("choc"), [], None, None, 0, 10)
+                assert names == ["Chocolate Cake", "Vanilla Cupcake"]
+                assert len(PostgresSearch().search(db, name_only)) == 1
+        finally:
+            Base.metadata.drop_all(bind=engine)
+
+class TestSoftDelete:
+    def _delete(self, client, sweet_id, headers):
+        return client.delete(f"/api/sweets/{sweet_id}", headers=headers)
+
+    def test_delete_keeps_the_row_and_its_purchases(
+        self, client: TestClient, test_db, test_sweet, auth_headers_user, auth_headers_admin
+    ):
+        purchase = client.post(
+            "/api/inventory/purchase", json={"sweet_id": test_sweet.id, "quantity": 1}, headers=auth_headers_user
+        )
+        assert purchase.status_code == 201
+
+        assert self._delete(client, test_sweet.id, auth_headers_admin).status_code == 204
+
+        test_db.expire_all()
+        sweet = test_db.get(Sweet, test_sweet.id)
+        assert sweet.deleted_at is not None
+        assert sweet.is_available is False
+        history = client.get("/api/inventory/purchases/my", headers=auth_headers_user).json()
+        assert [row["sweet_name"] for row in history] == ["Chocolate Cake"]
+        assert client.get("/api/sweets/").json() == []
+        assert client.get("/api/sweets/categories/list").json() == []
+
+    def test_deleted_sweet_cannot_be_changed(
+        self, client: TestClient, test_sweet, auth_headers_user, auth_headers_admin
+    ):
+        self._delete(client, test_sweet.id, auth_headers_admin)
+
+        assert self._delete(client, test_sweet.id, auth_headers_admin).status_code == 404
+        assert client.put(
+            f"/api/sweets/{test_sweet.id}", json={"is_available": True}, headers=auth_headers_admin
+        ).status_code == 404
+        assert client.post(
+            f"/api/inventory/restock/{test_sweet.id}?quantity=5", headers=auth_headers_admin
+        ).status_code == 404
+        assert client.post(
+            "/api/inventory/purchase", json={"sweet_id": test_sweet.id, "quantity": 1}, headers=auth_headers_user
+        ).status_code == 404
+
+    def test_deleted_sweet_cannot_be_bought_even_if_marked_available(
+        self, client: TestClient, test_db, test_sweet, auth_headers_user, auth_headers_admin
+    ):
+        self._delete(client, test_sweet.id, auth_headers_admin)
+        test_db.expire_all()
+        test_db.get(Sweet, test_sweet.id).is_available = True
+        test_db.commit()
+
+        assert client.post(
+            "/api/inventory/purchase", json={"sweet_id": test_sweet.id, "quantity": 1}, headers=auth_headers_user
+        ).status_code == 404
+        assert client.post(
+            "/api/inventory/purchase/batch",
+            json={"items": [{"sweet_id": test_sweet.id, "quantity": 1}]},
+            headers=auth_headers_user
+        ).status_code == 404
+        test_db.expire_all()
+        assert test_db.get(Sweet, test_sweet.id).quantity == 10
+
+    def test_name_of_a_deleted_sweet_can_be_reused(self, client: TestClient, test_sweet, auth_headers_admin):
+        sweet_data = {"name": test_sweet.name, "category": "Cakes", "price": 14.0, "quantity": 3}
+        assert client.post("/api/sweets/", json=sweet_data, headers=auth_headers_admin).status_code == 400
+
+        self._delete(client, test_sweet.id, auth_headers_admin)
+        response = client.post("/api/sweets/", json=sweet_data, headers=auth_headers_admin)
+
+        assert response.status_code == 201
+        assert response.json()["id"] != test_sweet.id
+        assert client.post("/api/sweets/", json=sweet_data, headers=auth_headers_admin).status_code == 400
+
+    def test_import_creates_a_new_sweet_for_a_deleted_name(
+        self, client: TestClient, test_db, test_sweet, auth_headers_admin
+    ):
+        self._delete(client, test_sweet.id, auth_headers_admin)
+
+        response = client.post(
+            "/api/sweets/bulk",
+            content=f"name,category,price,quantity\n{test_sweet.name},Cakes,11,4\n",
+            headers={**auth_headers_admin, "Content-Type": "text/csv"},
+        )
+
+        assert response.json()["created"] == 1
+        test_db.expire_all()
+        assert test_db.query(Sweet).filter(Sweet.name == test_sweet.name).count() == 2
+        assert [sweet["price"] for sweet in client.get("/api/sweets/").json()] == [11.0]
+
+    def test_export_skips_deleted_sweets_unless_asked(self, client: TestClient, test_sweet, auth_headers_admin):
+        self._delete(client, test_sweet.id, auth_headers_admin)
+
+        assert client.get("/api/sweets/export?format=ndjson", headers=auth_headers_admin).text == ""
+        rows = client.get("/api/sweets/export?format=ndjson&include_deleted=true", headers=auth_headers_admin)
+        assert [row["deleted_at"] is not None for row in map(json.loads, rows.text.splitlines())] == [True]
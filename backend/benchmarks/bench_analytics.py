@@ -0,0 +1,85 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import make_database, measure, override_db, print_table
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+
+from app.api import analytics
+from app.core.analytics import backfill_sales
+from app.core.dependencies import get_current_admin_user
+from app.core.security import create_access_token
+from app.database import get_db
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+from app.models.user import User
+
+
+def on_demand_categories(db=Depends(get_db), current_user: User = Depends(get_current_admin_user)):
+    query = (
+        select(Sweet.category, func.sum(Purchase.quantity), func.sum(Purchase.total_price), func.count(Purchase.id))
+        .join(Sweet, Sweet.id == Purchase.sweet_id)
+        .where(Purchase.status == "completed")
+        .group_by(Sweet.category)
+    )
+    return [list(row) for row in db.execute(query).all()]
+
+
+def seed(Session, purchases, sweets=200, days=365, chunk=10_000):
+    now = datetime.now(timezone.utc)
+    with Session() as db:
+        admin = User(email="admin@bench.test", hashed_password="x", is_active=True, is_admin=True)
+        db.add(admin)
+        db.execute(insert(Sweet), [
+            dict(name=f"Sweet {i}", category=f"Category {i % 10}", price=1.0 + i % 20, quantity=1_000_000,
+                 is_available=True)
+            for i in range(sweets)
+        ])
+        db.flush()
+        for start in range(0, purchases, chunk):
+            db.execute(insert(Purchase), [
+                dict(user_id=admin.id, sweet_id=1 + i % sweets, quantity=1 + i % 3, unit_price=2.0,
+                     total_price=2.0 * (1 + i % 3), status="completed", created_at=now - timedelta(days=i % days))
+                for i in range(start, min(start + chunk, purchases))
+            ])
+        db.commit()
+        backfill_sales(db)
+        return admin.email
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare summary-backed analytics with on-demand aggregation")
+    parser.add_argument("--database-url")
+    parser.add_argument("--purchases", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for purchases in args.purchases:
+        engine, Session = make_database(args.database_url)
+        email = seed(Session, purchases)
+
+        app = FastAPI()
+        app.include_router(analytics.router, prefix="/api")
+        app.get("/on-demand/categories")(on_demand_categories)
+        override_db(app, Session)
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+        scenarios = {
+            "on-demand GROUP BY categories": "/on-demand/categories",
+            "summary categories": "/api/inventory/analytics/categories",
+            "summary daily (30 days)": "/api/inventory/analytics/daily",
+            "summary top sellers (7 days)": "/api/inventory/analytics/top-sellers?days=7",
+        }
+        results = {
+            name: measure(lambda url=url: client.get(url, headers=headers), args.repeat)
+            for name, url in scenarios.items()
+        }
+        print_table(f"Sales analytics with {purchases} purchases ({engine.dialect.name})", results)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import count_queries, make_database, measure, override_db, print_table
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.api import inventory
+from app.core.archive import archive_old_purchases, months_before
+from app.core.security import create_access_token
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+from app.models.user import User
+
+
+def seed(Session, purchases, users, months, chunk=10_000):
+    # Purchases are spread evenly over the last `months` months and across
+    # `users` buyers, oldest first.
+    now = datetime.now(timezone.utc)
+    step = timedelta(days=30 * months) / purchases
+    with Session() as db:
+        db.execute(insert(User), [
+            dict(email=f"buyer{i}@bench.test", hashed_password="x", is_active=True) for i in range(users)
+        ])
+        db.execute(insert(Sweet), [
+            dict(name=f"Sweet {i}", category="Bench", price=1.0 + i, quantity=1_000_000, is_available=True)
+            for i in range(20)
+        ])
+        for start in range(0, purchases, chunk):
+            db.execute(insert(Purchase), [
+                dict(user_id=1 + i % users, sweet_id=1 + i % 20, quantity=1, unit_price=1.0, total_price=1.0,
+                     status="completed", created_at=now - step * (purchases - i))
+                for i in range(start, min(start + chunk, purchases))
+            ])
+        db.commit()
+    return now
+
+
+def history_scenarios(client, headers):
+    return {
+        "live page": lambda: client.get("/api/inventory/purchases/my?limit=50", headers=headers),
+        "full history page": lambda: client.get(
+            "/api/inventory/purchases/my?limit=50&include_archived=true", headers=headers
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time archiving old purchases and per-user history reads")
+    parser.add_argument("--database-url")
+    parser.add_argument("--purchases", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--keep-months", type=int, default=12)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    for batch in args.batch_sizes:
+        engine, Session = make_database(args.database_url)
+        now = seed(Session, args.purchases, args.users, args.months)
+
+        app = FastAPI()
+        app.include_router(inventory.router, prefix="/api")
+        override_db(app, Session)
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'buyer0@bench.test'})}"}
+
+        if batch == args.batch_sizes[0]:
+            for name, scenario in history_scenarios(client, headers).items():
+                results[f"before archiving, {name}"] = measure(scenario, args.repeat)
+
+        with count_queries(engine) as counter:
+            started = time.perf_counter()
+            archived = archive_old_purchases(Session, months_before(now, args.keep_months), batch)
+            elapsed = time.perf_counter() - started
+        results[f"archive, batch {batch}"] = {
+            "archived": archived, "rows_per_s": archived / elapsed, "seconds": elapsed, "queries": counter["queries"],
+        }
+
+        if batch == args.batch_sizes[0]:
+            for name, scenario in history_scenarios(client, headers).items():
+                results[f"after archiving, {name}"] = measure(scenario, args.repeat)
+        engine.dispose()
+
+    print_table(
+        f"{args.purchases} purchases over {args.months} months, keeping {args.keep_months} ({engine.dialect.name})",
+        results,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import csv
+import io
+import time
+
+from benchmarks.common import count_queries, make_database, print_table
+
+from app.api.sweets import _create_sweet
+from app.core.catalog_import import import_sweets, read_records
+from app.schemas.sweet import SweetCreate
+
+WORDS = ["chocolate", "vanilla", "lemon", "caramel", "strawberry", "mint", "honey", "almond"]
+
+
+def catalog_csv(rows, price_offset=0):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["name", "category", "price", "quantity", "description"])
+    for i in range(rows):
+        writer.writerow([
+            f"{WORDS[i % len(WORDS)].title()} Sweet {i}", f"Category {i % 20}", 1 + (i + price_offset) % 50, i % 500,
+            f"Made with {WORDS[(i * 3) % len(WORDS)]}",
+        ])
+    return buffer.getvalue().encode()
+
+
+def timed(engine, rows, load):
+    with count_queries(engine) as counter:
+        started = time.perf_counter()
+        load()
+        elapsed = time.perf_counter() - started
+    return {"rows_per_s": rows / elapsed, "seconds": elapsed, "queries": counter["queries"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare one-at-a-time sweet creation with the bulk upsert import")
+    parser.add_argument("--database-url")
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    body = catalog_csv(args.rows)
+    results = {}
+
+    engine, Session = make_database(args.database_url)
+    sweets = [SweetCreate.model_validate(record) for _, record in read_records(io.BytesIO(body), "csv")]
+
+    def create_each():
+        with Session() as db:
+            for sweet in sweets:
+                _create_sweet(db, sweet)
+
+    results["create one at a time"] = timed(engine, args.rows, create_each)
+    engine.dispose()
+
+    engine, Session = make_database(args.database_url)
+
+    def bulk(payload):
+        def load():
+            with Session() as db:
+                report = import_sweets(db, read_records(io.BytesIO(payload), "csv"))
+            assert report["failed"] == 0
+        return load
+
+    results["bulk import, new rows"] = timed(engine, args.rows, bulk(body))
+    results["bulk import, updated rows"] = timed(engine, args.rows, bulk(catalog_csv(args.rows, price_offset=7)))
+
+    print_table(f"Importing {args.rows} sweets ({engine.dialect.name})", results)
+
+
+if __name__ == "__main__":
+    main()
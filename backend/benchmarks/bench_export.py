@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from benchmarks.common import make_database, print_table
+
+from sqlalchemy import insert, select
+
+from app.api.inventory import PURCHASE_EXPORT_COLUMNS
+from app.core.export import stream_export
+from app.core.stock import PURCHASE_COLUMNS
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+from app.models.user import User
+
+
+def seed(Session, purchases, chunk=10_000):
+    with Session() as db:
+        user = User(email="buyer@bench.test", hashed_password="x", is_active=True)
+        db.add(user)
+        db.flush()
+        sweet_ids = db.execute(insert(Sweet).returning(Sweet.id), [
+            dict(name=f"Sweet {i}", category="Bench", price=2.0, quantity=1_000_000, is_available=True)
+            for i in range(100)
+        ]).scalars().all()
+        for start in range(0, purchases, chunk):
+            db.execute(insert(Purchase), [
+                dict(user_id=user.id, sweet_id=sweet_ids[i % 100], quantity=1, unit_price=2.0, total_price=2.0,
+                     status="completed")
+                for i in range(start, min(start + chunk, purchases))
+            ])
+        db.commit()
+
+
+def export_query():
+    return (
+        select(*PURCHASE_COLUMNS, User.email.label("user_email"), Sweet.name.label("sweet_name"))
+        .outerjoin(User, User.id == Purchase.user_id)
+        .outerjoin(Sweet, Sweet.id == Purchase.sweet_id)
+        .order_by(Purchase.id)
+    )
+
+
+def in_memory(Session):
+    with Session() as db:
+        rows = db.execute(export_query()).mappings().all()
+        body = json.dumps([dict(row, created_at=row["created_at"].isoformat()) for row in rows]).encode()
+    yield body
+
+
+def streamed(Session, export_format):
+    async def consume():
+        with Session() as db:
+            response = stream_export(db, export_query(), PURCHASE_EXPORT_COLUMNS, export_format, "purchases")
+            async for chunk in response.body_iterator:
+                yield chunk
+
+    return consume()
+
+
+def drain(chunks):
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+
+    async def consume():
+        nonlocal first_byte, size
+        if hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                first_byte = first_byte or time.perf_counter()
+                size += len(chunk)
+        else:
+            for chunk in chunks:
+                first_byte = first_byte or time.perf_counter()
+                size += len(chunk)
+
+    asyncio.run(consume())
+    return first_byte - started, time.perf_counter() - started, size
+
+
+def run(export):
+    first_byte, elapsed, size = drain(export())
+    # Memory is traced in a second pass; tracing slows the export down.
+    tracemalloc.start()
+    drain(export())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "first_byte_ms": first_byte * 1000,
+        "total_ms": elapsed * 1000,
+        "peak_mb": peak / 2**20,
+        "output_mb": size / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare streamed purchase exports with building the body in memory")
+    parser.add_argument("--database-url")
+    parser.add_argument("--purchases", type=int, default=200_000)
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url)
+    seed(Session, args.purchases)
+
+    results = {
+        "JSON list in memory": run(lambda: in_memory(Session)),
+        "streamed CSV": run(lambda: streamed(Session, "csv")),
+        "streamed NDJSON": run(lambda: streamed(Session, "ndjson")),
+    }
+    print_table(f"Export of {args.purchases} purchases ({engine.dialect.name})", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_database, print_table
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app.core.ledger import PurchaseLedger
+from app.core.stock import purchase_stock
+from app.models.sweet import Sweet
+from app.models.user import User
+
+
+def seed(Session, sweets):
+    with Session() as db:
+        db.add(User(email="buyer@bench.test", hashed_password="x", is_active=True))
+        db.execute(insert(Sweet), [
+            dict(name=f"Sweet {i}", category="Bench", price=2.0, quantity=10_000_000, is_available=True)
+            for i in range(sweets)
+        ])
+        db.commit()
+
+
+def run_clients(clients, purchases, buy):
+    def client(index):
+        failures = 0
+        for n in range(index, purchases, clients):
+            try:
+                buy(n)
+            except HTTPException:
+                failures += 1
+        return failures
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        failures = sum(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+    return {"purchases_per_s": purchases / elapsed, "seconds": elapsed, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request commits with the group-commit purchase ledger")
+    parser.add_argument("--database-url")
+    parser.add_argument("--purchases", type=int, default=3_000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--sweets", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--delay-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url, pool_size=args.clients, max_overflow=0)
+    seed(Session, args.sweets)
+
+    def commit_each(n):
+        with Session() as db:
+            purchase_stock(db, 1, 1 + n % args.sweets, 1)
+
+    results = {"commit per request": run_clients(args.clients, args.purchases, commit_each)}
+
+    for batch_size in args.batch_sizes:
+        ledger = PurchaseLedger(Session, batch_size, args.delay_ms, queue_size=args.purchases)
+        stats = run_clients(
+            args.clients, args.purchases, lambda n: ledger.submit(1, 1 + n % args.sweets, 1).result()
+        )
+        ledger.stop()
+        stats["avg_batch"] = args.purchases / max(ledger.batches, 1)
+        results[f"group commit, batch {batch_size}"] = stats
+
+    print_table(
+        f"{args.purchases} purchases from {args.clients} clients ({engine.dialect.name})", results
+    )
+
+
+if __name__ == "__main__":
+    main()
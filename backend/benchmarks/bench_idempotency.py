@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import make_database, override_db, print_table
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from app.core import security
+from app.core.idempotency import idempotency_store
+from app.core.security import create_access_token
+from app.main import app
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+from app.models.user import User
+
+
+def seed(Session):
+    with Session() as db:
+        db.add(User(email="buyer@bench.test", hashed_password="x", is_active=True))
+        db.execute(insert(Sweet).values(name="Bench Sweet", category="Bench", price=2.0, quantity=10_000_000, is_available=True))
+        db.commit()
+
+
+async def storm(requests, copies, use_keys):
+    # Every logical request arrives `copies` times at once, as a client that
+    # timed out and retried would send it.
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as http:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            http.post(
+                path,
+                json=body,
+                headers={**headers, **({"Idempotency-Key": f"key-{n}"} if use_keys else {})},
+            )
+            for n, (path, body, headers) in enumerate(requests)
+            for _ in range(copies)
+        ])
+        elapsed = time.perf_counter() - started
+    return responses, elapsed
+
+
+def run(Session, requests, copies, use_keys, count):
+    idempotency_store.clear()
+    hashes = []
+    original = security.password_context().hash
+    security.password_context().hash = lambda password: hashes.append(1) or original(password)
+    try:
+        with Session() as db:
+            before = db.scalar(count)
+        responses, elapsed = asyncio.run(storm(requests, copies, use_keys))
+        with Session() as db:
+            created = db.scalar(count) - before
+    finally:
+        security.password_context().hash = original
+    return {
+        "requests": len(responses),
+        "created": created,
+        "bcrypt_hashes": len(hashes),
+        "replayed": sum(response.headers.get("idempotent-replayed") == "true" for response in responses),
+        "errors": sum(response.status_code >= 400 for response in responses),
+        "ms": elapsed * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare retried purchases and signups with and without Idempotency-Key")
+    parser.add_argument("--database-url")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--copies", type=int, default=4)
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url, pool_size=args.requests * args.copies, max_overflow=0)
+    override_db(app, Session)
+    seed(Session)
+    auth = {"Authorization": f"Bearer {create_access_token(data={'sub': 'buyer@bench.test'})}"}
+
+    results = {}
+    for use_keys in (False, True):
+        suffix = "with key" if use_keys else "no key"
+        purchases = [("/api/inventory/purchase", {"sweet_id": 1, "quantity": 1}, auth)] * args.requests
+        results[f"purchase, {suffix}"] = run(
+            Session, purchases, args.copies, use_keys, select(func.count(Purchase.id))
+        )
+        signups = [
+            ("/api/auth/register", {"email": f"{suffix.replace(' ', '-')}-{n}@example.com", "password": "password123"}, {})
+            for n in range(args.requests)
+        ]
+        results[f"register, {suffix}"] = run(
+            Session, signups, args.copies, use_keys, select(func.count(User.id))
+        )
+
+    print_table(
+        f"{args.requests} requests each sent {args.copies} times concurrently ({engine.dialect.name})", results
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import print_table
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from app.core import metrics
+from app.main import app
+
+QUERY_HOOKS = [
+    ("before_cursor_execute", metrics._start_query_timer),
+    ("after_cursor_execute", metrics._record_query),
+]
+
+
+class FakeRoute:
+    path_format = "/api/sweets/{sweet_id}"
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = FakeRoute
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def per_call_us(run, calls, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run(calls)
+        samples.append((time.perf_counter() - started) / calls * 1e6)
+    return samples
+
+
+def asgi_runner(asgi_app, path="/api/sweets/1"):
+    def run(calls):
+        async def loop():
+            for _ in range(calls):
+                scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b""}
+                await asgi_app(scope, receive, send)
+
+        asyncio.run(loop())
+
+    return run
+
+
+def query_runner(engine):
+    def run(calls):
+        with engine.connect() as conn:
+            for _ in range(calls):
+                conn.execute(text("SELECT 1"))
+
+    return run
+
+
+def compare(bare, instrumented, calls, rounds):
+    bare_samples = per_call_us(bare, calls, rounds)
+    instrumented_samples = per_call_us(instrumented, calls, rounds)
+    bare_us = statistics.median(bare_samples)
+    instrumented_us = statistics.median(instrumented_samples)
+    return {
+        "bare_us": bare_us,
+        "instrumented_us": instrumented_us,
+        "overhead_us": instrumented_us - bare_us,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-request cost of the metrics layer")
+    parser.add_argument("--calls", type=int, default=5_000)
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+
+    results = {
+        "middleware (bare ASGI endpoint)": compare(
+            asgi_runner(endpoint), asgi_runner(metrics.MetricsMiddleware(endpoint)), args.calls, args.rounds
+        ),
+    }
+
+    # The full application with and without the metrics layer, which sits
+    # right inside Starlette's error middleware.
+    instrumented_app = app.build_middleware_stack().app
+    assert isinstance(instrumented_app, metrics.MetricsMiddleware)
+    results["middleware (GET /health)"] = compare(
+        asgi_runner(instrumented_app.app, "/health"), asgi_runner(instrumented_app, "/health"), args.calls, args.rounds
+    )
+
+    engine = create_engine("sqlite://")
+    instrumented = query_runner(engine)
+
+    def bare(calls):
+        for name, hook in QUERY_HOOKS:
+            event.remove(Engine, name, hook)
+        try:
+            instrumented(calls)
+        finally:
+            for name, hook in QUERY_HOOKS:
+                event.listen(Engine, name, hook)
+
+    results["query hooks (SELECT 1)"] = compare(bare, instrumented, args.calls, args.rounds)
+    print_table("Metrics overhead per call (median of rounds)", results)
+
+
+if __name__ == "__main__":
+    main()
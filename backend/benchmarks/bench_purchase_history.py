@@ -0,0 +1,84 @@
+import argparse
+
+from benchmarks.common import count_queries, make_database, measure, override_db, print_table
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.api import inventory
+from app.core.dependencies import get_current_user
+from app.core.security import create_access_token
+from app.database import get_db
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+from app.models.user import User
+
+
+def legacy_my_purchases(db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    purchases = db.query(Purchase).filter(Purchase.user_id == current_user.id).all()
+    for purchase in purchases:
+        sweet = db.query(Sweet).filter(Sweet.id == purchase.sweet_id).first()
+        purchase.sweet_name = sweet.name if sweet else "Unknown"
+        purchase.user_email = current_user.email
+    return [{"id": purchase.id, "sweet_name": purchase.sweet_name} for purchase in purchases]
+
+
+def seed(Session, purchases, sweets=50):
+    with Session() as db:
+        user = User(email="loyal@example.com", hashed_password="x", is_active=True)
+        db.add(user)
+        db.execute(insert(Sweet), [
+            dict(name=f"Sweet {i}", category="Bench", price=1.0 + i, quantity=1_000_000, is_available=True)
+            for i in range(sweets)
+        ])
+        db.flush()
+        db.execute(insert(Purchase), [
+            dict(user_id=user.id, sweet_id=1 + i % sweets, quantity=1, unit_price=1.0, total_price=1.0,
+                 status="completed")
+            for i in range(purchases)
+        ])
+        db.commit()
+        return user.email
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare purchase history query strategies")
+    parser.add_argument("--database-url")
+    parser.add_argument("--purchases", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url)
+    email = seed(Session, args.purchases)
+
+    app = FastAPI()
+    app.include_router(inventory.router, prefix="/api")
+    app.get("/legacy/purchases/my")(legacy_my_purchases)
+    override_db(app, Session)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+    def walk_all_pages():
+        url = "/api/inventory/purchases/my?limit=100"
+        while url:
+            response = client.get(url, headers=headers)
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/api/inventory/purchases/my?limit=100&cursor={cursor}" if cursor else None
+
+    scenarios = {
+        "legacy N+1 (all rows)": lambda: client.get("/legacy/purchases/my", headers=headers),
+        "joined, first page": lambda: client.get("/api/inventory/purchases/my", headers=headers),
+        "joined, walk all pages": walk_all_pages,
+    }
+    results = {}
+    for name, scenario in scenarios.items():
+        with count_queries(engine) as counter:
+            scenario()
+        results[name] = dict(queries=counter["queries"], **measure(scenario, args.repeat))
+
+    print_table(f"GET /purchases/my with {args.purchases} purchases ({engine.dialect.name})", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import print_table
+
+from app.core.rate_limit import InMemoryBucketStore, RateLimit, RateLimitMiddleware
+from app.core.security import create_access_token, decode_access_token
+from app.core.token_cache import token_cache
+from app.models.user import User
+
+LIMITS = {("GET", "/api/sweets/search"): RateLimit(10**9, 1)}
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def address(n):
+    return f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def asgi_runner(asgi_app, path, headers=(), clients=1):
+    def run(calls):
+        async def loop():
+            for n in range(calls):
+                scope = {
+                    "type": "http", "method": "GET", "path": path, "headers": list(headers),
+                    "query_string": b"", "client": (address(n % clients), 5000),
+                }
+                await asgi_app(scope, receive, send)
+
+        asyncio.run(loop())
+
+    return run
+
+
+def per_call_us(run, calls, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run(calls)
+        samples.append((time.perf_counter() - started) / calls * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-request cost of the rate limiter")
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--clients", type=int, default=10_000)
+    args = parser.parse_args()
+
+    bare_us = per_call_us(asgi_runner(endpoint, "/api/sweets/search"), args.calls, args.rounds)
+    token = create_access_token(data={"sub": "bench@example.com"})
+    cached = create_access_token(data={"sub": "cached@example.com"})
+    token_cache.set(cached, decode_access_token(cached), User(id=1, email="cached@example.com", is_admin=False, is_active=True))
+    cases = {
+        "unlimited route": ("/health", (), 1),
+        "limited, one address": ("/api/sweets/search", (), 1),
+        f"limited, {args.clients} addresses": ("/api/sweets/search", (), args.clients),
+        "limited, bearer token": ("/api/sweets/search", ((b"authorization", f"Bearer {token}".encode()),), 1),
+        "limited, cached bearer token": ("/api/sweets/search", ((b"authorization", f"Bearer {cached}".encode()),), 1),
+    }
+
+    results = {"bare endpoint": {"us_per_request": bare_us, "overhead_us": 0.0}}
+    for name, (path, headers, clients) in cases.items():
+        store = InMemoryBucketStore(idle_seconds=1)
+        limited = RateLimitMiddleware(endpoint, store, LIMITS)
+        us = per_call_us(asgi_runner(limited, path, headers, clients), args.calls, args.rounds)
+        results[name] = {"us_per_request": us, "overhead_us": us - bare_us, "buckets": len(store)}
+
+    print_table("Rate limiter overhead per request (median of rounds)", results)
+
+
+if __name__ == "__main__":
+    main()
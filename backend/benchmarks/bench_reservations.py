@@ -0,0 +1,115 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import count_queries, make_database, print_table
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, select, update
+
+from app.core.reservations import release_expired, reserve_stock
+from app.models.reservation import Reservation
+from app.models.sweet import Sweet
+from app.models.user import User
+
+
+def seed(Session, stock):
+    with Session() as db:
+        user = User(email="buyer@bench.test", hashed_password="x", is_active=True)
+        db.add(user)
+        db.flush()
+        sweet_id = db.execute(
+            insert(Sweet).values(name="Hot Sweet", category="Bench", price=2.0, quantity=stock, is_available=True)
+            .returning(Sweet.id)
+        ).scalar_one()
+        db.commit()
+        return user.id, sweet_id
+
+
+def contend(Session, user_id, sweet_id, clients, attempts):
+    def client(index):
+        held = 0
+        for _ in range(index, attempts, clients):
+            with Session() as db:
+                try:
+                    reserve_stock(db, user_id, sweet_id, 1, 15)
+                    held += 1
+                except HTTPException:
+                    pass
+        return held
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        held = sum(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+    return held, {"attempts_per_s": attempts / elapsed, "seconds": elapsed, "held": held}
+
+
+def add_holds(Session, user_id, sweet_id, count, expires_at, chunk=10_000):
+    with Session() as db:
+        for start in range(0, count, chunk):
+            db.execute(insert(Reservation), [
+                dict(user_id=user_id, sweet_id=sweet_id, quantity=1, expires_at=expires_at)
+                for _ in range(min(chunk, count - start))
+            ])
+        db.commit()
+
+
+def sweep(engine, Session, batch):
+    with count_queries(engine) as counter:
+        started = time.perf_counter()
+        released = 0
+        while True:
+            with Session() as db:
+                count = release_expired(db, batch)
+            released += count
+            if count < batch:
+                break
+        elapsed = time.perf_counter() - started
+    return {"ms": elapsed * 1000, "released": released, "queries": counter["queries"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reserve a hot sweet from many clients and time expiry sweeps")
+    parser.add_argument("--database-url")
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--attempts", type=int, default=2_000)
+    parser.add_argument("--live-holds", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--expired", type=int, default=1_000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url, pool_size=args.clients, max_overflow=0)
+    user_id, sweet_id = seed(Session, args.stock)
+
+    held, stats = contend(Session, user_id, sweet_id, args.clients, args.attempts)
+    with Session() as db:
+        left = db.scalar(select(Sweet.quantity).where(Sweet.id == sweet_id))
+        holds = db.scalar(select(func.count(Reservation.id)))
+    if held != args.stock or left != 0 or holds != held:
+        raise SystemExit(f"oversold: {held} holds accepted, {holds} stored, {left} left of {args.stock}")
+    print_table(
+        f"{args.attempts} reservations of {args.stock} units from {args.clients} clients ({engine.dialect.name})",
+        {"reserve": stats},
+    )
+
+    results = {}
+    now = datetime.now(timezone.utc)
+    for live in args.live_holds:
+        with Session() as db:
+            db.execute(delete(Reservation))
+            db.commit()
+        add_holds(Session, user_id, sweet_id, live, now + timedelta(hours=1))
+        add_holds(Session, user_id, sweet_id, args.expired, now - timedelta(minutes=1))
+        results[f"{live} live holds"] = sweep(engine, Session, args.batch)
+        with Session() as db:
+            db.execute(update(Sweet).where(Sweet.id == sweet_id).values(quantity=0))
+            db.commit()
+
+    print_table(f"Sweeping {args.expired} expired holds (batch {args.batch})", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import random
+
+from benchmarks.common import make_database, measure, override_db, print_table
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.api import analytics, inventory, sweets
+from app.config import settings
+from app.core.analytics import backfill_sales
+from app.core.catalog_cache import InMemoryCacheBackend, catalog_cache
+from app.core.responses import FastJSONResponse
+from app.core.security import create_access_token
+from app.models.purchase import Purchase
+from app.models.stock_movement import StockMovement
+from app.models.sweet import Sweet
+from app.models.user import User
+
+ENDPOINTS = [
+    "/api/sweets/?limit=100",
+    "/api/sweets/?limit=100&order_by=price",
+    "/api/sweets/1",
+    "/api/sweets/search?q=chocolate&limit=100",
+    "/api/inventory/purchases/my?limit=100",
+    "/api/inventory/movements?limit=500",
+    "/api/inventory/analytics/sweets?limit=500",
+    "/api/inventory/analytics/daily",
+]
+
+
+def seed(Session, sweets_count, purchases):
+    rng = random.Random(7)
+    with Session() as db:
+        admin = User(email="admin@example.com", hashed_password="x", is_active=True, is_admin=True)
+        db.add(admin)
+        db.flush()
+        db.execute(insert(Sweet), [
+            dict(
+                name=f"{rng.choice(['Chocolate', 'Crème', 'Lemon', 'Caramel'])} delight {i}",
+                category=f"Category {i % 12}",
+                price=round(rng.uniform(0.5, 50), 2),
+                quantity=rng.randint(0, 500),
+                description="A sweet for benchmarking" if i % 3 else None,
+                is_available=True,
+            )
+            for i in range(sweets_count)
+        ])
+        db.execute(insert(Purchase), [
+            dict(user_id=admin.id, sweet_id=1 + i % sweets_count, quantity=1 + i % 5,
+                 unit_price=2.5, total_price=2.5 * (1 + i % 5), status="completed")
+            for i in range(purchases)
+        ])
+        db.execute(insert(StockMovement), [
+            dict(sweet_id=1 + i % sweets_count, user_id=admin.id, delta=10, quantity_after=100 + i, reason="restock")
+            for i in range(1_000)
+        ])
+        db.commit()
+        backfill_sales(db)
+
+
+def make_client(Session, response_class):
+    app = FastAPI(default_response_class=response_class)
+    for router in (sweets.router, inventory.router, analytics.router):
+        app.include_router(router, prefix="/api")
+    override_db(app, Session)
+    return TestClient(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list endpoints with and without the response fast path")
+    parser.add_argument("--database-url")
+    parser.add_argument("--sweets", type=int, default=2_000)
+    parser.add_argument("--purchases", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url)
+    seed(Session, args.sweets, args.purchases)
+
+    # Every request must build its body, so give the cache no room.
+    catalog_cache.backend = InMemoryCacheBackend(maxsize=0)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin@example.com'})}"}
+    clients = {False: make_client(Session, JSONResponse), True: make_client(Session, FastJSONResponse)}
+
+    results = {}
+    for path in ENDPOINTS:
+        bodies = {}
+        for enabled, client in clients.items():
+            settings.RESPONSE_FAST_PATH = enabled
+            bodies[enabled] = client.get(path, headers=headers).content
+            stats = measure(lambda: client.get(path, headers=headers), args.repeat)
+            stats["identical"] = bodies[enabled] == bodies[False]
+            results[f"{path} {'fast' if enabled else 'baseline'}"] = stats
+
+    print_table(f"List endpoints, baseline vs fast path ({engine.dialect.name})", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import time
+
+from benchmarks.common import count_queries, make_database, print_table
+
+from sqlalchemy import insert
+
+from app.api.inventory import _restock
+from app.core.stock import adjust_stock
+from app.models.sweet import Sweet
+from app.models.user import User
+from app.schemas.stock import StockAdjustment
+
+
+def seed(Session, sweets):
+    with Session() as db:
+        admin = User(email="admin@bench.test", hashed_password="x", is_active=True, is_admin=True)
+        db.add(admin)
+        db.flush()
+        db.execute(insert(Sweet), [
+            dict(name=f"Sweet {i}", category="Bench", price=2.0, quantity=100, is_available=True)
+            for i in range(sweets)
+        ])
+        db.commit()
+        return admin.id
+
+
+def timed(engine, load):
+    with count_queries(engine) as counter:
+        started = time.perf_counter()
+        load()
+        elapsed = time.perf_counter() - started
+    return {"ms": elapsed * 1000, "queries": counter["queries"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-sweet restocks with one batch adjustment")
+    parser.add_argument("--database-url")
+    parser.add_argument("--sweets", type=int, default=500)
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url)
+    user_id = seed(Session, args.sweets)
+    sweet_ids = range(1, args.sweets + 1)
+
+    def restock_each():
+        with Session() as db:
+            for sweet_id in sweet_ids:
+                _restock(db, user_id, sweet_id, 10)
+
+    def restock_batch():
+        with Session() as db:
+            adjust_stock(db, user_id, [StockAdjustment(sweet_id=sweet_id, delta=10) for sweet_id in sweet_ids], "restock")
+
+    results = {
+        "restock one sweet per request": timed(engine, restock_each),
+        "batch restock": timed(engine, restock_batch),
+    }
+    print_table(f"Restocking {args.sweets} sweets ({engine.dialect.name})", results)
+
+
+if __name__ == "__main__":
+    main()
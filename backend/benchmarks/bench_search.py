@@ -0,0 +1,77 @@
+import argparse
+import random
+
+from benchmarks.common import make_database, measure, override_db, print_table
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import and_, insert, text
+
+from app.api import sweets
+from app.core.search import search_index
+from app.database import get_db
+from app.models.sweet import Sweet
+
+WORDS = ["chocolate", "vanilla", "lemon", "caramel", "strawberry", "hazelnut", "mint", "coconut",
+         "almond", "raspberry", "toffee", "pistachio", "honey", "ginger", "cherry", "mango"]
+KINDS = ["cake", "cookie", "tart", "truffle", "fudge", "cupcake", "brownie", "macaron"]
+
+
+def legacy_search(name: str, db=Depends(get_db)):
+    filters = [Sweet.is_available == True, Sweet.name.ilike(f"%{name}%")]
+    return [sweet.id for sweet in db.query(Sweet).filter(and_(*filters)).all()]
+
+
+def seed(Session, count, chunk=10_000):
+    rng = random.Random(42)
+    with Session() as db:
+        for start in range(0, count, chunk):
+            db.execute(insert(Sweet), [
+                dict(
+                    name=f"{rng.choice(WORDS).title()} {rng.choice(KINDS).title()} {i}",
+                    category=rng.choice(KINDS).title(),
+                    price=round(rng.uniform(1, 50), 2),
+                    quantity=10,
+                    description=" ".join(rng.choice(WORDS) for _ in range(8)),
+                    is_available=True,
+                )
+                for i in range(start, min(count, start + chunk))
+            ])
+        db.commit()
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("ANALYZE sweets"))
+            db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure GET /api/sweets/search latency across catalog sizes")
+    parser.add_argument("--database-url")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        engine, Session = make_database(args.database_url)
+        seed(Session, size)
+        search_index.clear()
+
+        app = FastAPI()
+        app.include_router(sweets.router, prefix="/api")
+        app.get("/legacy/search")(legacy_search)
+        override_db(app, Session)
+        client = TestClient(app)
+        client.get("/api/sweets/search?q=warmup")
+
+        results[f"{size} legacy ILIKE"] = measure(lambda: client.get("/legacy/search?name=choc"), args.repeat)
+        results[f"{size} indexed name"] = measure(
+            lambda: client.get("/api/sweets/search?name=choc&limit=20"), args.repeat)
+        results[f"{size} indexed free text"] = measure(
+            lambda: client.get("/api/sweets/search?q=lemon tart&limit=20"), args.repeat)
+        engine.dispose()
+
+    print_table(f"GET /api/sweets/search ({engine.dialect.name})", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import threading
+import time
+
+from benchmarks.common import print_table, summarize
+
+from app.core.stock_events import InMemoryBroadcastBackend, StockBroker
+
+
+async def fan_out(subscribers, commits, slow_every):
+    broker = StockBroker(InMemoryBroadcastBackend(), max_pending=1000)
+    subscriptions = [broker.subscribe() for _ in range(subscribers)]
+    latencies = []
+    publish_seconds = []
+
+    for commit in range(commits):
+        received = 0
+        all_received = asyncio.Event()
+
+        async def consume(subscription):
+            nonlocal received
+            await subscription.next(10)
+            received += 1
+            if received == fast:
+                all_received.set()
+
+        # Every slow_every-th stream does not read at all; its pending levels
+        # are coalesced instead of queued.
+        fast_subscriptions = [s for i, s in enumerate(subscriptions) if not slow_every or i % slow_every]
+        fast = len(fast_subscriptions)
+        consumers = [asyncio.create_task(consume(subscription)) for subscription in fast_subscriptions]
+        await asyncio.sleep(0)
+
+        def publish():
+            started = time.perf_counter()
+            broker.publish([(1 + commit % 50, commit, True)])
+            publish_seconds.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        thread = threading.Thread(target=publish)
+        thread.start()
+        await all_received.wait()
+        latencies.append(time.perf_counter() - started)
+        thread.join()
+        await asyncio.gather(*consumers)
+
+    pending = max(len(subscription._pending) for subscription in subscriptions)
+    for subscription in subscriptions:
+        subscription.close()
+    return latencies, publish_seconds, pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure stock event fan-out to many open streams")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--commits", type=int, default=50)
+    parser.add_argument("--slow-every", type=int, default=10,
+                        help="Every Nth stream never reads, like a stalled client (0 disables)")
+    args = parser.parse_args()
+
+    results = {}
+    for subscribers in args.subscribers:
+        latencies, publish_seconds, pending = asyncio.run(fan_out(subscribers, args.commits, args.slow_every))
+        stats = summarize(latencies)
+        results[f"{subscribers} streams"] = {
+            "publish_us": sum(publish_seconds) / len(publish_seconds) * 1e6,
+            "all_delivered_p50_ms": stats["p50_ms"],
+            "all_delivered_p99_ms": stats["p99_ms"],
+            "max_pending_levels": pending,
+        }
+    print_table(f"Fan-out of {args.commits} commits, one stalled stream in {args.slow_every}", results)
+
+
+if __name__ == "__main__":
+    main()
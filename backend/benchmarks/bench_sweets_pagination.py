@@ -0,0 +1,72 @@
+import argparse
+
+from benchmarks.common import make_database, measure, override_db, print_table
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from app.api import sweets
+from app.core.catalog_cache import InMemoryCacheBackend, catalog_cache
+from app.core.pagination import encode_cursor
+from app.models.sweet import Sweet
+
+
+def seed(Session, count, chunk=10_000):
+    with Session() as db:
+        for start in range(0, count, chunk):
+            db.execute(insert(Sweet), [
+                dict(name=f"Sweet {i:07d}", category=f"Category {i % 20}", price=1 + (i * 7919) % 99_900 / 100,
+                     quantity=100, is_available=True)
+                for i in range(start, min(count, start + chunk))
+            ])
+        db.commit()
+
+
+def cursor_for_page(Session, page, limit):
+    if page == 1:
+        return None
+    with Session() as db:
+        last = db.execute(
+            select(Sweet.name, Sweet.id)
+            .where(Sweet.is_available == True)
+            .order_by(Sweet.name, Sweet.id)
+            .offset((page - 1) * limit - 1)
+            .limit(1)
+        ).one()
+    return encode_cursor(["name", last.name, last.id])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare offset and keyset pagination of GET /api/sweets/")
+    parser.add_argument("--database-url")
+    parser.add_argument("--sweets", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 250, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url)
+    seed(Session, args.sweets)
+
+    # Every request must reach the database, so give the cache no room.
+    catalog_cache.backend = InMemoryCacheBackend(maxsize=0)
+    app = FastAPI()
+    app.include_router(sweets.router, prefix="/api")
+    override_db(app, Session)
+    client = TestClient(app)
+
+    results = {}
+    for page in args.pages:
+        skip = (page - 1) * args.limit
+        offset_url = f"/api/sweets/?limit={args.limit}&skip={skip}"
+        cursor = cursor_for_page(Session, page, args.limit)
+        keyset_url = f"/api/sweets/?limit={args.limit}&order_by=name" + (f"&cursor={cursor}" if cursor else "")
+        results[f"page {page} offset"] = measure(lambda: client.get(offset_url), args.repeat)
+        results[f"page {page} cursor"] = measure(lambda: client.get(keyset_url), args.repeat)
+
+    print_table(f"GET /api/sweets/ with {args.sweets} sweets ({engine.dialect.name})", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "sweetshop-bench.db"))
+# Benchmarks drive the app from one address; bench_rate_limit measures the limiter itself.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, get_db, get_read_db
+import app.models
+
+
+def make_database(url=None, **options):
+    if url is None:
+        path = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite:///{path}"
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, **options)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_db(app, Session):
+    def _get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_read_db] = _get_db
+
+
+@contextmanager
+def count_queries(engine):
+    counter = {"queries": 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+
+def measure(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    width = max(len(name) for name in rows)
+    for name, stats in rows.items():
+        cells = "  ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                          for key, value in stats.items())
+        print(f"  {name.ljust(width)}  {cells}")
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import make_database, override_db, percentile
+
+import httpx
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.core.security import create_access_token, get_password_hash
+from app.database import async_database_url, get_db, get_read_db
+from app.main import app
+from app.models.purchase import Purchase
+from app.models.sweet import Sweet
+from app.models.user import User
+
+BASELINE = Path(__file__).with_name("baseline.json")
+PASSWORD = "loadtest-password"
+WORDS = ["chocolate", "vanilla", "lemon", "caramel", "strawberry", "mint", "honey", "almond"]
+CATEGORIES = ["Cakes", "Cookies", "Candy", "Pastries", "Chocolates"]
+SCENARIOS = ("catalog", "search", "login", "purchase")
+
+
+def seed(Session, users, sweets, purchases, chunk=10_000):
+    hashed = get_password_hash(PASSWORD)
+    with Session() as db:
+        db.execute(insert(User), [
+            dict(email=f"user{i}@load.test", hashed_password=hashed, full_name=f"User {i}", is_active=True)
+            for i in range(users)
+        ])
+        for start in range(0, sweets, chunk):
+            db.execute(insert(Sweet), [
+                dict(
+                    name=f"{WORDS[i % len(WORDS)].title()} {WORDS[(i // len(WORDS)) % len(WORDS)]} {i}",
+                    category=CATEGORIES[i % len(CATEGORIES)],
+                    price=1 + (i % 50),
+                    quantity=1_000_000,
+                    description=f"Made with {WORDS[(i * 7) % len(WORDS)]} and {WORDS[(i * 3) % len(WORDS)]}",
+                    is_available=True,
+                )
+                for i in range(start, min(start + chunk, sweets))
+            ])
+        user_ids = db.execute(select(User.id)).scalars().all()
+        sweet_ids = db.execute(select(Sweet.id)).scalars().all()
+        for start in range(0, purchases, chunk):
+            db.execute(insert(Purchase), [
+                dict(
+                    user_id=user_ids[i % len(user_ids)],
+                    sweet_id=sweet_ids[i % len(sweet_ids)],
+                    quantity=1,
+                    unit_price=2.0,
+                    total_price=2.0,
+                    status="completed",
+                )
+                for i in range(start, min(start + chunk, purchases))
+            ])
+        db.commit()
+    return user_ids, sweet_ids
+
+
+def override_async_db(url):
+    engine = create_async_engine(async_database_url(url))
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def _get_db():
+        async with Session() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_read_db] = _get_db
+    return engine
+
+
+def scenario_requests(name, rng, users, sweet_ids, tokens):
+    if name == "catalog":
+        if rng.random() < 0.5:
+            return "GET", "/api/sweets/?limit=50", {}
+        return "GET", f"/api/sweets/{rng.choice(sweet_ids)}", {}
+    if name == "search":
+        return "GET", f"/api/sweets/search?q={rng.choice(WORDS)[:rng.randint(3, 6)]}", {}
+    if name == "login":
+        user = rng.randrange(users)
+        return "POST", "/api/auth/login", {"data": {"username": f"user{user}@load.test", "password": PASSWORD}}
+    user = rng.randrange(users)
+    return "POST", "/api/inventory/purchase", {
+        "json": {"sweet_id": rng.choice(sweet_ids), "quantity": 1},
+        "headers": {"Authorization": f"Bearer {tokens[user]}"},
+    }
+
+
+async def run_scenario(client, name, requests, concurrency, rng, users, sweet_ids, tokens):
+    plan = [scenario_requests(name, rng, users, sweet_ids, tokens) for _ in range(requests)]
+    latencies = []
+    errors = 0
+
+    async def worker(offset):
+        nonlocal errors
+        for method, url, kwargs in plan[offset::concurrency]:
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, expected in baseline["scenarios"].items():
+        actual = results["scenarios"].get(name)
+        if actual is None:
+            continue
+        if actual["errors"] > expected["errors"]:
+            regressions.append(f"{name}: {actual['errors']} errors (baseline {expected['errors']})")
+        if actual["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {actual['p95_ms']:.2f} ms (baseline {expected['p95_ms']:.2f} ms)")
+        if actual["rps"] < expected["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {actual['rps']:.0f} req/s (baseline {expected['rps']:.0f} req/s)")
+    return regressions
+
+
+async def drive(args, users, sweet_ids):
+    rng = random.Random(args.seed)
+    tokens = [create_access_token(data={"sub": f"user{i}@load.test"}) for i in range(args.users)]
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60)
+    async with client:
+        results = {}
+        for name in args.scenarios:
+            requests = args.login_requests if name == "login" else args.requests
+            runs = [
+                await run_scenario(client, name, requests, args.concurrency, rng, args.users, sweet_ids, tokens)
+                for _ in range(args.runs)
+            ]
+            # Tail latencies of a single run are noisy; gate on the median run.
+            results[name] = {
+                "requests": requests,
+                "errors": sum(run["errors"] for run in runs),
+                **{key: statistics.median(run[key] for run in runs) for key in ("rps", "p50_ms", "p95_ms", "p99_ms")},
+            }
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the API hot paths concurrently and report latency percentiles")
+    parser.add_argument("--database-url")
+    parser.add_argument("--base-url", help="Load a running server instead of the app in-process")
+    parser.add_argument("--async-db", action="store_true", help="Serve the in-process app through AsyncSession")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--sweets", type=int, default=1_000)
+    parser.add_argument("--purchases", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=32,
+                        help="Requests for the login scenario, which is bound by bcrypt cost")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per scenario; the report holds their medians")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed fractional slowdown of p95 and drop in req/s before failing")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    engine, Session = make_database(args.database_url)
+    _, sweet_ids = seed(Session, args.users, args.sweets, args.purchases)
+    if args.async_db:
+        override_async_db(engine.url.render_as_string(hide_password=False))
+    else:
+        override_db(app, Session)
+
+    results = {
+        "config": {
+            "database": engine.dialect.name,
+            "async_db": args.async_db,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "users": args.users,
+            "sweets": args.sweets,
+            "purchases": args.purchases,
+            "requests": args.requests,
+            "login_requests": args.login_requests,
+            "concurrency": args.concurrency,
+            "runs": args.runs,
+        },
+        "scenarios": asyncio.run(drive(args, args.users, sweet_ids)),
+    }
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n")
+
+    if args.update_baseline:
+        args.baseline.write_text(report + "\n")
+        return
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["config"] != results["config"]:
+            print(f"Baseline was recorded with {baseline['config']}; not comparing", file=sys.stderr)
+            return
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()